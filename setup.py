@@ -20,6 +20,7 @@ setuptools.setup(
             "fluidml-profiler = fluidml.profiler.__main__:main",
             "ablation-drawer = fluidml.tools.ablation_drawer:main",
             "ablation-tool = fluidml.tools.ablation_tool:main",
+            "convert-tool = fluidml.tools.convert_tool:main",
         ]
     },
     extras_require={
@@ -1,4 +1,15 @@
+from .anytime import AnytimeAnalyzer
+from .beam import BeamAnalyzer
 from .dp import DynamicProgramAnalyzer
+from .exact import ExactAnalyzer
 from .greedy import GreedyAnalyzer
+from .tree import TreeAnalyzer
 
-__all__ = ["DynamicProgramAnalyzer", "GreedyAnalyzer"]
+__all__ = [
+    "AnytimeAnalyzer",
+    "BeamAnalyzer",
+    "DynamicProgramAnalyzer",
+    "ExactAnalyzer",
+    "GreedyAnalyzer",
+    "TreeAnalyzer",
+]
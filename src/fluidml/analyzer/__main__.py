@@ -1,19 +1,29 @@
 import argparse
+import json
+import os
 
-from typing import Optional, TypeVar
+from typing import Any, Dict, Optional, TypeVar
 
-from ..utils import KStat, Schedule
+from ..utils import STATISTICS, KStat, Schedule, parse_layouts
 from .analyzer import Analyzer
+from .anytime import BASELINES, AnytimeAnalyzer
+from .beam import BeamAnalyzer
 from .dp import DynamicProgramAnalyzer
+from .exact import ExactAnalyzer
 from .greedy import GreedyAnalyzer
+from .tree import TreeAnalyzer
 
 AnalyzerCls = TypeVar("AnalyzerCls", bound="Analyzer")
 
 
 def main():
     dispatch_table: dict[str, AnalyzerCls] = {
+        "anytime": AnytimeAnalyzer,
+        "beam": BeamAnalyzer,
         "dp": DynamicProgramAnalyzer,
+        "exact": ExactAnalyzer,
         "greedy": GreedyAnalyzer,
+        "tree": TreeAnalyzer,
     }
     parser: argparse.ArgumentParser = argparse.ArgumentParser(
         description="analyzer for FluidML pipelines",
@@ -36,25 +46,113 @@ def main():
         required=True,
         help="path to the JSON file containing kstat data",
     )
+    parser.add_argument(
+        "--statistic",
+        type=str,
+        choices=STATISTICS,
+        default=None,
+        help="timing statistic to optimize for, defaults to the one in kstat",
+    )
+    parser.add_argument(
+        "--no-conversions",
+        action="store_false",
+        dest="conversions",
+        help="skip the pass after the solver that converts values for their readers",
+    )
+    parser.add_argument(
+        "--layout",
+        action="append",
+        default=[],
+        metavar="NAME=DIMS",
+        help="layout of a model input or output, e.g. input0=0,2,3,1, repeatable",
+    )
+    parser.add_argument(
+        "--jobs",
+        default=os.cpu_count(),
+        type=int,
+        help="number of workers to analyze independent subgraphs in the dp mode",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=60.0,
+        help="time limit in seconds for the search of the exact mode, after its dp seed",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=10.0,
+        help="wall-clock budget in seconds for the anytime mode",
+    )
+    parser.add_argument(
+        "--baseline",
+        choices=BASELINES,
+        default="default",
+        help="schedule the anytime mode starts refining from",
+    )
+    parser.add_argument(
+        "--beam-width",
+        type=int,
+        default=16,
+        help="number of partial schedules the beam mode keeps per op",
+    )
+    parser.add_argument(
+        "--beam-candidates",
+        type=int,
+        default=None,
+        help="number of cheapest kernel layouts the beam mode tries per op",
+    )
+    parser.add_argument(
+        "--beam-margin",
+        type=float,
+        default=None,
+        help="relative cost margin over the cheapest layout per op for the beam mode",
+    )
     parser.add_argument(
         "--output",
         type=str,
         required=False,
         help="output file for analysis results",
     )
+    parser.add_argument(
+        "--report",
+        type=str,
+        required=False,
+        help="output file for the solver report, e.g. the optimality gap",
+    )
     args: argparse.Namespace = parser.parse_args()
     filename: str = args.filename
     with open(filename, "r") as f:
         mod: str = f.read()
     kstatf: str = args.kstat
-    with open(kstatf, "r") as f:
+    statistic: Optional[str] = args.statistic
+    with open(kstatf, "rb") as f:
         kstat: KStat = KStat.build(f)
     output: Optional[str] = args.output
+    report: Optional[str] = args.report
     cls: AnalyzerCls = dispatch_table[args.mode]
-    analyzer: Analyzer = cls()
+    options: Dict[str, Any] = {
+        "conversions": args.conversions,
+        "boundaries": parse_layouts(args.layout),
+    }
+    if args.mode == "dp":
+        options["jobs"] = args.jobs
+    elif args.mode == "exact":
+        options["time_limit"] = args.time_limit
+    elif args.mode == "anytime":
+        options["time_budget"] = args.time_budget
+        options["baseline"] = args.baseline
+    elif args.mode == "beam":
+        options["width"] = args.beam_width
+        options["candidates"] = args.beam_candidates
+        options["margin"] = args.beam_margin
+    analyzer: Analyzer = cls(statistic, **options)
     schedule: Schedule = analyzer.run(mod, kstat)
     with open(output, "w") as f:
         schedule.dump(f)
+    if report:
+        with open(report, "w") as f:
+            json.dump(analyzer.report, f)
 
 
 if __name__ == "__main__":
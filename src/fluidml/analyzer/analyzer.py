@@ -5,22 +5,84 @@ import iree.compiler.ir
 
 
 from ..utils import KStat, Schedule
+from .convert import ConversionPlanner
+from .dataflow import Dataflow
+from .propagate import check_boundaries
 
 
 from abc import abstractmethod
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class Analyzer(object):
-    def __init__(self, *args, **kwargs) -> Analyzer:
+    def __init__(
+        self,
+        statistic: Optional[str] = None,
+        conversions: bool = True,
+        boundaries: Optional[Dict[str, Tuple[int, ...]]] = None,
+        *args,
+        **kwargs,
+    ) -> Analyzer:
         super().__init__(*args, **kwargs)
+        self._statistic: Optional[str] = statistic
+        self._conversions: bool = conversions
+        self._boundaries: Dict[str, Tuple[int, ...]] = {
+            name: tuple(layout) for name, layout in (boundaries or {}).items()
+        }
+
+    @property
+    def statistic(self) -> Optional[str]:
+        return self._statistic
+
+    @property
+    def conversions(self) -> bool:
+        return self._conversions
+
+    @property
+    def boundaries(self) -> Dict[str, Tuple[int, ...]]:
+        return self._boundaries
+
+    @property
+    def report(self) -> Dict[str, Any]:
+        # Solvers only search schedules without conversions, so whatever they
+        # report as optimal or exact excludes them.
+        return {
+            "conversions": "after solver" if self._conversions else "none",
+            "optimality": "excludes conversions",
+        }
 
-    @abstractmethod
     def run(self, mod: str, kstat: KStat) -> Schedule:
+        kstat: KStat = kstat.select(self._statistic)
+        dataflow: Dataflow = self._snapshot(mod, self._boundaries)
+        check_boundaries(dataflow)
+        schedule: Schedule = self.solve(dataflow, kstat)
+        # Conversions are planned in a pass after the solver, which only ever
+        # sees schedules without them, so the solver reports the time of the
+        # schedule it returns once the conversions are in.
+        if self._conversions:
+            planner: ConversionPlanner = ConversionPlanner(dataflow, kstat)
+            converted: Schedule = planner.plan(schedule)
+            self._converted(planner.evaluate(schedule), planner.evaluate(converted))
+            schedule = converted
+        return schedule
+
+    @abstractmethod
+    def solve(self, dataflow: Dataflow, kstat: KStat) -> Schedule:
         raise NotImplementedError(
-            f"{self.__class__.__name__} does not implement run() method."
+            f"{self.__class__.__name__} does not implement solve() method."
         )
 
+    def _converted(self, solved: float, converted: float) -> None:
+        pass
+
+    @staticmethod
+    def _snapshot(mod: str, boundaries: Dict[str, Tuple[int, ...]] = {}) -> Dataflow:
+        with iree.compiler.ir.Context():
+            mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(mod)
+            return Dataflow.build(
+                Analyzer._filter_func_ops(mod.body.operations), boundaries
+            )
+
     @staticmethod
     def _filter_func_ops(
         operations: List[iree.compiler.ir.Operation],
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import numpy as np
+import time
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..utils import KStat, Schedule
+from .analyzer import Analyzer
+from .beam import BeamAnalyzer
+from .dataflow import Dataflow, DataflowValue
+from .factor import Factor, FactorGraph
+from .greedy import GreedyAnalyzer
+
+BASELINES: List[str] = ["default", "greedy"]
+
+
+class AnytimeAnalyzer(Analyzer):
+    def __init__(
+        self,
+        statistic: Optional[str] = None,
+        time_budget: float = 10.0,
+        baseline: str = "default",
+        *args,
+        **kwargs,
+    ) -> AnytimeAnalyzer:
+        super().__init__(statistic, *args, **kwargs)
+        assert baseline in BASELINES, f"Unsupported baseline {baseline}."
+        self._time_budget: float = time_budget
+        self._baseline: str = baseline
+        self._expect: float = 0.0
+        self._start: float = 0.0
+        self._cost: float = 0.0
+        self._rounds: int = 0
+        self._optimal: bool = False
+
+    @property
+    def cost(self) -> float:
+        return self._cost
+
+    @property
+    def report(self) -> Dict[str, Any]:
+        return {
+            **super().report,
+            "expect": self._expect,
+            "baseline": self._start,
+            "schedule": self._cost,
+            "improvement": self._expect - self._cost,
+            "rounds": self._rounds,
+            "optimal": self._optimal,
+        }
+
+    def solve(self, dataflow: Dataflow, kstat: KStat) -> Schedule:
+        deadline: float = time.perf_counter() + self._time_budget
+        graph: FactorGraph = FactorGraph(dataflow, kstat)
+        default: Schedule = graph.schedule({})
+        baseline: Schedule = (
+            GreedyAnalyzer(self._statistic).solve(dataflow, kstat)
+            if self._baseline == "greedy"
+            else default
+        )
+        self._expect = graph.evaluate(default)
+        self._start = graph.evaluate(baseline)
+        self._rounds = 0
+        components: List[List[Factor]] = graph.components()
+        bests: List[List[Tuple[int, ...]]] = []
+        costs: List[float] = []
+        for component in components:
+            component.sort(key=lambda factor: factor.node.index)
+            layouts: List[Tuple[int, ...]] = self._refine(
+                component,
+                [
+                    tuple(baseline.get_id(var.name, -1) for var in factor.variables)
+                    for factor in component
+                ],
+                deadline,
+            )
+            bests += [layouts]
+            costs += [self._evaluate(component, layouts)]
+        # Beams of doubling width until the budget runs out, each result
+        # polished by the local search. A component whose beam never had to
+        # drop a state is solved optimally and leaves the loop.
+        pending: List[int] = [*range(len(components))]
+        width: int = 1
+        while pending and time.perf_counter() < deadline:
+            beam: BeamAnalyzer = BeamAnalyzer(self._statistic, width)
+            for idx in [*pending]:
+                layouts, exhaustive = beam.search(components[idx], deadline)
+                if layouts is not None:
+                    layouts = self._refine(components[idx], layouts, deadline)
+                    cost: float = self._evaluate(components[idx], layouts)
+                    if cost < costs[idx]:
+                        bests[idx] = layouts
+                        costs[idx] = cost
+                if exhaustive:
+                    pending.remove(idx)
+            if time.perf_counter() < deadline:
+                self._rounds += 1
+            width *= 2
+        self._optimal = not pending
+        rows: Dict[Factor, int] = {
+            factor: factor.table[layouts][1]
+            for component, best, cost in zip(components, bests, costs)
+            if cost < np.inf
+            for factor, layouts in zip(component, best)
+        }
+        schedule: Schedule = graph.schedule(rows, baseline)
+        self._cost = graph.evaluate(schedule)
+        if self._cost > self._start:
+            schedule = baseline
+            self._cost = self._start
+        return schedule
+
+    def _converted(self, solved: float, converted: float) -> None:
+        # Optimal only among schedules without conversions.
+        self._cost = converted
+        self._optimal &= converted >= solved
+
+    @staticmethod
+    def _evaluate(factors: List[Factor], layouts: List[Tuple[int, ...]]) -> float:
+        return sum(
+            factor.table.get(chosen, (np.inf, None))[0]
+            for factor, chosen in zip(factors, layouts)
+        )
+
+    @staticmethod
+    def _refine(
+        factors: List[Factor], layouts: List[Tuple[int, ...]], deadline: float
+    ) -> List[Tuple[int, ...]]:
+        # Iterated conditional modes: every linking value in turn moves to the
+        # layout cheapest for the kernels around it, until no move helps.
+        assignment: Dict[DataflowValue, int] = {}
+        owners: Dict[DataflowValue, List[Factor]] = {}
+        domains: Dict[DataflowValue, Set[int]] = {}
+        for factor, chosen in zip(factors, layouts):
+            for idx, var in enumerate(factor.variables):
+                assignment.setdefault(var, chosen[idx])
+                owners.setdefault(var, []).append(factor)
+                domains.setdefault(var, set()).update(key[idx] for key in factor.table)
+
+        def cost(var: DataflowValue, layout: int) -> float:
+            return sum(
+                owner.table.get(
+                    tuple(
+                        layout if other is var else assignment[other]
+                        for other in owner.variables
+                    ),
+                    (np.inf, None),
+                )[0]
+                for owner in owners[var]
+            )
+
+        changed: bool = True
+        while changed and time.perf_counter() < deadline:
+            changed = False
+            for var, current in assignment.items():
+                if time.perf_counter() > deadline:
+                    break
+                best: float = cost(var, current)
+                for layout in sorted(domains[var]):
+                    candidate: float = cost(var, layout)
+                    if candidate < best:
+                        assignment[var] = layout
+                        best = candidate
+                        changed = True
+        return [
+            tuple(assignment[var] for var in factor.variables) for factor in factors
+        ]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import heapq
+import math
+import time
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..utils import KStat, Schedule
+from .analyzer import Analyzer
+from .dataflow import Dataflow, DataflowValue
+from .dp import DynamicProgramAnalyzer
+from .factor import Factor, FactorGraph
+
+Candidate = Tuple[float, Tuple[int, ...]]
+History = Optional[Tuple[Any, Tuple[int, ...]]]
+State = Tuple[float, Dict[int, int], History]
+
+
+class BeamAnalyzer(Analyzer):
+    def __init__(
+        self,
+        statistic: Optional[str] = None,
+        width: int = 16,
+        candidates: Optional[int] = None,
+        margin: Optional[float] = None,
+        *args,
+        **kwargs,
+    ) -> BeamAnalyzer:
+        super().__init__(statistic, *args, **kwargs)
+        self._width: int = width
+        self._candidates: Optional[int] = candidates
+        self._margin: Optional[float] = margin
+        self._cost: float = 0.0
+
+    @property
+    def report(self) -> Dict[str, Any]:
+        return {**super().report, "cost": self._cost}
+
+    def solve(self, dataflow: Dataflow, kstat: KStat) -> Schedule:
+        graph: FactorGraph = FactorGraph(dataflow, kstat)
+        incumbent: Optional[Schedule] = None
+        rows: Dict[Factor, int] = {}
+        for component in graph.components():
+            component.sort(key=lambda factor: factor.node.index)
+            best, _ = self.search(component)
+            if best is None:
+                # Every partial assignment in the beam ran into missing kernel
+                # table rows, so the component keeps the path decomposition.
+                if incumbent is None:
+                    incumbent = DynamicProgramAnalyzer(self._statistic).solve(
+                        dataflow, kstat
+                    )
+                continue
+            for factor, layouts in zip(component, best):
+                _, row = factor.table[layouts]
+                rows[factor] = row
+        schedule: Schedule = graph.schedule(rows, incumbent)
+        self._cost = graph.evaluate(schedule)
+        return schedule
+
+    def _converted(self, solved: float, converted: float) -> None:
+        self._cost = converted
+
+    def search(
+        self, factors: List[Factor], deadline: float = math.inf
+    ) -> Tuple[Optional[List[Tuple[int, ...]]], bool]:
+        # Searches one connected component of the factor graph, sorted in
+        # program order, and gives up with no result once the deadline passes.
+        # Keeps the cheapest `width` partial assignments. Assignments that
+        # agree on every value a later factor still reads are interchangeable,
+        # so only the cheapest of them survives. The flag tells whether
+        # nothing was pruned, i.e. the result is optimal.
+        slots: Dict[DataflowValue, int] = {}
+        last: Dict[int, int] = {}
+        for level, factor in enumerate(factors):
+            for var in factor.variables:
+                last[slots.setdefault(var, len(slots))] = level
+        states: List[State] = [(0.0, {}, None)]
+        exhaustive: bool = self._candidates is None and self._margin is None
+        alive: Set[int] = set()
+        for level, factor in enumerate(factors):
+            if time.perf_counter() > deadline:
+                return None, False
+            variables: List[int] = [slots[var] for var in factor.variables]
+            assigned: List[int] = [
+                idx for idx, slot in enumerate(variables) if slot in alive
+            ]
+            alive = {slot for slot in alive | {*variables} if last[slot] > level}
+            candidates: Dict[Tuple[int, ...], List[Candidate]] = {}
+            for layouts, (cost, _) in sorted(
+                factor.table.items(), key=lambda item: item[1][0]
+            ):
+                candidates.setdefault(
+                    tuple(layouts[idx] for idx in assigned), []
+                ).append((cost, layouts))
+            expansions: Dict[Tuple[Tuple[int, int], ...], State] = {}
+            for cost, live, history in states:
+                queue: List[Candidate] = candidates.get(
+                    tuple(live[variables[idx]] for idx in assigned), []
+                )
+                if self._candidates is not None:
+                    queue = queue[: self._candidates]
+                if self._margin is not None and queue:
+                    limit: float = queue[0][0] * (1.0 + self._margin)
+                    queue = [candidate for candidate in queue if candidate[0] <= limit]
+                for candidate, layouts in queue:
+                    following: Dict[int, int] = {
+                        slot: layout
+                        for slot, layout in live.items()
+                        if last[slot] > level
+                    }
+                    for slot, layout in zip(variables, layouts):
+                        if last[slot] > level:
+                            following[slot] = layout
+                    key: Tuple[Tuple[int, int], ...] = tuple(sorted(following.items()))
+                    total: float = cost + candidate
+                    if key not in expansions or total < expansions[key][0]:
+                        expansions[key] = (total, following, (history, layouts))
+            exhaustive &= len(expansions) <= self._width
+            states = heapq.nsmallest(
+                self._width, expansions.values(), key=lambda state: state[0]
+            )
+            if not states:
+                return None, exhaustive
+        _, _, history = states[0]
+        best: List[Tuple[int, ...]] = []
+        while history is not None:
+            history, layouts = history
+            best += [layouts]
+        return best[::-1], exhaustive
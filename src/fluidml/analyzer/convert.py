@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import numpy as np
+
+from typing import Dict, List, Optional, Tuple
+
+from ..utils import KStat, Schedule, transpose_kernel_name, transpose_times
+from .dataflow import Dataflow, DataflowNode, DataflowValue
+from .propagate import get_ids
+
+
+class ConversionPlanner(object):
+    def __init__(
+        self, dataflow: Dataflow, kstat: KStat, *args, **kwargs
+    ) -> ConversionPlanner:
+        super().__init__(*args, **kwargs)
+        self._dataflow: Dataflow = dataflow
+        self._kstat: KStat = kstat
+        self._defaults: Dict[str, int] = {
+            value.name: value.forced_layout for value in dataflow.values
+        }
+        self._tables: Dict[str, Dict[int, Dict[int, float]]] = {}
+
+    def plan(self, schedule: Schedule) -> Schedule:
+        # Every dispatch reading a value may read it in another layout through
+        # a conversion kernel, and a value only dispatches touch may also be
+        # stored in another layout. Values are revisited until no such move
+        # makes the dispatches around them faster, conversions included.
+        layouts: Dict[str, int] = dict(schedule.ids)
+        uses: Dict[Tuple[str, int], int] = {}
+        candidates: List[Tuple[DataflowValue, List[DataflowNode], bool]] = []
+        for value in self._dataflow.values:
+            users: List[DataflowNode] = [*dict.fromkeys(value.users)]
+            readers: List[DataflowNode] = [
+                user
+                for user in users
+                if user.schedule_layout and not self._is_tied(user, value)
+            ]
+            if readers and self._conversions(value):
+                movable: bool = (
+                    value.owner.schedule_layout
+                    and not self._is_tied(value.owner, value)
+                    and len(readers) == len(users)
+                )
+                candidates += [(value, readers, movable)]
+        changed: bool = True
+        while changed:
+            changed = False
+            for value, readers, movable in candidates:
+                changed |= self._improve(value, readers, movable, layouts, uses)
+        result: Schedule = Schedule(layouts)
+        for (name, user), layout in uses.items():
+            result[Schedule.use_key(name, user)] = layout
+        return result
+
+    def evaluate(self, schedule: Schedule) -> float:
+        # The time of the dispatches under the schedule, with the conversions
+        # its use keys ask for.
+        layouts: Dict[str, int] = schedule.ids
+        uses: Dict[Tuple[str, int], int] = {}
+        cost: float = 0.0
+        for node in self._dataflow.nodes:
+            if not (node.schedule_layout or node.propagate_layout):
+                continue
+            for arg in node.inputs:
+                layout: Optional[int] = schedule.get_id(
+                    Schedule.use_key(arg.name, node.index)
+                )
+                if layout is not None:
+                    uses[arg.name, node.index] = layout
+            cost += self._cost(node, None, -1, layouts, uses)
+        # Readers converting a value to the same layout share one conversion.
+        conversions: Dict[Tuple[str, int], DataflowValue] = {}
+        for value in self._dataflow.values:
+            for user in value.users:
+                layout: Optional[int] = uses.get((value.name, user.index))
+                if layout is not None:
+                    conversions[value.name, layout] = value
+        for (name, target), value in conversions.items():
+            source: int = layouts.get(name, self._defaults[name])
+            if target != source:
+                cost += self._conversions(value).get(source, {}).get(target, np.inf)
+        return cost
+
+    def _improve(
+        self,
+        value: DataflowValue,
+        readers: List[DataflowNode],
+        movable: bool,
+        layouts: Dict[str, int],
+        uses: Dict[Tuple[str, int], int],
+    ) -> bool:
+        conversions: Dict[int, Dict[int, float]] = self._conversions(value)
+        name: str = value.name
+        current: int = layouts.get(name, self._defaults[name])
+        reads: Dict[int, int] = {
+            reader.index: uses.get((name, reader.index), current) for reader in readers
+        }
+        best: float = self._plan_cost(value, readers, current, reads, layouts, uses)
+        if not np.isfinite(best):
+            return False
+        selected: Tuple[int, Dict[int, int]] = (current, reads)
+        storages: List[int] = [current]
+        for storage in storages:
+            reads = self._read_layouts(value, readers, storage, layouts, uses)
+            cost: float = self._plan_cost(value, readers, storage, reads, layouts, uses)
+            if cost < best:
+                best = cost
+                selected = (storage, reads)
+            # Storing the value in a layout some reader converts it to saves
+            # that conversion, so those layouts are tried as well.
+            if movable and storage == current:
+                storages += [
+                    layout
+                    for layout in dict.fromkeys(reads.values())
+                    if layout != current and layout in conversions
+                ]
+        storage, reads = selected
+        if storage == current and all(
+            uses.get((name, user), current) == layout for user, layout in reads.items()
+        ):
+            return False
+        layouts[name] = storage
+        for user, layout in reads.items():
+            if layout == storage:
+                uses.pop((name, user), None)
+            else:
+                uses[name, user] = layout
+        return True
+
+    def _read_layouts(
+        self,
+        value: DataflowValue,
+        readers: List[DataflowNode],
+        storage: int,
+        layouts: Dict[str, int],
+        uses: Dict[Tuple[str, int], int],
+    ) -> Dict[int, int]:
+        conversions: Dict[int, float] = self._conversions(value).get(storage, {})
+        reads: Dict[int, int] = {}
+        for reader in readers:
+            best: float = self._cost(reader, value.name, storage, layouts, uses)
+            reads[reader.index] = storage
+            for layout, conversion in conversions.items():
+                if layout == storage:
+                    continue
+                cost: float = conversion + self._cost(
+                    reader, value.name, layout, layouts, uses
+                )
+                if cost < best:
+                    best = cost
+                    reads[reader.index] = layout
+        return reads
+
+    def _plan_cost(
+        self,
+        value: DataflowValue,
+        readers: List[DataflowNode],
+        storage: int,
+        reads: Dict[int, int],
+        layouts: Dict[str, int],
+        uses: Dict[Tuple[str, int], int],
+    ) -> float:
+        # Readers converting to the same layout share one conversion.
+        conversions: Dict[int, float] = self._conversions(value).get(storage, {})
+        cost: float = sum(
+            conversions.get(layout, np.inf) for layout in {*reads.values()} - {storage}
+        )
+        if value.owner.schedule_layout:
+            cost += self._cost(value.owner, value.name, storage, layouts, uses)
+        for reader in readers:
+            cost += self._cost(reader, value.name, reads[reader.index], layouts, uses)
+        return cost
+
+    def _cost(
+        self,
+        node: DataflowNode,
+        name: Optional[str],
+        layout: int,
+        layouts: Dict[str, int],
+        uses: Dict[Tuple[str, int], int],
+    ) -> float:
+        # The time of the node with the value of the given name in the given
+        # layout, and every other argument as currently planned.
+        table: Dict[Tuple[int, ...], float] = get_ids(node, self._kstat)
+        arity: int = len(next(iter(table))) if table else 0
+        key: Tuple[int, ...] = tuple(
+            (
+                layout
+                if arg.name == name
+                else uses.get(
+                    (arg.name, node.index),
+                    layouts.get(arg.name, self._defaults[arg.name]),
+                )
+            )
+            for arg in node.inputs
+        ) + tuple(
+            (
+                layout
+                if arg.name == name
+                else layouts.get(arg.name, self._defaults[arg.name])
+            )
+            for arg in node.outputs
+        )
+        return table.get(key[:arity], np.inf)
+
+    def _conversions(self, value: DataflowValue) -> Dict[int, Dict[int, float]]:
+        # The times of the conversion kernel for the shape of the value, by
+        # source and then target layout.
+        name: str = transpose_kernel_name(value.shape, value.dtype)
+        table: Optional[Dict[int, Dict[int, float]]] = self._tables.get(name)
+        if table is None:
+            table = transpose_times(self._kstat, value.shape, value.dtype)
+            self._tables[name] = table
+        return table
+
+    @staticmethod
+    def _is_tied(node: DataflowNode, value: DataflowValue) -> bool:
+        # Tied results alias an operand, so neither may be converted apart.
+        if not node.tied_operands:
+            return False
+        tied: List[int] = [idx for idx in node.tied_operands if idx >= 0]
+        return any(
+            node.inputs[idx] is value for idx in tied if idx < len(node.inputs)
+        ) or any(
+            output is value and idx >= 0
+            for output, idx in zip(node.outputs, node.tied_operands)
+        )
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import iree.compiler.dialects.arith
+import iree.compiler.dialects.flow
+import iree.compiler.dialects.hal
+import iree.compiler.dialects.util
+import iree.compiler.ir
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ..utils import default_layout_id, intern_layout, permute_shape
+
+
+class DataflowValue(object):
+    __slots__ = ("index", "name", "shape", "dtype", "owner", "users", "boundary")
+
+    def __init__(
+        self,
+        index: int,
+        name: str,
+        shape: Tuple[int, ...],
+        dtype: str,
+        owner: DataflowNode,
+        *args,
+        **kwargs,
+    ) -> DataflowValue:
+        super().__init__(*args, **kwargs)
+        self.index: int = index
+        self.name: str = name
+        self.shape: Tuple[int, ...] = shape
+        self.dtype: str = dtype
+        self.owner: DataflowNode = owner
+        self.users: List[DataflowNode] = []
+        self.boundary: Optional[int] = None
+
+    def __repr__(self) -> str:
+        return f"{self.name}: {'x'.join(map(str, self.shape + (self.dtype,)))}"
+
+    @property
+    def forced_layout(self) -> int:
+        # The layout declared for a model input or output, or else the default
+        # one, wherever an op pins the layout of the value.
+        if self.boundary is None:
+            return default_layout_id(len(self.shape))
+        return self.boundary
+
+
+class DataflowNode(object):
+    __slots__ = (
+        "index",
+        "name",
+        "entry",
+        "inputs",
+        "outputs",
+        "tied_operands",
+        "schedule_layout",
+        "force_layout",
+        "any_layout",
+        "propagate_layout",
+    )
+
+    def __init__(
+        self,
+        index: int,
+        name: str,
+        entry: Optional[str],
+        tied_operands: Optional[List[int]],
+        schedule_layout: bool,
+        force_layout: bool,
+        any_layout: bool,
+        propagate_layout: bool,
+        *args,
+        **kwargs,
+    ) -> DataflowNode:
+        super().__init__(*args, **kwargs)
+        self.index: int = index
+        self.name: str = name
+        self.entry: Optional[str] = entry
+        self.inputs: List[DataflowValue] = []
+        self.outputs: List[DataflowValue] = []
+        self.tied_operands: Optional[List[int]] = tied_operands
+        self.schedule_layout: bool = schedule_layout
+        self.force_layout: bool = force_layout
+        self.any_layout: bool = any_layout
+        self.propagate_layout: bool = propagate_layout
+
+    def __repr__(self) -> str:
+        return "{} = {}{}({})".format(
+            ", ".join(map(repr, self.outputs)),
+            self.name,
+            f" @{self.entry}" if self.entry else "",
+            ", ".join(value.name for value in self.inputs),
+        )
+
+
+class Dataflow(object):
+    __slots__ = ("nodes", "values")
+
+    _SCHEDULE_LAYOUT_OPS: Tuple[type, ...] = (iree.compiler.dialects.flow.DispatchOp,)
+    _FORCE_LAYOUT_OPS: Tuple[type, ...] = (
+        iree.compiler.dialects.hal.TensorBarrierOp,
+        iree.compiler.dialects.hal.TensorExportOp,
+        iree.compiler.dialects.hal.TensorImportOp,
+        iree.compiler.dialects.util.ReturnOp,
+    )
+    _ANY_LAYOUT_OPS: Tuple[type, ...] = (
+        iree.compiler.dialects.arith.ConstantOp,
+        iree.compiler.dialects.flow.TensorEmptyOp,
+        iree.compiler.dialects.flow.TensorSplatOp,
+        iree.compiler.dialects.util.GlobalLoadOp,
+    )
+    _PROPAGATE_LAYOUT_OPS: Tuple[type, ...] = (
+        iree.compiler.dialects.flow.TensorReshapeOp,
+        iree.compiler.dialects.flow.TensorUpdateOp,
+    )
+
+    def __init__(
+        self,
+        nodes: List[DataflowNode],
+        values: List[DataflowValue],
+        *args,
+        **kwargs,
+    ) -> Dataflow:
+        super().__init__(*args, **kwargs)
+        self.nodes: List[DataflowNode] = nodes
+        self.values: List[DataflowValue] = values
+
+    def __str__(self) -> str:
+        return "{}(\n{}\n)".format(
+            self.__class__.__name__,
+            "\n".join(f"  {node!r}" for node in self.nodes),
+        )
+
+    # Nodes and values reference each other, so they are pickled as flat
+    # records linked by index instead of a deeply recursive object graph.
+    def __getstate__(self) -> Tuple[List[Tuple[Any, ...]], List[Tuple[Any, ...]]]:
+        return (
+            [
+                (
+                    node.name,
+                    node.entry,
+                    node.tied_operands,
+                    node.schedule_layout,
+                    node.force_layout,
+                    node.any_layout,
+                    node.propagate_layout,
+                    [value.index for value in node.inputs],
+                    [value.index for value in node.outputs],
+                )
+                for node in self.nodes
+            ],
+            [
+                (
+                    value.name,
+                    value.shape,
+                    value.dtype,
+                    value.owner.index,
+                    value.boundary,
+                )
+                for value in self.values
+            ],
+        )
+
+    def __setstate__(
+        self, state: Tuple[List[Tuple[Any, ...]], List[Tuple[Any, ...]]]
+    ) -> None:
+        node_records, value_records = state
+        self.nodes: List[DataflowNode] = [
+            DataflowNode(index, *record[:7])
+            for index, record in enumerate(node_records)
+        ]
+        self.values: List[DataflowValue] = [
+            DataflowValue(index, name, shape, dtype, self.nodes[owner])
+            for index, (name, shape, dtype, owner, _) in enumerate(value_records)
+        ]
+        for value, (*_, boundary) in zip(self.values, value_records):
+            value.boundary = boundary
+        for node, (*_, inputs, outputs) in zip(self.nodes, node_records):
+            for index in inputs:
+                node.inputs += [self.values[index]]
+                self.values[index].users += [node]
+            node.outputs = [self.values[index] for index in outputs]
+
+    @staticmethod
+    def build(
+        func_op: iree.compiler.dialects.util.FuncOp,
+        boundaries: Dict[str, Tuple[int, ...]] = {},
+    ) -> Dataflow:
+        nodes: List[DataflowNode] = []
+        declared: Dict[str, DataflowValue] = {}
+        values: List[DataflowValue] = []
+        index: Dict[iree.compiler.ir.OpView, DataflowNode] = {}
+        table: Dict[iree.compiler.ir.Value, DataflowValue] = {}
+        for region in func_op.regions:
+            for block in region.blocks:
+                for op in block.operations:
+                    op: iree.compiler.ir.OpView = op.operation.opview
+                    node: DataflowNode = DataflowNode(
+                        len(nodes),
+                        op.operation.name,
+                        Dataflow._get_entry(op),
+                        (
+                            [attr.value for attr in op.tied_operands]
+                            if "tied_operands" in op.attributes
+                            else None
+                        ),
+                        isinstance(op, Dataflow._SCHEDULE_LAYOUT_OPS),
+                        isinstance(op, Dataflow._FORCE_LAYOUT_OPS),
+                        isinstance(op, Dataflow._ANY_LAYOUT_OPS),
+                        isinstance(op, Dataflow._PROPAGATE_LAYOUT_OPS),
+                    )
+                    for operand in op.operands:
+                        value: Optional[DataflowValue] = table.get(operand)
+                        if value is None and Dataflow._is_tensor(operand):
+                            owner: Optional[DataflowNode] = index.get(
+                                operand.owner.operation.opview
+                            )
+                            if owner is None:
+                                continue
+                            value = Dataflow._intern(operand, owner, table, values)
+                        if value is not None:
+                            node.inputs += [value]
+                            value.users += [node]
+                    index[op] = node
+                    for result in op.results:
+                        if Dataflow._is_tensor(result):
+                            node.outputs += [
+                                Dataflow._intern(result, node, table, values)
+                            ]
+                    name: Optional[str] = Dataflow._get_boundary(op)
+                    if name is not None and name in boundaries:
+                        declared[name] = (
+                            node.outputs[0]
+                            if isinstance(op, iree.compiler.dialects.hal.TensorImportOp)
+                            else node.inputs[0]
+                        )
+                    nodes += [node]
+        missing: List[str] = [name for name in boundaries if name not in declared]
+        if missing:
+            raise ValueError(f"No model inputs or outputs named {missing}.")
+        for name, value in declared.items():
+            layout: Tuple[int, ...] = tuple(boundaries[name])
+            # Kernels are only profiled for layouts keeping dims of size 1 in
+            # place.
+            if layout not in permute_shape(value.shape):
+                raise ValueError(
+                    f"Layout {layout} of {name} isn't supported for its shape {value.shape}."
+                )
+            layout_id: int = intern_layout(layout)
+            if value.boundary is not None and value.boundary != layout_id:
+                raise ValueError(
+                    f"Layouts declared for {value.name} disagree at {name}."
+                )
+            value.boundary = layout_id
+        return Dataflow(nodes, values)
+
+    @staticmethod
+    def _get_boundary(op: iree.compiler.ir.OpView) -> Optional[str]:
+        # Model inputs and outputs are named by their import and export ops.
+        if (
+            isinstance(
+                op,
+                (
+                    iree.compiler.dialects.hal.TensorImportOp,
+                    iree.compiler.dialects.hal.TensorExportOp,
+                ),
+            )
+            and "name" in op.attributes
+        ):
+            return iree.compiler.ir.StringAttr(op.attributes["name"]).value
+        return None
+
+    @staticmethod
+    def _get_entry(op: iree.compiler.ir.OpView) -> Optional[str]:
+        if isinstance(op, iree.compiler.dialects.flow.DispatchOp):
+            [entry_point] = op.entry_points
+            [_, name] = entry_point.value
+            return name
+        return None
+
+    @staticmethod
+    def _intern(
+        value: iree.compiler.ir.Value,
+        owner: DataflowNode,
+        table: Dict[iree.compiler.ir.Value, DataflowValue],
+        values: List[DataflowValue],
+    ) -> DataflowValue:
+        node_value: Optional[DataflowValue] = table.get(value)
+        if node_value is None:
+            tensor_type: iree.compiler.ir.RankedTensorType = value.type
+            node_value = DataflowValue(
+                len(values),
+                value.get_name(),
+                tuple(tensor_type.shape),
+                str(tensor_type.element_type),
+                owner,
+            )
+            table[value] = node_value
+            values += [node_value]
+        return node_value
+
+    @staticmethod
+    def _is_tensor(value: iree.compiler.ir.Value) -> bool:
+        owner: Union[
+            iree.compiler.ir.Operation, iree.compiler.ir.OpView, iree.compiler.ir.Block
+        ] = value.owner
+        return (
+            isinstance(owner, (iree.compiler.ir.Operation, iree.compiler.ir.OpView))
+            and isinstance(value.type, iree.compiler.ir.RankedTensorType)
+            and not isinstance(
+                owner.operation.opview, iree.compiler.dialects.arith.ConstantOp
+            )
+        )
@@ -1,32 +1,105 @@
 from __future__ import annotations
 
-import iree.compiler.ir
+import concurrent.futures
+import multiprocessing
+import pickle
+
+from typing import Iterator, List, Optional, Tuple
 
 from ..utils import KStat, Schedule, ScheduleGroup
 from .analyzer import Analyzer
+from .dataflow import Dataflow
+from .merge import ScheduleMerger
 from .scope import Graph
-from .wrapper import OpWrapper
-
-from typing import List
+from .scope.sequence import Sequence
 
 
 class DynamicProgramAnalyzer(Analyzer):
-    def __init__(self, *args, **kwargs) -> DynamicProgramAnalyzer:
-        super().__init__(*args, **kwargs)
-
-    def run(self, mod: str, kstat: KStat) -> Schedule:
-        with iree.compiler.ir.Context():
-            mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(mod)
-            wrappers: List[OpWrapper] = [
-                OpWrapper(op)
-                for region in self._filter_func_ops(mod.body.operations).regions
-                for block in region.blocks
-                for op in block.operations
-            ]
-            graph: Graph = Graph(wrappers)
-            group: ScheduleGroup = ScheduleGroup()
-            for subgraph in graph.partitioned():
+    # Below this many ops, starting the worker processes costs more than the
+    # analysis itself.
+    _MIN_PARALLEL_OPS: int = 1024
+    # The snapshot and kernel statistics each worker process receives once.
+    _shared: Optional[Tuple[Dataflow, KStat]] = None
+
+    def __init__(
+        self, statistic: Optional[str] = None, jobs: int = 1, *args, **kwargs
+    ) -> DynamicProgramAnalyzer:
+        super().__init__(statistic, *args, **kwargs)
+        self._jobs: int = jobs
+
+    @property
+    def jobs(self) -> int:
+        return self._jobs
+
+    def solve(self, dataflow: Dataflow, kstat: KStat) -> Schedule:
+        graph: Graph = Graph(dataflow.nodes)
+        merger: ScheduleMerger = ScheduleMerger(dataflow, kstat)
+        subgraphs: List[Graph] = graph.partitioned()
+        if self._jobs > 1 and len(dataflow.nodes) >= self._MIN_PARALLEL_OPS:
+            self._solve_parallel(dataflow, kstat, subgraphs, merger)
+        else:
+            for subgraph in subgraphs:
                 for seq in subgraph.pathify(kstat):
-                    group |= seq.schedule(kstat)
-            schedule: Schedule = group.merge()
-            return schedule
+                    merger |= seq.schedule(kstat)
+        schedule: Schedule = merger.merge()
+        return schedule
+
+    def _solve_parallel(
+        self,
+        dataflow: Dataflow,
+        kstat: KStat,
+        subgraphs: List[Graph],
+        merger: ScheduleMerger,
+    ) -> None:
+        # Components are pathified and then sequences scheduled in the worker
+        # processes, which only receive node indices into their own copy of
+        # the snapshot. The snapshot is pickled once for all workers. Results
+        # come back in submission order, so the merge votes exactly as the
+        # sequential loop does.
+        mp_context: multiprocessing.context.BaseContext = multiprocessing.get_context(
+            "spawn"
+        )
+        components: List[List[int]] = [
+            [wrapper.node.index for wrapper in subgraph] for subgraph in subgraphs
+        ]
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self._jobs,
+            mp_context=mp_context,
+            initializer=DynamicProgramAnalyzer._initialize,
+            initargs=(pickle.dumps((dataflow, kstat)),),
+        ) as executor:
+            paths: List[List[int]] = [
+                path
+                for component_paths in executor.map(
+                    DynamicProgramAnalyzer._pathify,
+                    components,
+                    chunksize=self._chunksize(len(components)),
+                )
+                for path in component_paths
+            ]
+            groups: Iterator[ScheduleGroup] = executor.map(
+                DynamicProgramAnalyzer._schedule,
+                paths,
+                chunksize=self._chunksize(len(paths)),
+            )
+            for group in groups:
+                merger |= group
+
+    def _chunksize(self, tasks: int) -> int:
+        return max(1, tasks // (self._jobs * 4))
+
+    @staticmethod
+    def _initialize(snapshot: bytes) -> None:
+        DynamicProgramAnalyzer._shared = pickle.loads(snapshot)
+
+    @staticmethod
+    def _pathify(component: List[int]) -> List[List[int]]:
+        dataflow, kstat = DynamicProgramAnalyzer._shared
+        graph: Graph = Graph(dataflow.nodes[index] for index in component)
+        return [[wrapper.node.index for wrapper in seq] for seq in graph.pathify(kstat)]
+
+    @staticmethod
+    def _schedule(path: List[int]) -> ScheduleGroup:
+        dataflow, kstat = DynamicProgramAnalyzer._shared
+        seq: Sequence = Sequence(dataflow.nodes[index] for index in path)
+        return seq.schedule(kstat)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import numpy as np
+import time
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils import KStat, Schedule
+from .analyzer import Analyzer
+from .dataflow import Dataflow, DataflowValue
+from .dp import DynamicProgramAnalyzer
+from .factor import Factor, FactorGraph
+
+Candidate = Tuple[float, Tuple[int, ...]]
+
+
+class ExactAnalyzer(Analyzer):
+    def __init__(
+        self,
+        statistic: Optional[str] = None,
+        time_limit: float = 60.0,
+        *args,
+        **kwargs,
+    ) -> ExactAnalyzer:
+        super().__init__(statistic, *args, **kwargs)
+        self._time_limit: float = time_limit
+        self._lower_bound: float = 0.0
+        self._upper_bound: float = 0.0
+        self._heuristic: float = 0.0
+        self._bounded: bool = True
+
+    @property
+    def gap(self) -> Optional[float]:
+        # No gap is known while no schedule with a finite time was found, or
+        # once conversions beat the bound.
+        if not self._bounded or not np.isfinite(self._upper_bound):
+            return None
+        if self._upper_bound > 0.0:
+            return (self._upper_bound - self._lower_bound) / self._upper_bound
+        return 0.0
+
+    @property
+    def lower_bound(self) -> float:
+        return self._lower_bound
+
+    @property
+    def upper_bound(self) -> float:
+        return self._upper_bound
+
+    @property
+    def report(self) -> Dict[str, Any]:
+        # Infinite bounds are reported as null to keep the report valid JSON.
+        return {
+            **super().report,
+            "lower_bound": (
+                self._lower_bound if np.isfinite(self._lower_bound) else None
+            ),
+            "upper_bound": (
+                self._upper_bound if np.isfinite(self._upper_bound) else None
+            ),
+            "gap": self.gap,
+            "heuristic": self._heuristic,
+            "optimal": self._bounded and self._lower_bound >= self._upper_bound,
+        }
+
+    def solve(self, dataflow: Dataflow, kstat: KStat) -> Schedule:
+        # The time limit only bounds the search. The path decomposition
+        # seeding it can't be interrupted and runs before the clock starts.
+        incumbent: Schedule = DynamicProgramAnalyzer(self._statistic).solve(
+            dataflow, kstat
+        )
+        deadline: float = time.perf_counter() + self._time_limit
+        graph: FactorGraph = FactorGraph(dataflow, kstat)
+        self._heuristic = graph.evaluate(incumbent)
+        rows: Dict[Factor, int] = {}
+        self._lower_bound = 0.0
+        self._upper_bound = 0.0
+        self._bounded = True
+        for component in graph.components():
+            component.sort(key=lambda factor: factor.node.index)
+            best, lower, upper = self._search(component, incumbent, deadline)
+            if best is None:
+                # No consistent assignment of the kernel tables was found, so
+                # the heuristic layouts are kept as they are.
+                upper = sum(graph.cost(factor, incumbent) for factor in component)
+            else:
+                rows.update(best)
+            self._lower_bound += min(lower, upper)
+            self._upper_bound += upper
+        return graph.schedule(rows, incumbent)
+
+    def _converted(self, solved: float, converted: float) -> None:
+        # The lower bound only holds for schedules without conversions, so it
+        # bounds nothing once conversions make the schedule faster.
+        if converted < solved:
+            self._upper_bound = converted
+            self._bounded = False
+
+    @staticmethod
+    def _search(
+        factors: List[Factor], incumbent: Schedule, deadline: float
+    ) -> Tuple[Optional[Dict[Factor, int]], float, float]:
+        # Depth-first branch and bound over the factors in program order. At
+        # each level the candidates are the rows consistent with the linking
+        # variables fixed by the earlier levels, sorted by cost, so a level is
+        # exhausted as soon as one candidate exceeds the incumbent.
+        slots: Dict[DataflowValue, int] = {}
+        owners: List[int] = []
+        keys: List[List[int]] = []
+        frees: List[List[Tuple[int, int]]] = []
+        candidates: List[Dict[Tuple[int, ...], List[Candidate]]] = []
+        for level, factor in enumerate(factors):
+            fixed: List[int] = [
+                idx for idx, var in enumerate(factor.variables) if var in slots
+            ]
+            free: List[int] = [
+                idx for idx, var in enumerate(factor.variables) if var not in slots
+            ]
+            for idx in free:
+                slots[factor.variables[idx]] = len(slots)
+            keys += [[slots[factor.variables[idx]] for idx in fixed]]
+            frees += [[(idx, slots[factor.variables[idx]]) for idx in free]]
+            table: Dict[Tuple[int, ...], List[Candidate]] = {}
+            for layouts, (cost, _) in sorted(
+                factor.table.items(), key=lambda item: item[1][0]
+            ):
+                table.setdefault(tuple(layouts[idx] for idx in fixed), []).append(
+                    (cost, layouts)
+                )
+            candidates += [table]
+        # Once every linking variable of a later factor is assigned, its bound
+        # tightens from its cheapest row to its cheapest consistent row.
+        levels: Dict[int, int] = {}
+        for level, free in enumerate(frees):
+            for _, slot in free:
+                levels[slot] = level
+        dependents: List[List[int]] = [[] for _ in factors]
+        for level, key in enumerate(keys):
+            if key:
+                dependents[max(levels[slot] for slot in key)] += [level]
+        mins: List[float] = [factor.min_cost for factor in factors]
+        suffix: List[float] = [0.0] * (len(factors) + 1)
+        for idx in range(len(factors) - 1, -1, -1):
+            suffix[idx] = suffix[idx + 1] + mins[idx]
+        # The incumbent keeps the linking layouts of the heuristic schedule and
+        # takes the cheapest rows for them.
+        best: Optional[List[Tuple[int, ...]]] = [
+            tuple(incumbent.get_id(var.name, -1) for var in factor.variables)
+            for factor in factors
+        ]
+        best_cost: float = 0.0
+        for factor, layouts in zip(factors, best):
+            cost, _ = factor.table.get(layouts, (np.inf, None))
+            best_cost += cost
+        if best_cost == np.inf:
+            best = None
+        if suffix[0] == np.inf:
+            return None, np.inf, np.inf
+        assignment: List[int] = [-1] * len(slots)
+        choices: List[Tuple[int, ...]] = [()] * len(factors)
+        prefix: List[float] = [0.0] * (len(factors) + 1)
+        tightening: List[float] = [0.0] * (len(factors) + 1)
+        gains: List[float] = [0.0] * len(factors)
+        queues: List[List[Candidate]] = [[]] * len(factors)
+        cursors: List[int] = [0] * len(factors)
+        level: int = 0
+        queues[0] = candidates[0].get((), [])
+        steps: int = 0
+        timeout: bool = False
+        while level >= 0:
+            steps += 1
+            if steps % 4096 == 0 and time.perf_counter() > deadline:
+                timeout = True
+                break
+            if cursors[level] >= len(queues[level]):
+                level -= 1
+                continue
+            cost, layouts = queues[level][cursors[level]]
+            total: float = prefix[level] + cost
+            if (
+                total + suffix[level + 1] + tightening[level] - gains[level]
+                >= best_cost
+            ):
+                cursors[level] = len(queues[level])
+                continue
+            cursors[level] += 1
+            for idx, slot in frees[level]:
+                assignment[slot] = layouts[idx]
+            tighten: float = tightening[level] - gains[level]
+            for dependent in dependents[level]:
+                queue: List[Candidate] = candidates[dependent].get(
+                    tuple(assignment[slot] for slot in keys[dependent]), []
+                )
+                gains[dependent] = queue[0][0] - mins[dependent] if queue else np.inf
+                tighten += gains[dependent]
+            if total + suffix[level + 1] + tighten >= best_cost:
+                continue
+            choices[level] = layouts
+            prefix[level + 1] = total
+            tightening[level + 1] = tighten
+            if level + 1 == len(factors):
+                best_cost = total
+                best = [*choices]
+                continue
+            level += 1
+            queues[level] = candidates[level].get(
+                tuple(assignment[slot] for slot in keys[level]), []
+            )
+            cursors[level] = 0
+        lower_bound: float = best_cost
+        if timeout:
+            for idx in range(level + 1):
+                if cursors[idx] < len(queues[idx]):
+                    cost, _ = queues[idx][cursors[idx]]
+                    lower_bound = min(
+                        lower_bound,
+                        prefix[idx]
+                        + cost
+                        + suffix[idx + 1]
+                        + tightening[idx]
+                        - gains[idx],
+                    )
+        if best is None:
+            return None, lower_bound, best_cost
+        rows: Dict[Factor, int] = {
+            factor: factor.table[layouts][1] for factor, layouts in zip(factors, best)
+        }
+        return rows, lower_bound, best_cost
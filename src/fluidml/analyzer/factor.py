@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import numpy as np
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..utils import KStat, Schedule, default_layout_id
+from .dataflow import Dataflow, DataflowNode, DataflowValue
+from .propagate import get_arrays, get_ids
+
+
+class Factor(object):
+    __slots__ = (
+        "node",
+        "args",
+        "columns",
+        "arity",
+        "keys",
+        "times",
+        "variables",
+        "table",
+    )
+
+    def __init__(
+        self,
+        node: DataflowNode,
+        kstat: KStat,
+        fixed: Dict[DataflowValue, int],
+        linking: Set[DataflowValue],
+        *args,
+        **kwargs,
+    ) -> Factor:
+        super().__init__(*args, **kwargs)
+        keys, times = get_arrays(node, kstat)
+        self.node: DataflowNode = node
+        self.args: List[DataflowValue] = node.inputs + node.outputs
+        self.arity: int = keys.shape[1]
+        assert (
+            0 <= len(self.args) - self.arity <= 1
+        ), f"The arity {self.arity} of {node.entry} doesn't match the args of {node}."
+        # Tied results share the layout of the operand they are tied to.
+        self.columns: List[int] = [
+            (
+                idx
+                if idx < self.arity
+                else (
+                    node.tied_operands[idx - len(node.inputs)]
+                    if node.tied_operands
+                    and node.tied_operands[idx - len(node.inputs)] >= 0
+                    else self.arity - 1
+                )
+            )
+            for idx in range(len(self.args))
+        ]
+        mask: np.ndarray = np.ones(len(times), dtype=bool)
+        first: Dict[DataflowValue, int] = {}
+        for arg, column in zip(self.args, self.columns):
+            if arg in fixed:
+                mask &= keys[:, column] == fixed[arg]
+            if arg in first:
+                mask &= keys[:, column] == keys[:, first[arg]]
+            else:
+                first[arg] = column
+        self.keys: np.ndarray = keys[mask]
+        self.times: np.ndarray = times[mask]
+        self.variables: Tuple[DataflowValue, ...] = tuple(
+            arg for arg in first if arg in linking
+        )
+        # Layouts of the values no other kernel reads or writes are free, so
+        # each assignment of the linking variables keeps its cheapest row.
+        self.table: Dict[Tuple[int, ...], Tuple[float, int]] = {}
+        projection: List[Tuple[int, ...]] = list(
+            map(tuple, self.keys[:, [first[var] for var in self.variables]].tolist())
+        )
+        for row in np.argsort(self.times, kind="stable").tolist():
+            self.table.setdefault(projection[row], (float(self.times[row]), row))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.node!r})"
+
+    @property
+    def min_cost(self) -> float:
+        return min((cost for cost, _ in self.table.values()), default=np.inf)
+
+    def assign(self, row: int) -> Dict[DataflowValue, int]:
+        return {
+            arg: int(self.keys[row, column])
+            for arg, column in zip(self.args, self.columns)
+        }
+
+
+class FactorGraph(object):
+    def __init__(
+        self, dataflow: Dataflow, kstat: KStat, *args, **kwargs
+    ) -> FactorGraph:
+        super().__init__(*args, **kwargs)
+        self._dataflow: Dataflow = dataflow
+        self._kstat: KStat = kstat
+        self._fixed: Dict[DataflowValue, int] = {
+            value: value.forced_layout
+            for node in dataflow.nodes
+            if node.force_layout
+            for value in node.inputs + node.outputs
+        }
+        dispatches: List[DataflowNode] = [
+            node
+            for node in dataflow.nodes
+            if node.schedule_layout or node.propagate_layout
+        ]
+        counts: Dict[DataflowValue, int] = {}
+        for node in dispatches:
+            for value in {*node.inputs, *node.outputs}:
+                counts[value] = counts.get(value, 0) + 1
+        linking: Set[DataflowValue] = {
+            value
+            for value, count in counts.items()
+            if count > 1 and value not in self._fixed
+        }
+        self._factors: List[Factor] = [
+            Factor(node, kstat, self._fixed, linking) for node in dispatches
+        ]
+
+    @property
+    def factors(self) -> List[Factor]:
+        return self._factors
+
+    @property
+    def fixed(self) -> Dict[DataflowValue, int]:
+        return self._fixed
+
+    def components(self) -> List[List[Factor]]:
+        parents: List[int] = [*range(len(self._factors))]
+
+        def find(idx: int) -> int:
+            while parents[idx] != idx:
+                parents[idx] = parents[parents[idx]]
+                idx = parents[idx]
+            return idx
+
+        owners: Dict[DataflowValue, int] = {}
+        for idx, factor in enumerate(self._factors):
+            for var in factor.variables:
+                owner: Optional[int] = owners.setdefault(var, idx)
+                parents[find(idx)] = find(owner)
+        components: Dict[int, List[Factor]] = {}
+        for idx, factor in enumerate(self._factors):
+            components.setdefault(find(idx), []).append(factor)
+        return [*components.values()]
+
+    def cost(self, factor: Factor, schedule: Schedule) -> float:
+        layouts: Tuple[int, ...] = tuple(
+            schedule.get_id(arg.name, default_layout_id(len(arg.shape)))
+            for arg in factor.args
+        )[: factor.arity]
+        return get_ids(factor.node, self._kstat).get(layouts, np.inf)
+
+    def evaluate(self, schedule: Schedule) -> float:
+        return sum(self.cost(factor, schedule) for factor in self._factors)
+
+    def schedule(
+        self, rows: Dict[Factor, int], fallback: Optional[Schedule] = None
+    ) -> Schedule:
+        schedule: Schedule = Schedule(
+            {
+                value.name: default_layout_id(len(value.shape))
+                for value in self._dataflow.values
+            }
+        )
+        if fallback is not None:
+            for name, layout in fallback.ids.items():
+                schedule[name] = layout
+        for value, layout in self._fixed.items():
+            schedule[value.name] = layout
+        for factor, row in rows.items():
+            for value, layout in factor.assign(row).items():
+                schedule[value.name] = layout
+        return schedule
@@ -1,88 +1,159 @@
 from __future__ import annotations
 
-import iree.compiler.ir
+import heapq
+import numpy as np
 
 from ..utils import KStat, Schedule, is_default_layout
 from .analyzer import Analyzer
+from .dataflow import Dataflow, DataflowNode, DataflowValue
 from .scope.graph import Graph
 from .wrapper import OpWrapper
 
 from typing import Dict, List, Optional, Set, Tuple
 
+# The layout ids and times of a kernel, the rows of each layout per argument
+# column, and the time of the default layout.
+KTableIndex = Tuple[np.ndarray, np.ndarray, List[Dict[int, np.ndarray]], float]
+
 
 class GreedyAnalyzer(Analyzer):
     def __init__(self, *args, **kwargs) -> GreedyAnalyzer:
         super().__init__(*args, **kwargs)
 
-    def run(self, mod: str, kstat: KStat) -> Schedule:
-        with iree.compiler.ir.Context():
-            mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(mod)
-            wrappers: List[OpWrapper] = [
-                OpWrapper(op)
-                for region in self._filter_func_ops(mod.body.operations).regions
-                for block in region.blocks
-                for op in block.operations
-            ]
-            graph: Graph = Graph(wrappers)
-            schedule: Schedule = Schedule()
-            for wrapper in graph.iter():
-                if wrapper.force_layout:
-                    for arg in wrapper.args:
-                        arg_name: str = arg.get_name()
-                        layout = tuple(range(len(arg.type.shape)))
-                        schedule[arg_name] = layout
-            schedule_wrappers: Set[OpWrapper] = {
-                wrapper for wrapper in graph.iter() if wrapper.schedule_layout
-            }
-            while schedule_wrappers:
-                candidates: List[Tuple[OpWrapper, Tuple[int, ...], float]] = []
-                for wrapper in schedule_wrappers:
-                    entry: str = wrapper.entry
-                    ktable: Dict[Tuple[Tuple[int, ...], ...], float] = kstat[entry]
-                    [(_, default_timecost)] = [
-                        (k, v) for k, v in ktable.items() if is_default_layout(k)
-                    ]
-                    (best_layout, best_timecost) = self._find_best_layout(
-                        wrapper, schedule, ktable
-                    )
-                    candidates += [
-                        (
-                            wrapper,
-                            best_layout,
-                            default_timecost - best_timecost,
-                        )
-                    ]
-                candidate, best_layout, _ = max(candidates, key=lambda x: x[2])
-                schedule_wrappers.remove(candidate)
-                for arg in candidate.args:
-                    name: str = arg.get_name()
-                    if name not in schedule:
-                        index: int = candidate.arg_index(arg)
-                        schedule[name] = best_layout[index]
+    def solve(self, dataflow: Dataflow, kstat: KStat) -> Schedule:
+        graph: Graph = Graph(dataflow.nodes)
+        schedule: Schedule = Schedule()
+        # Results tied to an operand share its layout, so fixing either one
+        # fixes the other, or a dispatch could find no row left to match.
+        tied: Dict[DataflowValue, List[DataflowValue]] = {}
+        for wrapper in graph.iter():
+            if wrapper.schedule_layout and wrapper.tied_operands:
+                for output, idx in zip(wrapper.node.outputs, wrapper.tied_operands):
+                    if idx >= 0:
+                        input: DataflowValue = wrapper.node.inputs[idx]
+                        tied.setdefault(input, []).append(output)
+                        tied.setdefault(output, []).append(input)
+
+        def assign(value: DataflowValue, layout: int) -> List[DataflowValue]:
+            fixed: List[DataflowValue] = []
+            stack: List[DataflowValue] = [value]
+            while stack:
+                value = stack.pop()
+                if value.name not in schedule:
+                    schedule[value.name] = layout
+                    fixed += [value]
+                    stack += tied.get(value, [])
+            return fixed
+
+        # Values are fixed one at a time and never revisited, which could leave
+        # an op propagating layouts between two it can't connect, so those
+        # keep the default layout here.
+        for wrapper in graph.iter():
+            if wrapper.force_layout or wrapper.propagate_layout:
+                for arg in wrapper.args:
+                    schedule[arg.name] = arg.forced_layout
+        for value in [*tied]:
+            if value.name in schedule:
+                for partner in tied[value]:
+                    assign(partner, schedule.get_id(value.name))
+        schedule_wrappers: Set[OpWrapper] = {
+            wrapper for wrapper in graph.iter() if wrapper.schedule_layout
+        }
+        # Equal gains go to the dispatch met first when scanning the set, and
+        # removing entries doesn't reorder a set, so the scan order is ranked
+        # once.
+        wrappers: List[OpWrapper] = [*schedule_wrappers]
+        ranks: Dict[DataflowNode, int] = {
+            wrapper.node: rank for rank, wrapper in enumerate(wrappers)
+        }
+        indexes: Dict[str, KTableIndex] = {}
+        bests: List[Tuple[Tuple[int, ...], float]] = [((), 0.0)] * len(wrappers)
+        versions: List[int] = [0] * len(wrappers)
+        heap: List[Tuple[float, int, int]] = []
+
+        def update(rank: int) -> None:
+            wrapper: OpWrapper = wrappers[rank]
+            index: Optional[KTableIndex] = indexes.get(wrapper.entry)
+            if index is None:
+                index = self._index(wrapper.entry, kstat)
+                indexes[wrapper.entry] = index
+            *_, default_timecost = index
+            best_layout, best_timecost = self._find_best_layout(
+                wrapper, schedule, index
+            )
+            bests[rank] = (best_layout, best_timecost)
+            versions[rank] += 1
+            heapq.heappush(
+                heap, (best_timecost - default_timecost, rank, versions[rank])
+            )
+
+        for rank in range(len(wrappers)):
+            update(rank)
+        while heap:
+            _, rank, version = heapq.heappop(heap)
+            if version != versions[rank]:
+                continue
+            versions[rank] = -1
+            candidate: OpWrapper = wrappers[rank]
+            best_layout, _ = bests[rank]
+            affected: Set[int] = set()
+            for arg in candidate.args:
+                if arg.name not in schedule:
+                    index: int = candidate.arg_index(arg)
+                    # Only the dispatches reading or writing a newly fixed
+                    # value can change their best layout.
+                    for value in assign(arg, best_layout[index]):
+                        for node in [value.owner, *value.users]:
+                            neighbor: Optional[int] = ranks.get(node)
+                            if neighbor is not None and versions[neighbor] >= 0:
+                                affected.add(neighbor)
+            for neighbor in sorted(affected):
+                update(neighbor)
         return schedule
 
+    @staticmethod
+    def _index(entry: str, kstat: KStat) -> KTableIndex:
+        assert entry in kstat, f"Kernel {entry} not found in kstat."
+        keys, times = kstat.get_arrays(entry)
+        columns: List[Dict[int, np.ndarray]] = [
+            {
+                layout: np.flatnonzero(keys[:, column] == layout)
+                for layout in np.unique(keys[:, column]).tolist()
+            }
+            for column in range(keys.shape[1])
+        ]
+        [default] = [
+            row for row, key in enumerate(keys.tolist()) if is_default_layout(key)
+        ]
+        return keys, times, columns, float(times[default])
+
     @staticmethod
     def _find_best_layout(
         wrapper: OpWrapper,
         schedule: Schedule,
-        ktable: Dict[Tuple[Tuple[int, ...], ...], float],
-    ) -> Tuple[Tuple[Tuple[int, ...], ...], float]:
-        assigned_layouts: Tuple[Optional[Tuple[int, ...]], ...] = tuple(
-            v
-            for _, v in sorted(
-                (
-                    (
-                        wrapper.arg_index(arg),
-                        schedule.get(arg.get_name()),
-                    )
-                    for arg in wrapper.args
-                ),
-                key=lambda x: x[0],
+        index: KTableIndex,
+    ) -> Tuple[Tuple[int, ...], float]:
+        keys, times, columns, _ = index
+        assigned: List[Tuple[int, int]] = [
+            (column, layout)
+            for column, layout in (
+                (wrapper.arg_index(arg), schedule.get_id(arg.name))
+                for arg in wrapper.args
             )
-        )
-        fktable: Dict[Tuple[Tuple[int, ...], ...], float] = {
-            k: v
-            for k, v in ktable.items()
-            if all(b is None or a == b for a, b in zip(k, assigned_layouts))
-        }
-        return min(fktable.items(), key=lambda x: x[1])
+            if layout is not None and column < keys.shape[1]
+        ]
+        empty: np.ndarray = np.empty(0, dtype=np.int64)
+        # Start from the rows of the most selective assigned argument and
+        # filter them by the others, keeping the rows in kernel table order.
+        rows: np.ndarray = np.arange(len(times))
+        if assigned:
+            selections: List[np.ndarray] = [
+                columns[column].get(layout, empty) for column, layout in assigned
+            ]
+            first: int = min(range(len(assigned)), key=lambda idx: len(selections[idx]))
+            rows = selections[first]
+            for column, layout in assigned:
+                rows = rows[keys[rows, column] == layout]
+        assert len(rows), f"No layout of {wrapper.entry} matches the schedule."
+        best: int = int(rows[np.argmin(times[rows])])
+        return tuple(keys[best].tolist()), float(times[best])
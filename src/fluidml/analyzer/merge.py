@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import numpy as np
+
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, List, Set, Tuple
+
+from ..utils import KStat, Schedule
+from .dataflow import Dataflow, DataflowNode
+from .propagate import get_ids
+
+
+class ScheduleMerger(object):
+    def __init__(
+        self, dataflow: Dataflow, kstat: KStat, *args, **kwargs
+    ) -> ScheduleMerger:
+        super().__init__(*args, **kwargs)
+        self._kstat: KStat = kstat
+        self._votes: Dict[str, Counter[int]] = {}
+        self._defaults: Dict[str, int] = {
+            value.name: value.forced_layout for value in dataflow.values
+        }
+        # Declared layouts of model inputs and outputs, and the layouts of the
+        # values ops like hal.tensor.import and export pin, are never voted on.
+        self._pinned: Dict[str, int] = {
+            value.name: value.forced_layout
+            for value in dataflow.values
+            if value.boundary is not None
+            or any(node.force_layout for node in [value.owner, *value.users])
+        }
+        self._dispatches: List[DataflowNode] = [
+            node
+            for node in dataflow.nodes
+            if node.schedule_layout or node.propagate_layout
+        ]
+        self._owners: Dict[str, List[int]] = {}
+        for idx, node in enumerate(self._dispatches):
+            for name in dict.fromkeys(arg.name for arg in node.inputs + node.outputs):
+                self._owners.setdefault(name, []).append(idx)
+
+    def __ior__(self, schedules: Iterable[Schedule]) -> ScheduleMerger:
+        return self.update(schedules)
+
+    def update(self, schedules: Iterable[Schedule]) -> ScheduleMerger:
+        # Only the votes per value are kept, not the schedules themselves.
+        for schedule in schedules:
+            for name, layout in schedule.ids.items():
+                self._votes.setdefault(name, Counter())[layout] += 1
+        return self
+
+    def merge(self) -> Schedule:
+        # The majority vote is the starting point. Every value with competing
+        # layouts then moves to the candidate with the least time over the
+        # dispatches reading or writing it, and its neighbors are revisited
+        # until no move helps.
+        assignment: Dict[str, int] = {}
+        for name, votes in self._votes.items():
+            [(layout, _)] = votes.most_common(1)
+            assignment[name] = layout
+        assignment.update(self._pinned)
+        conflicts: Dict[str, List[int]] = {
+            name: [*votes]
+            + [self._defaults[name]] * (self._defaults[name] not in votes)
+            for name, votes in self._votes.items()
+            if len(votes) > 1 and name in self._owners and name not in self._pinned
+        }
+        worklist: Deque[str] = deque(conflicts)
+        queued: Set[str] = {*conflicts}
+        while worklist:
+            name: str = worklist.popleft()
+            queued.discard(name)
+            current: int = assignment[name]
+            best: float = self._local_cost(name, current, assignment)
+            for layout in conflicts[name]:
+                cost: float = self._local_cost(name, layout, assignment)
+                if cost < best:
+                    best = cost
+                    assignment[name] = layout
+            if assignment[name] != current:
+                for idx in self._owners[name]:
+                    for neighbor in self._args(self._dispatches[idx]):
+                        if neighbor in conflicts and neighbor not in queued:
+                            worklist.append(neighbor)
+                            queued.add(neighbor)
+        # Dispatches sharing values are compared as a whole against the
+        # default layout, which the merged schedule must never be slower than.
+        defaults: Dict[str, int] = {}
+        for component in self._components():
+            names: Set[str] = {
+                name for idx in component for name in self._args(self._dispatches[idx])
+            }
+            merged: float = sum(
+                self._cost(self._dispatches[idx], assignment) for idx in component
+            )
+            default: float = sum(
+                self._cost(self._dispatches[idx], defaults) for idx in component
+            )
+            if default < merged:
+                for name in names & assignment.keys():
+                    assignment[name] = self._defaults[name]
+        return Schedule(assignment)
+
+    def _components(self) -> List[List[int]]:
+        parents: List[int] = [*range(len(self._dispatches))]
+
+        def find(idx: int) -> int:
+            while parents[idx] != idx:
+                parents[idx] = parents[parents[idx]]
+                idx = parents[idx]
+            return idx
+
+        for owners in self._owners.values():
+            for owner in owners[1:]:
+                parents[find(owner)] = find(owners[0])
+        components: Dict[int, List[int]] = {}
+        for idx in range(len(self._dispatches)):
+            components.setdefault(find(idx), []).append(idx)
+        return [*components.values()]
+
+    def _local_cost(self, name: str, layout: int, assignment: Dict[str, int]) -> float:
+        previous: int = assignment[name]
+        assignment[name] = layout
+        cost: float = sum(
+            self._cost(self._dispatches[idx], assignment) for idx in self._owners[name]
+        )
+        assignment[name] = previous
+        return cost
+
+    def _cost(self, node: DataflowNode, assignment: Dict[str, int]) -> float:
+        table: Dict[Tuple[int, ...], float] = get_ids(node, self._kstat)
+        arity: int = len(next(iter(table))) if table else 0
+        layouts: Tuple[int, ...] = tuple(
+            assignment.get(name, self._defaults[name]) for name in self._args(node)
+        )[:arity]
+        return table.get(layouts, np.inf)
+
+    @staticmethod
+    def _args(node: DataflowNode) -> List[str]:
+        return [arg.name for arg in node.inputs + node.outputs]
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import functools
+import numpy as np
+
+from itertools import permutations
+from typing import Dict, List, Tuple
+
+from ..utils import KStat, default_layout_id, intern_layout, permute_shape
+from .dataflow import Dataflow, DataflowNode, DataflowValue
+
+_RESHAPE: str = "flow.tensor.reshape"
+_UPDATE: str = "flow.tensor.update"
+
+
+def get_ids(node: DataflowNode, kstat: KStat) -> Dict[Tuple[int, ...], float]:
+    # The layout table of a node: the profiled times of a kernel, or no time at
+    # all for each combination of layouts an op propagates.
+    if node.propagate_layout:
+        return dict.fromkeys(
+            _propagations(
+                node.name, tuple(arg.shape for arg in node.inputs + node.outputs)
+            ),
+            0.0,
+        )
+    return kstat.get_ids(node.entry, {})
+
+
+def get_arrays(node: DataflowNode, kstat: KStat) -> Tuple[np.ndarray, np.ndarray]:
+    if node.propagate_layout:
+        rows: List[Tuple[int, ...]] = _propagations(
+            node.name, tuple(arg.shape for arg in node.inputs + node.outputs)
+        )
+        return (
+            np.array(rows, dtype=np.int64).reshape(
+                len(rows), len(node.inputs + node.outputs)
+            ),
+            np.zeros(len(rows)),
+        )
+    assert node.entry in kstat, f"Kernel {node.entry} not found in kstat."
+    return kstat.get_arrays(node.entry)
+
+
+def check_boundaries(dataflow: Dataflow) -> None:
+    # Declared layouts must pass through the ops next to their values together,
+    # as no conversion is planned in front of ops propagating layouts.
+    nodes: Dict[DataflowNode, None] = dict.fromkeys(
+        node
+        for value in dataflow.values
+        if value.boundary is not None
+        for node in [value.owner, *value.users]
+    )
+    for node in nodes:
+        if not node.propagate_layout:
+            continue
+        args: List[DataflowValue] = node.inputs + node.outputs
+        rows: List[Tuple[int, ...]] = _propagations(
+            node.name, tuple(arg.shape for arg in args)
+        )
+        if not any(
+            all(
+                layout == arg.boundary
+                for arg, layout in zip(args, row)
+                if arg.boundary is not None
+            )
+            for row in rows
+        ):
+            names: List[str] = [
+                *dict.fromkeys(arg.name for arg in args if arg.boundary is not None)
+            ]
+            raise ValueError(
+                f"The layouts declared for {', '.join(names)} can't pass through {node}."
+            )
+
+
+def reshape_layouts(
+    source: Tuple[int, ...], result: Tuple[int, ...]
+) -> List[Tuple[Tuple[int, ...], Tuple[int, ...]]]:
+    # A reshape only merges runs of source dims into result dims or splits
+    # them, so both shapes break into groups of dims of the same size. Moving
+    # whole groups around keeps the order of the elements within each group,
+    # so the reshape of the stored data is still a reshape, from the source
+    # layout into the result layout moving the groups alike.
+    if (
+        any(dim <= 0 for dim in source + result)
+        or not source
+        or not result
+        or np.prod(source) != np.prod(result)
+    ):
+        return [(tuple(range(len(source))), tuple(range(len(result))))]
+    groups: List[Tuple[List[int], List[int]]] = []
+    idx: int = 0
+    jdx: int = 0
+    while idx < len(source) and jdx < len(result):
+        source_group: List[int] = [idx]
+        result_group: List[int] = [jdx]
+        source_size: int = source[idx]
+        result_size: int = result[jdx]
+        idx += 1
+        jdx += 1
+        while source_size != result_size:
+            if source_size < result_size:
+                source_group += [idx]
+                source_size *= source[idx]
+                idx += 1
+            else:
+                result_group += [jdx]
+                result_size *= result[jdx]
+                jdx += 1
+        groups += [(source_group, result_group)]
+    source_group, result_group = groups[-1]
+    source_group += [*range(idx, len(source))]
+    result_group += [*range(jdx, len(result))]
+    # Dims of size 1 stay in place in every layout a kernel is profiled for.
+    source_layouts: List[Tuple[int, ...]] = [*permute_shape(source)]
+    result_layouts: List[Tuple[int, ...]] = [*permute_shape(result)]
+    layouts: List[Tuple[Tuple[int, ...], Tuple[int, ...]]] = []
+    for order in permutations(groups):
+        source_layout: Tuple[int, ...] = tuple(dim for dims, _ in order for dim in dims)
+        result_layout: Tuple[int, ...] = tuple(dim for _, dims in order for dim in dims)
+        if source_layout in source_layouts and result_layout in result_layouts:
+            layouts += [(source_layout, result_layout)]
+    return layouts
+
+
+@functools.lru_cache(maxsize=None)
+def _propagations(
+    name: str, shapes: Tuple[Tuple[int, ...], ...]
+) -> List[Tuple[int, ...]]:
+    if name == _RESHAPE and len(shapes) == 2:
+        source, result = shapes
+        return [
+            (intern_layout(source_layout), intern_layout(result_layout))
+            for source_layout, result_layout in reshape_layouts(source, result)
+        ]
+    elif name == _UPDATE and len(shapes) == 3:
+        # The update is written into the target in place, so the target, the
+        # update and the result all share one layout.
+        target, *_ = shapes
+        layouts: List[Tuple[int, ...]] = [
+            layout
+            for layout in permute_shape(target)
+            if all(layout in [*permute_shape(shape)] for shape in shapes)
+        ]
+        return [(intern_layout(layout),) * len(shapes) for layout in layouts]
+    else:
+        # Ops with operands from outside the function keep the default layout.
+        return [tuple(default_layout_id(len(shape)) for shape in shapes)]
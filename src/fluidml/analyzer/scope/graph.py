@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-import iree.compiler.ir
-
+from itertools import chain
 from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 
 from ...utils import KStat, is_default_layout
+from ..dataflow import DataflowNode
 from ..wrapper import OpWrapper
 from .scope import Scope
 from .sequence import Sequence
@@ -13,106 +13,155 @@ from .sequence import Sequence
 class Graph(Scope):
     def __init__(
         self,
-        ops: Iterator[
-            Union[iree.compiler.ir.Operation, iree.compiler.ir.OpView, OpWrapper]
-        ] = [],
+        ops: Iterator[Union[DataflowNode, OpWrapper]] = [],
         *args,
         **kwargs,
     ) -> Graph:
         super().__init__(*args, **kwargs)
-        self._wrappers: Set[OpWrapper] = {OpWrapper(op, self) for op in ops}
-
-    def contains(
-        self, op: Union[OpWrapper, iree.compiler.ir.Operation, iree.compiler.ir.OpView]
-    ) -> bool:
-        if isinstance(op, OpWrapper):
-            return op in self._wrappers
-        else:
-            return super().contains(op)
+        self._wrappers: Set[OpWrapper] = set()
+        self._components: Optional[List[List[OpWrapper]]] = None
+        for op in ops:
+            self.put(op)
 
     def iter(self) -> Iterator[OpWrapper]:
         for wrapper in self._wrappers:
             yield wrapper
 
     def partitioned(self) -> List[Graph]:
-        graphs: List[Graph] = self._partitioned()
-        for graph in graphs:
-            assert graph.is_connected, f"Graph\n{graph}\nis not connected."
-        return graphs
+        components: List[List[OpWrapper]] = self._partitioned()
+        if len(components) == 1:
+            return [self]
+        return [self._view(component) for component in components]
 
     def pathify(self, kstat: Optional[KStat] = None) -> List[Sequence]:
         assert self.is_connected, f"Graph\n{self}\nis not connected."
-        dtable: Dict[OpWrapper, Tuple[Optional[OpWrapper], float]] = {}
-        queue: List[OpWrapper] = [
-            wrapper for wrapper in self._wrappers if wrapper.is_source
-        ]
-        while queue:
-            wrapper: OpWrapper = queue.pop()
-            if wrapper.is_source:
-                dtable[wrapper] = (None, 0.0)
-            else:
-                deps: List[OpWrapper] = wrapper.scope_prevs
-                if any(dep not in dtable for dep in deps):
-                    continue
-                prev, dist = max(
-                    [(dep, dtable[dep][1]) for dep in deps], key=lambda x: x[1]
+        # Dataflow nodes are numbered in program order, which is a topological
+        # order of the graph, so every longest path is a single forward sweep.
+        order: List[OpWrapper] = sorted(
+            self._wrappers, key=lambda wrapper: wrapper._node.index
+        )
+        seqs: List[Sequence] = []
+        # Only the first path is weighted by the kernel time costs; the paths
+        # peeled from the remaining components count the ops.
+        stack: List[Tuple[List[OpWrapper], Optional[KStat]]] = [(order, kstat)]
+        while stack:
+            component, weights = stack.pop()
+            path: List[OpWrapper] = self._longest_path(component, weights)
+            seqs += [Sequence(path)]
+            peeled: Set[DataflowNode] = {wrapper._node for wrapper in path}
+            stack += [
+                (remainder, None)
+                for remainder in reversed(
+                    self._components_of(
+                        [
+                            wrapper
+                            for wrapper in component
+                            if wrapper._node not in peeled
+                        ]
+                    )
                 )
-                if kstat and wrapper.schedule_layout:
-                    ktable: Dict[Tuple[Tuple[int, ...], ...], float] = kstat[
-                        wrapper.entry
-                    ]
-                    [(_, timecost)] = [
-                        (k, v) for k, v in ktable.items() if is_default_layout(k)
-                    ]
-                    dtable[wrapper] = (prev, dist + timecost)
-                else:
-                    dtable[wrapper] = (prev, dist + 1.0)
-            for output in wrapper.scope_nexts:
-                if output not in dtable:
-                    queue += [output]
-        destination, (prev, dist) = max(dtable.items(), key=lambda x: x[1][1])
-        seq: Sequence = Sequence([destination])
-        while prev:
-            seq = seq.prepend(prev)
-            prev, _ = dtable[prev]
-        seq_set: Set[OpWrapper] = set(wrapper for wrapper in seq)
-        graph: Graph = Graph()
-        for wrapper in self._wrappers:
-            if wrapper not in seq_set:
-                graph += wrapper
-        subgraphs: List[Graph] = graph.partitioned()
-        seqs: List[Sequence] = [seq]
-        for subgraph in subgraphs:
-            seqs += subgraph.pathify()
+            ]
         return seqs
 
     def put(
         self,
-        op: Union[iree.compiler.ir.Operation, iree.compiler.ir.OpView, OpWrapper],
+        op: Union[DataflowNode, OpWrapper],
     ) -> Graph:
-        self._wrappers = {OpWrapper(op, self)} | self._wrappers
+        wrapper: OpWrapper = OpWrapper(op, self)
+        self._wrappers.discard(wrapper)
+        self._wrappers.add(wrapper)
+        self._register(wrapper)
         return self
 
     @property
     def is_connected(self) -> bool:
-        graphs: List[Graph] = self._partitioned()
-        return len(graphs) == 1
+        components: List[List[OpWrapper]] = self._partitioned()
+        return len(components) == 1
 
-    def _partitioned(self) -> List["Graph"]:
-        wrappers: Set[OpWrapper] = {*self._wrappers}
-        visited: Set[OpWrapper] = set()
-        graphs: List[Graph] = []
-        while wrappers:
-            wrapper: OpWrapper = wrappers.pop()
+    def _partitioned(self) -> List[List[OpWrapper]]:
+        if self._components is None:
+            visited: Set[DataflowNode] = set()
+            components: List[List[OpWrapper]] = []
+            for key, wrapper in self._index.items():
+                if key in visited:
+                    continue
+                visited.add(key)
+                component: List[OpWrapper] = [wrapper]
+                queue: List[OpWrapper] = [wrapper]
+                while queue:
+                    prevs, nexts = self._neighbors(queue.pop())
+                    for neighbor in chain(prevs, nexts):
+                        if neighbor._node not in visited:
+                            visited.add(neighbor._node)
+                            component += [neighbor]
+                            queue += [neighbor]
+                components += [component]
+            self._components = components
+        return self._components
+
+    def _components_of(self, wrappers: List[OpWrapper]) -> List[List[OpWrapper]]:
+        alive: Dict[DataflowNode, int] = {
+            wrapper._node: idx for idx, wrapper in enumerate(wrappers)
+        }
+        components: List[List[OpWrapper]] = []
+        for wrapper in wrappers:
+            if wrapper._node not in alive:
+                continue
+            del alive[wrapper._node]
+            component: List[OpWrapper] = [wrapper]
             queue: List[OpWrapper] = [wrapper]
-            graph: Graph = Graph()
             while queue:
-                wrapper: OpWrapper = queue.pop()
-                if wrapper in visited:
-                    continue
-                wrappers -= {wrapper}
-                visited |= {wrapper}
-                graph += wrapper
-                queue += wrapper.scope_neighbors
-            graphs += [graph]
-        return graphs
+                prevs, nexts = self._neighbors(queue.pop())
+                for neighbor in chain(prevs, nexts):
+                    if neighbor._node in alive:
+                        del alive[neighbor._node]
+                        component += [neighbor]
+                        queue += [neighbor]
+            components += [sorted(component, key=lambda wrapper: wrapper._node.index)]
+        return components
+
+    def _longest_path(
+        self, component: List[OpWrapper], kstat: Optional[KStat] = None
+    ) -> List[OpWrapper]:
+        dtable: Dict[DataflowNode, Tuple[Optional[OpWrapper], float]] = {
+            wrapper._node: (None, 0.0) for wrapper in component
+        }
+        destination: OpWrapper = component[0]
+        for wrapper in component:
+            prevs, _ = self._neighbors(wrapper)
+            deps: List[OpWrapper] = [prev for prev in prevs if prev._node in dtable]
+            if deps:
+                prev: OpWrapper = max(deps, key=lambda dep: dtable[dep._node][1])
+                _, dist = dtable[prev._node]
+                if kstat and wrapper.schedule_layout:
+                    ktable: Dict[Tuple[int, ...], float] = kstat.get_ids(wrapper.entry)
+                    [(_, timecost)] = [
+                        (k, v) for k, v in ktable.items() if is_default_layout(k)
+                    ]
+                    dtable[wrapper._node] = (prev, dist + timecost)
+                else:
+                    dtable[wrapper._node] = (prev, dist + 1.0)
+            if dtable[wrapper._node][1] > dtable[destination._node][1]:
+                destination = wrapper
+        path: List[OpWrapper] = [destination]
+        prev, _ = dtable[destination._node]
+        while prev:
+            path += [prev]
+            prev, _ = dtable[prev._node]
+        return path[::-1]
+
+    def _register(self, wrapper: OpWrapper) -> None:
+        super()._register(wrapper)
+        self._components = None
+
+    def _view(self, component: List[OpWrapper]) -> Graph:
+        # A connected component is closed under adjacency, so it can share the
+        # wrappers and the adjacency index of this graph instead of rebuilding
+        # them.
+        self._neighbors(component[0])
+        graph: Graph = Graph()
+        graph._wrappers = {*component}
+        graph._index = {wrapper._node: wrapper for wrapper in component}
+        graph._adjacency = self._adjacency
+        graph._components = [component]
+        return graph
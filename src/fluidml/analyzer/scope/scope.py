@@ -1,20 +1,21 @@
 from __future__ import annotations
 
-import iree.compiler.ir
-
 from abc import abstractmethod
-from typing import Iterator, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
+from ..dataflow import DataflowNode, DataflowValue
 from ..wrapper import OpWrapper
 
 
 class Scope(object):
     def __init__(self, *args, **kwargs) -> Scope:
         super().__init__(*args, **kwargs)
+        self._index: Dict[DataflowNode, OpWrapper] = {}
+        self._adjacency: Optional[
+            Dict[DataflowNode, Tuple[List[OpWrapper], List[OpWrapper]]]
+        ] = None
 
-    def __contains__(
-        self, op: Union[OpWrapper, iree.compiler.ir.Operation, iree.compiler.ir.OpView]
-    ) -> bool:
+    def __contains__(self, op: Union[OpWrapper, DataflowNode]) -> bool:
         return self.contains(op)
 
     def __iadd__(self, op: OpWrapper) -> Scope:
@@ -34,78 +35,24 @@ class Scope(object):
             ),
         )
 
-    def contains(
-        self,
-        op: Union[OpWrapper, iree.compiler.ir.Operation, iree.compiler.ir.OpView],
-    ) -> bool:
-        if isinstance(op, iree.compiler.ir.Operation) or isinstance(
-            op, iree.compiler.ir.OpView
-        ):
-            return any(
-                map(
-                    lambda wrapper: wrapper._op == op.opview,
-                    self,
-                )
-            )
-        elif isinstance(op, iree.compiler.ir.OpView):
-            return any(
-                map(
-                    lambda wrapper: wrapper._op == op,
-                    self,
-                )
-            )
-        elif isinstance(op, OpWrapper):
-            return any(
-                map(
-                    lambda wrapper: wrapper == op,
-                    self,
-                )
-            )
-        else:
-            raise TypeError(
-                f"Unsupported type {type(op)} for `{__class__.__name__}.contains.`"
-            )
+    def contains(self, op: Union[OpWrapper, DataflowNode]) -> bool:
+        return self._key(op) in self._index
 
-    def get(
-        self,
-        op: Union[iree.compiler.ir.Operation, iree.compiler.ir.OpView],
-    ) -> OpWrapper:
-        assert op in self, f"Op {op} is not in the graph."
-        if isinstance(op, iree.compiler.ir.Operation):
-            [wrapper] = list(
-                filter(
-                    lambda wrapper: wrapper._op == op.opview,
-                    self,
-                )
-            )
-        elif isinstance(op, iree.compiler.ir.OpView):
-            [wrapper] = list(
-                filter(
-                    lambda wrapper: wrapper._op == op,
-                    self,
-                )
-            )
-        elif isinstance(op, OpWrapper):
-            [wrapper] = list(
-                filter(
-                    lambda wrapper: wrapper == op,
-                    self,
-                )
-            )
-        else:
-            raise TypeError(f"Unsupported type {type(op)} for Graph.get")
+    def get(self, op: Union[OpWrapper, DataflowNode]) -> OpWrapper:
+        wrapper: Optional[OpWrapper] = self._index.get(self._key(op))
+        assert wrapper is not None, f"Op {op} is not in the graph."
         return wrapper
 
-    def get_input(self, op: OpWrapper) -> Optional[iree.compiler.ir.Value]:
-        inputs: List[iree.compiler.ir.Value] = self.get_inputs(op)
+    def get_input(self, op: OpWrapper) -> Optional[DataflowValue]:
+        inputs: List[DataflowValue] = self.get_inputs(op)
         if inputs:
             [input] = inputs
             return input
         else:
             return None
 
-    def get_inputs(self, op: OpWrapper) -> List[iree.compiler.ir.Value]:
-        return [input for input in op.inputs if input.owner.operation in self]
+    def get_inputs(self, op: OpWrapper) -> List[DataflowValue]:
+        return [input for input in op.inputs if input.owner in self]
 
     def get_prev(self, op: OpWrapper) -> Optional[OpWrapper]:
         prevs: List[OpWrapper] = self.get_prevs(op)
@@ -116,21 +63,22 @@ class Scope(object):
             return None
 
     def get_prevs(self, op: OpWrapper) -> List[OpWrapper]:
-        return [self.get(input.owner) for input in self.get_inputs(op)]
+        prevs, _ = self._neighbors(op)
+        return prevs
 
-    def get_output(self, op: OpWrapper) -> Optional[iree.compiler.ir.Value]:
-        outputs: List[iree.compiler.ir.Value] = self.get_outputs(op)
+    def get_output(self, op: OpWrapper) -> Optional[DataflowValue]:
+        outputs: List[DataflowValue] = self.get_outputs(op)
         if outputs:
             [output] = outputs
             return output
         else:
             return None
 
-    def get_outputs(self, op: OpWrapper) -> List[iree.compiler.ir.Value]:
+    def get_outputs(self, op: OpWrapper) -> List[DataflowValue]:
         return [
             output
             for output in op.outputs
-            if any(use.owner.operation in self for use in output.uses)
+            if any(user in self for user in output.users)
         ]
 
     def get_next(self, op: OpWrapper) -> Optional[OpWrapper]:
@@ -142,12 +90,8 @@ class Scope(object):
             return None
 
     def get_nexts(self, op: OpWrapper) -> List[OpWrapper]:
-        return [
-            self.get(use.owner.operation)
-            for output in self.get_outputs(op)
-            for use in output.uses
-            if use.owner.operation in self
-        ]
+        _, nexts = self._neighbors(op)
+        return nexts
 
     @abstractmethod
     def iter(self) -> Iterator[OpWrapper]:
@@ -160,3 +104,41 @@ class Scope(object):
         raise NotImplementedError(
             f"Method `put` is not implemented for {self.__class__.__name__}."
         )
+
+    @staticmethod
+    def _key(op: Union[OpWrapper, DataflowNode]) -> DataflowNode:
+        if isinstance(op, OpWrapper):
+            return op._node
+        elif isinstance(op, DataflowNode):
+            return op
+        else:
+            raise TypeError(
+                f"Unsupported type {type(op)} for `{__class__.__name__}.contains.`"
+            )
+
+    def _neighbors(self, op: OpWrapper) -> Tuple[List[OpWrapper], List[OpWrapper]]:
+        if self._adjacency is None:
+            # Built in one pass over the scope on first query, and again only
+            # after the scope changes.
+            index: Dict[DataflowNode, OpWrapper] = self._index
+            self._adjacency = {
+                key: (
+                    [
+                        index[input.owner]
+                        for input in key.inputs
+                        if input.owner in index
+                    ],
+                    [
+                        index[user]
+                        for output in key.outputs
+                        for user in output.users
+                        if user in index
+                    ],
+                )
+                for key in index
+            }
+        return self._adjacency[self._key(op)]
+
+    def _register(self, wrapper: OpWrapper) -> None:
+        self._index[wrapper._node] = wrapper
+        self._adjacency = None
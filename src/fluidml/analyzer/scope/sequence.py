@@ -1,13 +1,20 @@
 from __future__ import annotations
 
-import iree.compiler.ir
-import sys
+import numpy as np
 
 from collections import Counter, defaultdict
-from itertools import product
-from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
-from ...utils import KStat, Schedule, ScheduleGroup, permute_shape
+from ...utils import (
+    KStat,
+    Schedule,
+    ScheduleGroup,
+    default_layout_id,
+    intern_layout,
+    permute_shape,
+)
+from ..dataflow import DataflowNode, DataflowValue
+from ..propagate import get_arrays
 from ..wrapper import DummyValue, OpWrapper
 from .scope import Scope
 
@@ -15,22 +22,23 @@ from .scope import Scope
 class Sequence(Scope):
     def __init__(self, wrappers: Iterator[OpWrapper] = [], *args, **kwargs) -> Sequence:
         super().__init__(*args, **kwargs)
-        self._wrappers: List[OpWrapper] = [
-            OpWrapper(wrapper._op, self) for wrapper in wrappers
-        ]
+        self._wrappers: List[OpWrapper] = []
+        self._positions: Optional[Dict[DataflowNode, int]] = None
+        for wrapper in wrappers:
+            self.append(wrapper)
 
     def __len__(self) -> int:
         return self.len
 
-    def append(
-        self, op: Union[iree.compiler.ir.Operation, iree.compiler.ir.OpView, OpWrapper]
-    ) -> Sequence:
-        self._wrappers += [OpWrapper(op, self)]
+    def append(self, op: Union[DataflowNode, OpWrapper]) -> Sequence:
+        wrapper: OpWrapper = OpWrapper(op, self)
+        self._wrappers += [wrapper]
+        self._register(wrapper)
         return self
 
     def get_prevs(self, op) -> List[OpWrapper]:
         assert op in self, f"{op} not in {self}."
-        idx: int = self._wrappers.index(op)
+        idx: int = self._position(op)
         if idx == 0:
             return []
         prev: OpWrapper = self._wrappers[idx - 1]
@@ -39,7 +47,7 @@ class Sequence(Scope):
 
     def get_nexts(self, op) -> List[OpWrapper]:
         assert op in self, f"{op} not in {self}."
-        idx: int = self._wrappers.index(op)
+        idx: int = self._position(op)
         if idx == len(self._wrappers) - 1:
             return []
         output: OpWrapper = self._wrappers[idx + 1]
@@ -56,33 +64,34 @@ class Sequence(Scope):
 
     def prepend(
         self,
-        wrapper: Union[iree.compiler.ir.Operation, iree.compiler.ir.OpView, OpWrapper],
+        wrapper: Union[DataflowNode, OpWrapper],
     ) -> Sequence:
-        self._wrappers = [OpWrapper(wrapper._op, self)] + self._wrappers
+        wrapper: OpWrapper = OpWrapper(wrapper, self)
+        self._wrappers = [wrapper] + self._wrappers
+        self._register(wrapper)
         return self
 
-    def put(
-        self, op: Union[iree.compiler.ir.Operation, iree.compiler.ir.OpView, OpWrapper]
-    ) -> Sequence:
+    def put(self, op: Union[DataflowNode, OpWrapper]) -> Sequence:
         return self.append(op)
 
     def schedule(self, kstat: KStat) -> ScheduleGroup:
+        # Each op is a step of (input layout x output layout) costs over layout
+        # ids, and the chain is solved by min-plus products with argmin
+        # backpointers. Layout maps are only built for the pairs on the chosen
+        # paths. Iteration orders follow the original dict-based recurrence, so
+        # ties resolve the same way.
         wind: List[
             Tuple[
                 Union[str, DummyValue],
-                Dict[
-                    Tuple[int, ...],
-                    Tuple[
-                        float,
-                        Optional[Tuple[int, ...]],
-                        Dict[str, List[Tuple[int, ...]]],
-                    ],
-                ],
+                List[int],
+                np.ndarray,
+                Optional[np.ndarray],
+                Optional[Tuple[OpWrapper, Optional[int], Optional[int]]],
             ]
         ] = []
         for idx, wrapper in enumerate(self):
-            input: Union[iree.compiler.ir.Value, DummyValue] = wrapper.scope_input
-            output: Union[iree.compiler.ir.Value, DummyValue] = wrapper.scope_output
+            input: Union[DataflowValue, DummyValue] = wrapper.scope_input
+            output: Union[DataflowValue, DummyValue] = wrapper.scope_output
             input_idx: Optional[int] = (
                 wrapper.arg_index(input) if not isinstance(input, DummyValue) else None
             )
@@ -92,180 +101,242 @@ class Sequence(Scope):
                 else None
             )
             input_key: Union[str, DummyValue] = (
-                input.get_name() if isinstance(input, iree.compiler.ir.Value) else input
+                input.name if isinstance(input, DataflowValue) else input
             )
             output_key: Union[str, DummyValue] = (
-                output.get_name()
-                if isinstance(output, iree.compiler.ir.Value)
-                else output
+                output.name if isinstance(output, DataflowValue) else output
             )
-            if wrapper.schedule_layout:
-                assert (
-                    input_idx is not None
-                ), f"Input {input} not found for {wrapper} in {self}."
-                assert (
-                    output_idx is not None
-                ), f"Output {output} not found for {wrapper} in {self}."
-                name: str = wrapper.entry
-                assert name in kstat, f"Kernel {name} not found in kstat."
-                table: Dict[Tuple[Tuple[int, ...], ...], float] = kstat[name]
-                rtable: Dict[float, List[Tuple[Tuple[int, ...], ...]]] = defaultdict(
-                    list
-                )
-                for k, v in table.items():
-                    rtable[v] += [k]
-                input_choices: Set[Tuple[int, ...]] = {k[input_idx] for k in table}
-                output_choices: Set[Tuple[int, ...]] = {k[output_idx] for k in table}
-                available_choices: Dict[
-                    Tuple[Tuple[int, ...], Tuple[int, ...]],
-                    List[float],
-                ] = defaultdict(list)
-                for k, v in table.items():
-                    input_layout: Tuple[int, ...] = k[input_idx]
-                    output_layout: Tuple[int, ...] = k[output_idx]
-                    if (
-                        input_layout in input_choices
-                        and output_layout in output_choices
-                    ):
-                        available_choices[(input_layout, output_layout)] += [v]
-                choices: Dict[
-                    Tuple[Tuple[int, ...], Tuple[int, ...]],
-                    Tuple[float, Dict[str, List[Tuple[int, ...]]]],
-                ] = {}
-                for k, v in available_choices.items():
-                    input_layout, output_layout = k
-                    min_v: float = min(v)
-                    layout_map: Dict[str, List[Tuple[int, ...]]] = defaultdict(list)
-                    for layouts in rtable[min_v]:
-                        if (
-                            layouts[input_idx] == input_layout
-                            and layouts[output_idx] == output_layout
-                        ):
-                            assert (
-                                0 <= len(wrapper.args) - len(layouts) <= 1
-                            ), f"The size of layouts {layouts} doesn't match the size of args {wrapper.args} in {wrapper} in {self}."
-                            layouts = layouts + layouts[-1] * (
-                                len(wrapper.args) - len(layouts)
-                            )
-                            for arg, layout in zip(wrapper.args, layouts):
-                                arg_name: str = arg.get_name()
-                                layout_map[arg_name] += [layout]
-                    assert (
-                        output_key in layout_map
-                    ), f"Output {output_key} not found in {layout_map} for {wrapper} in {self}."
-                    choices[k] = (min_v, {**layout_map})
-            elif wrapper.force_layout:
-                input_shape: List[int] = (
-                    wrapper.arg_types[input_idx].shape if input_idx is not None else []
-                )
-                output_shape: List[int] = (
-                    wrapper.arg_types[output_idx].shape
-                    if output_idx is not None
-                    else []
-                )
-                choices: Dict[
-                    Tuple[Tuple[int, ...], Tuple[int, ...]],
-                    Tuple[float, Dict[str, List[Tuple[int, ...]]]],
-                ] = {
-                    (
-                        tuple(range(len(input_shape))),
-                        tuple(range(len(output_shape))),
-                    ): (
-                        0.0,
-                        {
-                            arg.get_name(): [tuple(range(len(arg.type.shape)))]
-                            for arg in wrapper.args
-                        },
-                    ),
-                }
-            elif wrapper.any_layout:
-                input_shape: List[int] = (
-                    wrapper.arg_types[input_idx].shape if input_idx is not None else []
-                )
-                output_shape: List[int] = (
-                    wrapper.arg_types[output_idx].shape
-                    if output_idx is not None
-                    else []
-                )
-                choices: Dict[
-                    Tuple[Tuple[int, ...], Tuple[int, ...]],
-                    Tuple[float, Dict[str, List[Tuple[int, ...]]]],
-                ] = {}
-                for input_layout, output_layout in product(
-                    permute_shape(tuple(range(len(input_shape)))),
-                    permute_shape(tuple(range(len(output_shape)))),
-                ):
-                    layout_map: Dict[str, List[Tuple[int, ...]]] = {}
-                    for idx, arg in enumerate(wrapper.args):
-                        arg_name: str = arg.get_name()
-                        if idx == input_idx:
-                            layout_map[arg_name] = [input_layout]
-                        elif idx == output_idx:
-                            layout_map[arg_name] = [output_layout]
-                        else:
-                            layout_map[arg_name] = [list(permute_shape(arg.type.shape))]
-                    choices[(input_layout, output_layout)] = (0.0, layout_map)
-            else:
-                raise NotImplementedError(
-                    f"Unsupported OpWrapper: {wrapper} in {self.__class__.__name__}.schedule."
-                )
+            ins, outs, costs = self._choices(wrapper, kstat, input_idx, output_idx)
             if idx == 0:
+                initial: Dict[int, float] = {}
+                for input_layout, cost in zip(ins.tolist(), costs.tolist()):
+                    initial[input_layout] = cost
                 wind += [
-                    (input_key, {k: (t, None, m) for (k, _), (t, m) in choices.items()})
+                    (
+                        input_key,
+                        [*initial],
+                        np.fromiter(initial.values(), dtype=np.float64),
+                        None,
+                        None,
+                    )
                 ]
-            key, ktable = wind[-1]
+            key, prev_layouts, prev_times, _, _ = wind[-1]
             assert input_key == key
-            input_layouts: Set[Tuple[int, ...]] = set(ktable) & set(
-                k for k, _ in choices
-            )
+            input_layouts: List[int] = [*(set(prev_layouts) & set(ins.tolist()))]
             assert (
                 input_layouts
             ), f"Input layout on {input} is not found for {wrapper} in {self}."
-            exec_time_table: Dict[
-                Tuple[int, ...],
-                Tuple[float, Tuple[int, ...], Dict[str, List[Tuple[int, ...]]]],
-            ] = dict()
-            for input_layout in input_layouts:
-                prev_exec_time, _, _ = ktable[input_layout]
-                for output_layout in (
-                    v for _, v in ((k, v) for k, v in choices if k == input_layout)
-                ):
-                    kernel_exec_time, layout_map = choices[
-                        (input_layout, output_layout)
-                    ]
-                    total_exec_time: float = prev_exec_time + kernel_exec_time
-                    curr_exec_time, _, _ = exec_time_table.get(
-                        output_layout, (sys.float_info.max, None, {})
-                    )
-                    if curr_exec_time > total_exec_time:
-                        exec_time_table[output_layout] = (
-                            total_exec_time,
-                            input_layout,
-                            layout_map,
-                        )
-            wind += [(output_key, exec_time_table)]
+            bound: int = max(max(prev_layouts), int(ins.max()), int(outs.max())) + 1
+            rows: np.ndarray = np.full(bound, -1, dtype=np.int64)
+            rows[input_layouts] = np.arange(len(input_layouts))
+            prev_rows: np.ndarray = np.full(bound, -1, dtype=np.int64)
+            prev_rows[prev_layouts] = np.arange(len(prev_layouts))
+            choice_rows: np.ndarray = rows[ins]
+            valid: np.ndarray = np.flatnonzero(choice_rows >= 0)
+            valid = valid[np.argsort(choice_rows[valid], kind="stable")]
+            output_layouts, first = np.unique(outs[valid], return_index=True)
+            output_layouts = output_layouts[np.argsort(first)]
+            cols: np.ndarray = np.full(bound, -1, dtype=np.int64)
+            cols[output_layouts] = np.arange(len(output_layouts))
+            matrix: np.ndarray = np.full(
+                (len(input_layouts), len(output_layouts)), np.inf
+            )
+            matrix[choice_rows[valid], cols[outs[valid]]] = costs[valid]
+            matrix += prev_times[prev_rows[input_layouts]][:, None]
+            best: np.ndarray = np.argmin(matrix, axis=0)
+            wind += [
+                (
+                    output_key,
+                    output_layouts.tolist(),
+                    matrix[best, np.arange(len(output_layouts))],
+                    np.array(input_layouts, dtype=np.int64)[best],
+                    (wrapper, input_idx, output_idx),
+                )
+            ]
         group: ScheduleGroup = ScheduleGroup()
         if wind:
-            lk, ltable = wind[-1]
-            min_time: float = min(time for _, (time, _, _) in ltable.items())
-            global_layout_map: Dict[str, List[Tuple[int, ...]]] = defaultdict(list)
-            for layout, (time, prev, layout_map) in ltable.items():
-                if time == min_time:
-                    rewind: Dict[Union[str, DummyValue], Tuple[int, ...]] = {lk: layout}
-                    for ck, ctable in wind[-2::-1]:
-                        cur: Tuple[int, ...] = prev
-                        for k, v in layout_map.items():
-                            global_layout_map[k] += v
-                        _, prev, layout_map = ctable[cur]
-                        rewind[ck] = cur
-                    rewind = {
-                        k: v for k, v in rewind.items() if not isinstance(k, DummyValue)
-                    }
-                    for k, v in global_layout_map.items():
-                        if k not in rewind:
-                            counter: Counter[Tuple[int, ...]] = Counter(v)
-                            [(layout, _)] = counter.most_common(1)
-                            rewind[k] = layout
-                    schedule: Schedule = Schedule(rewind)
-                    group += schedule
+            lk, llayouts, ltimes, _, _ = wind[-1]
+            min_time: float = float(ltimes.min())
+            global_layout_map: Dict[str, List[int]] = defaultdict(list)
+            for pos in np.flatnonzero(ltimes == min_time).tolist():
+                cur: int = llayouts[pos]
+                rewind: Dict[Union[str, DummyValue], int] = {lk: cur}
+                touches: Dict[
+                    str, List[Tuple[OpWrapper, Optional[int], Optional[int], int, int]]
+                ] = defaultdict(list)
+                for (_, layouts, _, prevs, step), (ck, _, _, _, _) in zip(
+                    wind[:0:-1], wind[-2::-1]
+                ):
+                    prev: int = int(prevs[layouts.index(cur)])
+                    wrapper, input_idx, output_idx = step
+                    for k, v in self._layout_map(
+                        wrapper, kstat, input_idx, output_idx, prev, cur
+                    ).items():
+                        global_layout_map[k] += v
+                    for arg in dict.fromkeys(wrapper.args):
+                        touches[arg.name] += [
+                            (wrapper, input_idx, output_idx, prev, cur)
+                        ]
+                    rewind[ck] = prev
+                    cur = prev
+                rewind = {
+                    k: v for k, v in rewind.items() if not isinstance(k, DummyValue)
+                }
+                # Off-path arguments take the proposed layout with the least
+                # time over the ops of this path touching them, and the most
+                # proposed one among equals.
+                for k, v in global_layout_map.items():
+                    if k not in rewind:
+                        counter: Counter[int] = Counter(v)
+                        candidates: List[Tuple[int, int]] = counter.most_common()
+                        best_layout, _ = candidates[0]
+                        best_time: float = self._touch_time(
+                            kstat, k, best_layout, touches[k]
+                        )
+                        for layout, _ in candidates[1:]:
+                            timecost: float = self._touch_time(
+                                kstat, k, layout, touches[k]
+                            )
+                            if timecost < best_time:
+                                best_layout, best_time = layout, timecost
+                        rewind[k] = best_layout
+                schedule: Schedule = Schedule(rewind)
+                group += schedule
         return group
+
+    def _choices(
+        self,
+        wrapper: OpWrapper,
+        kstat: KStat,
+        input_idx: Optional[int],
+        output_idx: Optional[int],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if wrapper.schedule_layout or wrapper.propagate_layout:
+            assert (
+                input_idx is not None
+            ), f"Input {wrapper.scope_input} not found for {wrapper} in {self}."
+            assert (
+                output_idx is not None
+            ), f"Output {wrapper.scope_output} not found for {wrapper} in {self}."
+            keys, values = get_arrays(wrapper.node, kstat)
+            bound: int = int(keys.max()) + 1
+            codes: np.ndarray = keys[:, input_idx] * bound + keys[:, output_idx]
+            pairs, first, inverse = np.unique(
+                codes, return_index=True, return_inverse=True
+            )
+            mins: np.ndarray = np.full(len(pairs), np.inf)
+            np.minimum.at(mins, inverse, values)
+            order: np.ndarray = np.argsort(first)
+            return pairs[order] // bound, pairs[order] % bound, mins[order]
+        elif wrapper.force_layout:
+            input_layout: int = (
+                wrapper.args[input_idx].forced_layout
+                if input_idx is not None
+                else default_layout_id(0)
+            )
+            output_layout: int = (
+                wrapper.args[output_idx].forced_layout
+                if output_idx is not None
+                else default_layout_id(0)
+            )
+            return (
+                np.array([input_layout], dtype=np.int64),
+                np.array([output_layout], dtype=np.int64),
+                np.zeros(1),
+            )
+        elif wrapper.any_layout:
+            input_shape: Tuple[int, ...] = (
+                wrapper.args[input_idx].shape if input_idx is not None else ()
+            )
+            output_shape: Tuple[int, ...] = (
+                wrapper.args[output_idx].shape if output_idx is not None else ()
+            )
+            input_layouts: List[int] = [
+                *map(intern_layout, permute_shape(tuple(range(len(input_shape)))))
+            ]
+            output_layouts: List[int] = [
+                *map(intern_layout, permute_shape(tuple(range(len(output_shape)))))
+            ]
+            return (
+                np.repeat(np.array(input_layouts, dtype=np.int64), len(output_layouts)),
+                np.tile(np.array(output_layouts, dtype=np.int64), len(input_layouts)),
+                np.zeros(len(input_layouts) * len(output_layouts)),
+            )
+        else:
+            raise NotImplementedError(
+                f"Unsupported OpWrapper: {wrapper} in {self.__class__.__name__}.schedule."
+            )
+
+    def _layout_map(
+        self,
+        wrapper: OpWrapper,
+        kstat: KStat,
+        input_idx: Optional[int],
+        output_idx: Optional[int],
+        input_layout: int,
+        output_layout: int,
+    ) -> Dict[str, List[int]]:
+        if wrapper.schedule_layout or wrapper.propagate_layout:
+            keys, values = get_arrays(wrapper.node, kstat)
+            matched: np.ndarray = (keys[:, input_idx] == input_layout) & (
+                keys[:, output_idx] == output_layout
+            )
+            min_v: float = values[matched].min()
+            layout_map: Dict[str, List[int]] = defaultdict(list)
+            for layouts in keys[matched & (values == min_v)].tolist():
+                assert (
+                    0 <= len(wrapper.args) - len(layouts) <= 1
+                ), f"The size of layouts {layouts} doesn't match the size of args {wrapper.args} in {wrapper} in {self}."
+                layouts += [layouts[-1]] * (len(wrapper.args) - len(layouts))
+                for arg, layout in zip(wrapper.args, layouts):
+                    layout_map[arg.name] += [layout]
+            return {**layout_map}
+        elif wrapper.force_layout:
+            return {arg.name: [arg.forced_layout] for arg in wrapper.args}
+        else:
+            layout_map: Dict[str, List[int]] = {}
+            for idx, arg in enumerate(wrapper.args):
+                if idx == input_idx:
+                    layout_map[arg.name] = [input_layout]
+                elif idx == output_idx:
+                    layout_map[arg.name] = [output_layout]
+                else:
+                    layout_map[arg.name] = [
+                        list(map(intern_layout, permute_shape(arg.shape)))
+                    ]
+            return layout_map
+
+    @staticmethod
+    def _touch_time(
+        kstat: KStat,
+        name: str,
+        layout: int,
+        touches: List[Tuple[OpWrapper, Optional[int], Optional[int], int, int]],
+    ) -> float:
+        timecost: float = 0.0
+        for wrapper, input_idx, output_idx, input_layout, output_layout in touches:
+            if wrapper.schedule_layout or wrapper.propagate_layout:
+                keys, values = get_arrays(wrapper.node, kstat)
+                matched: np.ndarray = (keys[:, input_idx] == input_layout) & (
+                    keys[:, output_idx] == output_layout
+                )
+                for idx, arg in enumerate(wrapper.args):
+                    if arg.name == name:
+                        matched &= keys[:, min(idx, keys.shape[1] - 1)] == layout
+                timecost += float(values[matched].min()) if matched.any() else np.inf
+            elif wrapper.force_layout:
+                for arg in wrapper.args:
+                    if arg.name == name and layout != arg.forced_layout:
+                        timecost += np.inf
+        return timecost
+
+    def _position(self, op: OpWrapper) -> int:
+        if self._positions is None:
+            self._positions = {
+                wrapper._node: idx for idx, wrapper in enumerate(self._wrappers)
+            }
+        return self._positions[self._key(op)]
+
+    def _register(self, wrapper: OpWrapper) -> None:
+        super()._register(wrapper)
+        self._positions = None
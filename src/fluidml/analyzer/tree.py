@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import heapq
+import math
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..utils import KStat, Schedule
+from .analyzer import Analyzer
+from .dataflow import Dataflow, DataflowValue
+from .dp import DynamicProgramAnalyzer
+from .factor import Factor, FactorGraph
+
+Table = Tuple[List[DataflowValue], np.ndarray]
+
+
+class TreeAnalyzer(Analyzer):
+    def __init__(
+        self,
+        statistic: Optional[str] = None,
+        max_table: int = 1 << 22,
+        *args,
+        **kwargs,
+    ) -> TreeAnalyzer:
+        super().__init__(statistic, *args, **kwargs)
+        self._max_table: int = max_table
+        self._components: int = 0
+        self._exact: int = 0
+        self._conditioned: int = 0
+        self._cost: float = 0.0
+
+    @property
+    def report(self) -> Dict[str, Any]:
+        return {
+            **super().report,
+            "components": self._components,
+            "exact": self._exact,
+            "conditioned": self._conditioned,
+            "cost": self._cost,
+        }
+
+    def solve(self, dataflow: Dataflow, kstat: KStat) -> Schedule:
+        graph: FactorGraph = FactorGraph(dataflow, kstat)
+        incumbent: Optional[Schedule] = None
+        rows: Dict[Factor, int] = {}
+        components: List[List[Factor]] = graph.components()
+        self._components = len(components)
+        self._exact = 0
+        self._conditioned = 0
+        for component in components:
+            assignment, conditioned = self._eliminate(component)
+            if assignment is None:
+                # The path decomposition is only run for the components that
+                # are too wide or have no consistent assignment at all.
+                if incumbent is None:
+                    incumbent = DynamicProgramAnalyzer(self._statistic).solve(
+                        dataflow, kstat
+                    )
+                if conditioned:
+                    assignment, conditioned = self._eliminate(component, incumbent)
+            if assignment is None:
+                continue
+            for factor in component:
+                _, row = factor.table[
+                    tuple(assignment[var] for var in factor.variables)
+                ]
+                rows[factor] = row
+            self._exact += not conditioned
+            self._conditioned += conditioned
+        schedule: Schedule = graph.schedule(rows, incumbent)
+        self._cost = graph.evaluate(schedule)
+        return schedule
+
+    def _converted(self, solved: float, converted: float) -> None:
+        self._cost = converted
+
+    def _eliminate(
+        self, factors: List[Factor], incumbent: Optional[Schedule] = None
+    ) -> Tuple[Optional[Dict[DataflowValue, int]], int]:
+        # Min-sum variable elimination over the linking values, i.e. dynamic
+        # programming over a tree decomposition built by a weighted min-degree
+        # order. It is exact for series-parallel and other low-width regions;
+        # where a clique table would exceed max_table, the value with the most
+        # neighbors keeps its layout from the path decomposition instead, and
+        # without one the elimination gives up.
+        domains: Dict[DataflowValue, List[int]] = {}
+        for factor in factors:
+            for idx, var in enumerate(factor.variables):
+                layouts: Set[int] = {layouts[idx] for layouts in factor.table}
+                domains[var] = sorted(
+                    layouts & {*domains[var]} if var in domains else layouts
+                )
+        if any(not domain for domain in domains.values()):
+            return None, 0
+        positions: Dict[DataflowValue, Dict[int, int]] = {
+            var: {layout: idx for idx, layout in enumerate(domain)}
+            for var, domain in domains.items()
+        }
+        tables: Dict[int, Table] = {}
+        for factor in factors:
+            array: np.ndarray = np.full(
+                [len(domains[var]) for var in factor.variables], np.inf
+            )
+            for layouts, (cost, _) in factor.table.items():
+                index: List[Optional[int]] = [
+                    positions[var].get(layout)
+                    for var, layout in zip(factor.variables, layouts)
+                ]
+                if None not in index:
+                    array[tuple(index)] = cost
+            tables[len(tables)] = ([*factor.variables], array)
+        owners: Dict[DataflowValue, Set[int]] = {var: set() for var in domains}
+        neighbors: Dict[DataflowValue, Set[DataflowValue]] = {
+            var: set() for var in domains
+        }
+        for key, (variables, _) in tables.items():
+            for var in variables:
+                owners[var].add(key)
+                neighbors[var].update(variables)
+        for var in domains:
+            neighbors[var].discard(var)
+        order: Dict[DataflowValue, int] = {var: idx for idx, var in enumerate(domains)}
+
+        def weight(var: DataflowValue) -> float:
+            return sum(
+                math.log(len(domains[other])) for other in {var, *neighbors[var]}
+            )
+
+        heap: List[Tuple[float, int, DataflowValue]] = [
+            (weight(var), order[var], var) for var in domains
+        ]
+        heapq.heapify(heap)
+        remaining: Set[DataflowValue] = {*domains}
+        conditioned: Dict[DataflowValue, int] = {}
+        trace: List[Tuple[DataflowValue, List[DataflowValue], np.ndarray]] = []
+        limit: float = math.log(self._max_table)
+        while remaining:
+            size, _, var = heapq.heappop(heap)
+            if var not in remaining or size != weight(var):
+                continue
+            if size > limit:
+                if incumbent is None:
+                    return None, 1
+                heapq.heappush(heap, (size, order[var], var))
+                var = max(
+                    remaining, key=lambda other: (len(neighbors[other]), -order[other])
+                )
+                position: int = positions[var].get(
+                    incumbent.get_id(var.name, domains[var][0]), 0
+                )
+                for key in owners.pop(var):
+                    variables, array = tables[key]
+                    axis: int = variables.index(var)
+                    tables[key] = (
+                        variables[:axis] + variables[axis + 1 :],
+                        np.take(array, position, axis=axis),
+                    )
+                conditioned[var] = position
+            else:
+                keys: Set[int] = owners.pop(var)
+                scope: List[DataflowValue] = [var] + sorted(
+                    {other for key in keys for other in tables[key][0]} - {var},
+                    key=order.get,
+                )
+                combined: np.ndarray = sum(
+                    self._expand(*tables.pop(key), scope) for key in keys
+                )
+                key: int = len(factors) + len(trace)
+                tables[key] = (scope[1:], combined.min(axis=0))
+                trace += [(var, scope[1:], combined.argmin(axis=0))]
+                for other in scope[1:]:
+                    owners[other] -= keys
+                    owners[other].add(key)
+                    neighbors[other].update(scope[1:])
+                    neighbors[other].discard(other)
+            remaining.discard(var)
+            for other in neighbors.pop(var):
+                if other in remaining:
+                    neighbors[other].discard(var)
+                    heapq.heappush(heap, (weight(other), order[other], other))
+        if sum(float(array) for _, array in tables.values()) == np.inf:
+            return None, len(conditioned)
+        assignment: Dict[DataflowValue, int] = {**conditioned}
+        for var, scope, argmin in reversed(trace):
+            assignment[var] = int(argmin[tuple(assignment[other] for other in scope)])
+        return {
+            var: domains[var][position] for var, position in assignment.items()
+        }, len(conditioned)
+
+    @staticmethod
+    def _expand(
+        variables: List[DataflowValue], array: np.ndarray, scope: List[DataflowValue]
+    ) -> np.ndarray:
+        axes: List[int] = [scope.index(var) for var in variables]
+        shape: List[int] = [1] * len(scope)
+        for var, axis in zip(variables, axes):
+            shape[axis] = array.shape[variables.index(var)]
+        return array.transpose(np.argsort(axes)).reshape(shape)
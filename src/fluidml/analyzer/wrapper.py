@@ -1,15 +1,12 @@
 from __future__ import annotations
 
 import enum
-import iree.compiler.dialects.arith
-import iree.compiler.dialects.flow
-import iree.compiler.dialects.hal
-import iree.compiler.dialects.util
-import iree.compiler.ir
 
 from functools import cached_property
 from typing import TYPE_CHECKING, List, Optional, Union
 
+from .dataflow import DataflowNode, DataflowValue
+
 if TYPE_CHECKING:
     from .scope import Scope
 
@@ -22,50 +19,43 @@ class DummyValue(enum.Enum):
 class OpWrapper(object):
     def __init__(
         self,
-        op: Union[iree.compiler.ir.Operation, iree.compiler.ir.OpView, OpWrapper],
+        node: Union[DataflowNode, OpWrapper],
         scope: Optional[Scope] = None,
         *args,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self._scope: Optional[Scope] = scope
-        if isinstance(op, iree.compiler.ir.Operation):
-            self._op: iree.compiler.ir.OpView = op.opview
-        elif isinstance(op, iree.compiler.ir.OpView):
-            self._op: iree.compiler.ir.OpView = op
-        elif isinstance(op, OpWrapper):
-            self._op: iree.compiler.ir.OpView = op._op
+        if isinstance(node, DataflowNode):
+            self._node: DataflowNode = node
+        elif isinstance(node, OpWrapper):
+            self._node: DataflowNode = node._node
         else:
             raise TypeError(
-                f"Unsupported type {type(op)} for {self.__class__.__name__}.__init__."
+                f"Unsupported type {type(node)} for {self.__class__.__name__}.__init__."
             )
 
-    def __eq__(
-        self,
-        value: Union[iree.compiler.ir.Operation, iree.compiler.ir.OpView, "OpWrapper"],
-    ) -> bool:
-        if isinstance(value, iree.compiler.ir.Operation):
-            return self._op == value.opview
-        elif isinstance(value, iree.compiler.ir.OpView):
-            return self._op == value
+    def __eq__(self, value: Union[DataflowNode, OpWrapper]) -> bool:
+        if isinstance(value, DataflowNode):
+            return self._node is value
         elif isinstance(value, OpWrapper):
-            return self._op == value._op
+            return self._node is value._node
         else:
             raise TypeError(
                 f"Unsupported type {type(value)} for {self.__class__.__name__}.__eq__."
             )
 
     def __hash__(self) -> int:
-        return hash(self._op) ^ object.__hash__(OpWrapper)
+        return hash(self._node) ^ object.__hash__(OpWrapper)
 
     def __str__(self) -> str:
-        return f"{self.__class__.__name__}({self._op})"
+        return f"{self.__class__.__name__}({self._node!r})"
 
     @cached_property
-    def args(self) -> List[iree.compiler.ir.Value]:
+    def args(self) -> List[DataflowValue]:
         return self.inputs + self.outputs
 
-    def arg_index(self, arg: iree.compiler.ir.Value) -> int:
+    def arg_index(self, arg: DataflowValue) -> int:
         inputs_len: int = len(self.inputs)
         idx: int = self.args.index(arg)
         if self.tied_operands and idx >= inputs_len:
@@ -75,25 +65,13 @@ class OpWrapper(object):
                 idx = tied_idx
         return idx
 
-    @cached_property
-    def arg_types(self) -> List[iree.compiler.ir.RankedTensorType]:
-        return [arg.type for arg in self.args]
+    @property
+    def entry(self) -> Optional[str]:
+        return self._node.entry
 
-    @cached_property
-    def entry(self) -> str:
-        [entry_point] = self._op.entry_points
-        [_, name] = entry_point.value
-        return name
-
-    @cached_property
-    def inputs(self) -> List[iree.compiler.ir.Value]:
-        return [
-            op
-            for op in self._op.operands
-            if isinstance(op.owner, iree.compiler.ir.Operation)
-            and isinstance(op.type, iree.compiler.ir.RankedTensorType)
-            and not isinstance(op.owner.opview, iree.compiler.dialects.arith.ConstantOp)
-        ]
+    @property
+    def inputs(self) -> List[DataflowValue]:
+        return self._node.inputs
 
     @cached_property
     def is_source(self) -> bool:
@@ -107,19 +85,23 @@ class OpWrapper(object):
     def is_intermediate(self) -> bool:
         return self.scope_prevs and self.scope_nexts
 
+    @property
+    def node(self) -> DataflowNode:
+        return self._node
+
     @cached_property
-    def scope_inputs(self) -> List[iree.compiler.ir.Value]:
+    def scope_inputs(self) -> List[DataflowValue]:
         return [
             *{
                 result
                 for prev in self.scope_prevs
-                for result in prev._op.results
+                for result in prev._node.outputs
                 if result in self.inputs
             }
         ]
 
     @cached_property
-    def scope_input(self) -> Union[iree.compiler.ir.Value, DummyValue]:
+    def scope_input(self) -> Union[DataflowValue, DummyValue]:
         if self.scope_inputs:
             [scope_input] = self.scope_inputs
             return scope_input
@@ -140,24 +122,18 @@ class OpWrapper(object):
         else:
             return []
 
-    @cached_property
-    def outputs(self) -> List[iree.compiler.ir.Value]:
-        return [
-            op
-            for op in self._op.results
-            if isinstance(op.owner, iree.compiler.ir.Operation)
-            and isinstance(op.type, iree.compiler.ir.RankedTensorType)
-            and not isinstance(op.owner.opview, iree.compiler.dialects.arith.ConstantOp)
-        ]
+    @property
+    def outputs(self) -> List[DataflowValue]:
+        return self._node.outputs
 
     @cached_property
-    def scope_outputs(self) -> List[iree.compiler.ir.Value]:
+    def scope_outputs(self) -> List[DataflowValue]:
         if self.scope_nexts:
             return [
                 *{
                     result
                     for next in self.scope_nexts
-                    for result in next._op.operands
+                    for result in next._node.inputs
                     if result in self.outputs
                 }
             ]
@@ -165,7 +141,7 @@ class OpWrapper(object):
             return self.outputs
 
     @cached_property
-    def scope_output(self) -> Union[iree.compiler.ir.Value, DummyValue]:
+    def scope_output(self) -> Union[DataflowValue, DummyValue]:
         if self.scope_outputs:
             [scope_output] = self.scope_outputs
             return scope_output
@@ -187,33 +163,22 @@ class OpWrapper(object):
     def scope_neighbors(self) -> List[OpWrapper]:
         return self.scope_prevs + self.scope_nexts
 
-    @cached_property
+    @property
     def schedule_layout(self) -> bool:
-        return isinstance(self._op, iree.compiler.dialects.flow.DispatchOp)
+        return self._node.schedule_layout
 
-    @cached_property
+    @property
     def force_layout(self) -> bool:
-        return (
-            isinstance(self._op, iree.compiler.dialects.flow.TensorReshapeOp)
-            or isinstance(self._op, iree.compiler.dialects.flow.TensorUpdateOp)
-            or isinstance(self._op, iree.compiler.dialects.hal.TensorBarrierOp)
-            or isinstance(self._op, iree.compiler.dialects.hal.TensorExportOp)
-            or isinstance(self._op, iree.compiler.dialects.hal.TensorImportOp)
-            or isinstance(self._op, iree.compiler.dialects.util.ReturnOp)
-        )
+        return self._node.force_layout
 
-    @cached_property
+    @property
     def any_layout(self) -> bool:
-        return (
-            isinstance(self._op, iree.compiler.dialects.arith.ConstantOp)
-            or isinstance(self._op, iree.compiler.dialects.flow.TensorEmptyOp)
-            or isinstance(self._op, iree.compiler.dialects.flow.TensorSplatOp)
-            or isinstance(self._op, iree.compiler.dialects.util.GlobalLoadOp)
-        )
+        return self._node.any_layout
 
-    @cached_property
+    @property
+    def propagate_layout(self) -> bool:
+        return self._node.propagate_layout
+
+    @property
     def tied_operands(self) -> Optional[List[int]]:
-        if any(attr for attr in self._op.attributes if attr.name == "tied_operands"):
-            return [i.value for i in self._op.tied_operands]
-        else:
-            return None
+        return self._node.tied_operands
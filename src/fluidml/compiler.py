@@ -1,7 +1,7 @@
 import iree.compiler
 
 
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from .run import run
 
@@ -29,6 +29,8 @@ def compile_file(input_file: str, driver: str, **kwargs) -> bytes:
 
 
 def compile_str(input_str: Union[str, bytes], driver: str, **kwargs) -> bytes:
+    # The layouts of model inputs and outputs are only known to FluidML.
+    layouts: Optional[Dict[str, Tuple[int, ...]]] = kwargs.pop("layouts", None)
     extra_args: List[str] = kwargs.get("extra_args", [])
     compile_from_flags: List[str] = list(
         filter(lambda flag: flag.startswith("--compile-from="), extra_args)
@@ -65,7 +67,7 @@ def compile_str(input_str: Union[str, bytes], driver: str, **kwargs) -> bytes:
             **kwargs,
         }
         flow: bytes = iree.compiler.compile_str(input_str, **start_to_flow_kwargs)
-        flow: str = run(flow, driver, **flow_to_end_kwargs)
+        flow: str = run(flow, driver, layouts, **flow_to_end_kwargs)
         return iree.compiler.compile_str(flow, **flow_to_end_kwargs)
     else:
         return iree.compiler.compile_str(input_str, **kwargs)
@@ -1,5 +1,6 @@
 import argparse
 
+from ..utils.layout import parse_layouts
 from ..utils.schedule import Schedule
 from .generator import Generator
 
@@ -18,15 +19,22 @@ def main():
     parser.add_argument(
         "--output", type=str, required=True, help="output file for generated pipeline"
     )
+    parser.add_argument(
+        "--layout",
+        action="append",
+        default=[],
+        metavar="NAME=DIMS",
+        help="layout of a model input or output, e.g. input0=0,2,3,1, repeatable",
+    )
     args: argparse.Namespace = parser.parse_args()
     filename: str = args.filename
     schedule: str = args.schedule
     output: str = args.output
     with open(filename, "r") as f:
         mod: str = f.read()
-    with open(schedule, "r") as f:
+    with open(schedule, "rb") as f:
         schedule: Schedule = Schedule.build(f)
-    generator: Generator = Generator()
+    generator: Generator = Generator(parse_layouts(args.layout))
     mod: str = generator.run(mod, schedule)
     with open(output, "w") as f:
         f.write(mod)
@@ -1,25 +1,56 @@
 from __future__ import annotations
 
 import iree.compiler.dialects.flow
+import iree.compiler.dialects.hal
 import iree.compiler.dialects.util
 import iree.compiler.ir
 import numpy as np
 
 from itertools import chain
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from ..utils import Schedule, map_str_dtype
+from ..utils import (
+    Schedule,
+    build_transpose_kernel,
+    map_str_dtype,
+    transpose_kernel_name,
+)
 from .ktable import KTable
 
 
 class Generator(object):
-    def __init__(self, *args, **kwargs) -> Generator:
+    def __init__(
+        self,
+        boundaries: Optional[Dict[str, Tuple[int, ...]]] = None,
+        *args,
+        **kwargs,
+    ) -> Generator:
         super().__init__(*args, **kwargs)
+        self._boundaries: Dict[str, Tuple[int, ...]] = {
+            name: tuple(layout) for name, layout in (boundaries or {}).items()
+        }
+
+    @property
+    def boundaries(self) -> Dict[str, Tuple[int, ...]]:
+        return self._boundaries
 
     def run(self, mod: str, schedule: Schedule) -> str:
         with iree.compiler.ir.Context():
             mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(mod)
             ktable: KTable = KTable(mod)
+            conversions: List[
+                Tuple[
+                    iree.compiler.ir.OpView,
+                    int,
+                    str,
+                    Tuple[int, ...],
+                    Tuple[int, ...],
+                ]
+            ] = []
+            updates: List[
+                Tuple[iree.compiler.dialects.flow.TensorUpdateOp, Tuple[int, ...]]
+            ] = []
+            boundaries: List[Tuple[iree.compiler.ir.OpView, Tuple[int, ...]]] = []
             func_ops: List[iree.compiler.dialects.util.FuncOp] = list(
                 filter(
                     lambda op: isinstance(op, iree.compiler.dialects.util.FuncOp),
@@ -34,6 +65,9 @@ class Generator(object):
                 )
             else:
                 raise NotImplementedError(f"Unsupported number of FuncOps: {func_ops}")
+            # Ops are numbered as the analyzer numbers its dataflow nodes, which
+            # is how the schedule refers to the readers of a value.
+            index: int = 0
             for region in func_op.regions:
                 for block in region.blocks:
                     for op in block.operations:
@@ -41,13 +75,49 @@ class Generator(object):
                             [entry_points] = op.entry_points
                             [_, func_name] = entry_points.value
                             layouts: Tuple[Tuple[int, ...], ...] = tuple(
-                                schedule[value.get_name()]
+                                schedule.get(
+                                    Schedule.use_key(value.get_name(), index),
+                                    schedule[value.get_name()],
+                                )
                                 for value in chain(op.operands, op.results)
                             )
+                            for idx, (operand, layout) in enumerate(
+                                zip(op.operands, layouts)
+                            ):
+                                source: Tuple[int, ...] = schedule[operand.get_name()]
+                                if layout != source:
+                                    conversions += [
+                                        (op, idx, operand.get_name(), source, layout)
+                                    ]
                             entry_points: iree.compiler.ir.ArrayAttr = ktable[
                                 func_name, layouts
                             ]
                             op.entry_points = entry_points
+                        elif isinstance(op, iree.compiler.dialects.flow.TensorUpdateOp):
+                            layout: Optional[Tuple[int, ...]] = schedule.get(
+                                op.result.get_name()
+                            )
+                            if layout is not None and layout != tuple(
+                                range(len(layout))
+                            ):
+                                updates += [(op, layout)]
+                        elif (
+                            isinstance(
+                                op,
+                                (
+                                    iree.compiler.dialects.hal.TensorImportOp,
+                                    iree.compiler.dialects.hal.TensorExportOp,
+                                ),
+                            )
+                            and "name" in op.attributes
+                        ):
+                            layout: Optional[Tuple[int, ...]] = self._boundaries.get(
+                                iree.compiler.ir.StringAttr(op.attributes["name"]).value
+                            )
+                            if layout is not None and layout != tuple(
+                                range(len(layout))
+                            ):
+                                boundaries += [(op, layout)]
                         elif isinstance(op, iree.compiler.dialects.util.GlobalLoadOp):
                             for global_ in mod.body.operations:
                                 if (
@@ -77,4 +147,172 @@ class Generator(object):
                                     global_.initial_value = iree.compiler.ir.Attribute.parse(
                                         f'dense<"0x{value}"> : {global_.type_.value}'
                                     )
+                        index += 1
+            # Values are looked up by their names, which new ops renumber, so
+            # the conversions are only inserted once all lookups are done.
+            # Readers converting a value to the same layout share one
+            # conversion, dispatched in front of the first of them.
+            converted: Dict[Tuple[str, Tuple[int, ...]], iree.compiler.ir.Value] = {}
+            for op, idx, name, source, target in conversions:
+                replacement: Optional[iree.compiler.ir.Value] = converted.get(
+                    (name, target)
+                )
+                if replacement is None:
+                    replacement = self._convert(
+                        mod, func_op, ktable, op, op.operands[idx], source, target
+                    )
+                    converted[name, target] = replacement
+                op.operands[idx] = replacement
+            # A flow.tensor.reshape keeps the stored elements as they are, and
+            # the analyzer only moves whole groups of the dims it merges or
+            # splits, so reshapes stay as they are. Updates are done on the
+            # stored shapes instead.
+            for op, layout in updates:
+                self._update(op, layout)
+            # The analyzer stores the values of model inputs and outputs in
+            # their declared layouts, so the module takes and returns them in
+            # their stored shapes, reshaped from and to the logical ones.
+            for op, layout in boundaries:
+                if isinstance(op, iree.compiler.dialects.hal.TensorImportOp):
+                    self._import(op, layout)
+                else:
+                    self._export(op, layout)
             return str(mod)
+
+    @staticmethod
+    def _convert(
+        mod: iree.compiler.ir.Module,
+        func_op: iree.compiler.dialects.util.FuncOp,
+        ktable: KTable,
+        op: iree.compiler.ir.OpView,
+        value: iree.compiler.ir.Value,
+        source: Tuple[int, ...],
+        target: Tuple[int, ...],
+    ) -> iree.compiler.ir.Value:
+        tensor_type: iree.compiler.ir.RankedTensorType = value.type
+        shape: Tuple[int, ...] = tuple(tensor_type.shape)
+        dtype: str = str(tensor_type.element_type)
+        name: str = transpose_kernel_name(shape, dtype)
+        if not any(
+            isinstance(operation, iree.compiler.dialects.flow.ExecutableOp)
+            and operation.sym_name.value == name
+            for operation in mod.body.operations
+        ):
+            transpose_mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(
+                build_transpose_kernel(shape, dtype)
+            )
+            [transpose] = transpose_mod.body.operations
+            transpose.operation.move_before(func_op)
+        dispatch: iree.compiler.ir.Operation = iree.compiler.ir.Operation.create(
+            "flow.dispatch",
+            results=[tensor_type],
+            operands=[value],
+            attributes={
+                "entry_points": ktable[name, (source, target)],
+                "operandSegmentSizes": iree.compiler.ir.DenseI32ArrayAttr.get(
+                    [0, 1, 0, 0]
+                ),
+            },
+            loc=op.location,
+            ip=iree.compiler.ir.InsertionPoint(op),
+        )
+        [result] = dispatch.results
+        return result
+
+    @staticmethod
+    def _update(
+        op: iree.compiler.dialects.flow.TensorUpdateOp, layout: Tuple[int, ...]
+    ) -> None:
+        ip: iree.compiler.ir.InsertionPoint = iree.compiler.ir.InsertionPoint(op)
+        target: iree.compiler.ir.Value = Generator._reshape(
+            op.target, layout, op.location, ip
+        )
+        update: iree.compiler.ir.Value = Generator._reshape(
+            op.update, layout, op.location, ip
+        )
+        start_indices: List[iree.compiler.ir.Value] = [
+            op.start_indices[dim] for dim in layout
+        ]
+        updated: iree.compiler.ir.Operation = iree.compiler.ir.Operation.create(
+            "flow.tensor.update",
+            results=[target.type],
+            operands=[target, *start_indices, update],
+            attributes={
+                "operandSegmentSizes": iree.compiler.ir.DenseI32ArrayAttr.get(
+                    [1, 0, len(start_indices), 1, 0]
+                ),
+            },
+            loc=op.location,
+            ip=ip,
+        )
+        [result] = updated.results
+        result = Generator._reshape(
+            result, tuple(np.argsort(layout).tolist()), op.location, ip
+        )
+        op.result.replace_all_uses_with(result)
+        op.operation.erase()
+
+    @staticmethod
+    def _import(
+        op: iree.compiler.dialects.hal.TensorImportOp, layout: Tuple[int, ...]
+    ) -> None:
+        tensor_type: iree.compiler.ir.RankedTensorType = op.result.type
+        stored_type: iree.compiler.ir.RankedTensorType = (
+            iree.compiler.ir.RankedTensorType.get(
+                [tensor_type.shape[dim] for dim in layout],
+                tensor_type.element_type,
+                loc=op.location,
+            )
+        )
+        op.result.set_type(stored_type)
+        op.attributes["target_encoding"] = iree.compiler.ir.TypeAttr.get(stored_type)
+        result: iree.compiler.ir.Value = Generator._reshape(
+            op.result,
+            tuple(np.argsort(layout).tolist()),
+            op.location,
+            iree.compiler.ir.InsertionPoint(op),
+        )
+        reshape: iree.compiler.ir.Operation = result.owner
+        reshape.move_after(op)
+        op.result.replace_all_uses_with(result)
+        reshape.operands[0] = op.result
+
+    @staticmethod
+    def _export(
+        op: iree.compiler.dialects.hal.TensorExportOp, layout: Tuple[int, ...]
+    ) -> None:
+        source: iree.compiler.ir.Value = Generator._reshape(
+            op.source, layout, op.location, iree.compiler.ir.InsertionPoint(op)
+        )
+        op.operands[0] = source
+        op.attributes["source_encoding"] = iree.compiler.ir.TypeAttr.get(source.type)
+
+    @staticmethod
+    def _reshape(
+        value: iree.compiler.ir.Value,
+        layout: Tuple[int, ...],
+        loc: iree.compiler.ir.Location,
+        ip: iree.compiler.ir.InsertionPoint,
+    ) -> iree.compiler.ir.Value:
+        # Reinterprets the elements of a tensor as its shape permuted by the
+        # layout, without moving them.
+        tensor_type: iree.compiler.ir.RankedTensorType = value.type
+        shape: List[int] = [tensor_type.shape[dim] for dim in layout]
+        reshape: iree.compiler.ir.Operation = iree.compiler.ir.Operation.create(
+            "flow.tensor.reshape",
+            results=[
+                iree.compiler.ir.RankedTensorType.get(
+                    shape, tensor_type.element_type, loc=loc
+                )
+            ],
+            operands=[value],
+            attributes={
+                "operandSegmentSizes": iree.compiler.ir.DenseI32ArrayAttr.get(
+                    [1, 0, 0]
+                ),
+            },
+            loc=loc,
+            ip=ip,
+        )
+        [result] = reshape.results
+        return result
@@ -1,9 +1,10 @@
 import argparse
 import os
+import sys
 
 from typing import Any, Dict, Optional, TypeVar
 
-from ..utils import IOStat, KStat, Stat
+from ..utils import STATISTICS, IOStat, KStat, Stat
 from .io import IOProfiler
 from .kernel import KernelProfiler
 from .pipeline import PipelineProfiler
@@ -46,7 +47,32 @@ def main():
         "--times",
         type=int,
         default=50,
-        help="number of times to benchmark each kernel",
+        help="maximum number of times to benchmark each kernel",
+    )
+    profiler.add_argument(
+        "--min-times",
+        type=int,
+        default=5,
+        help="minimum number of times to benchmark each kernel",
+    )
+    profiler.add_argument(
+        "--statistic",
+        type=str,
+        choices=STATISTICS,
+        default="min",
+        help="statistic reported for each kernel",
+    )
+    profiler.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.05,
+        help="relative half-width of the confidence interval to stop sampling at",
+    )
+    profiler.add_argument(
+        "--budget",
+        type=float,
+        default=1.0,
+        help="time budget in seconds to benchmark each kernel",
     )
     profiler.add_argument(
         "--jobs",
@@ -70,7 +96,31 @@ def main():
         "--profile-cache",
         default=None,
         type=str,
-        help="cache file for profiling results",
+        help="cache directory for profiling results",
+    )
+    profiler.add_argument(
+        "--profile-cache-size",
+        default=4096,
+        type=int,
+        help="maximum size of the profile cache in MiB",
+    )
+    profiler.add_argument(
+        "--kernel-db",
+        default=None,
+        type=str,
+        help="SQLite database of kernel timings shared across models",
+    )
+    profiler.add_argument(
+        "--max-inflight",
+        default=None,
+        type=int,
+        help="maximum number of kernel variants compiled or queued at once",
+    )
+    profiler.add_argument(
+        "--max-memory",
+        default=4096,
+        type=int,
+        help="maximum memory in MiB held by the texts and compiled buffers of queued kernel variants",
     )
     profiler.add_argument(
         "--compile-options",
@@ -103,6 +153,13 @@ def main():
         required=True,
         help="path to the JSON file containing KStat data",
     )
+    reducer.add_argument(
+        "--statistic",
+        type=str,
+        choices=STATISTICS,
+        default=None,
+        help="IOStat statistic subtracted from every kernel statistic, defaults to the matching one",
+    )
     reducer.add_argument(
         "--output",
         type=str,
@@ -115,28 +172,56 @@ def main():
         with open(filename, "r") as f:
             mod: str = f.read()
         times: int = args.times
+        min_times: int = args.min_times
+        statistic: str = args.statistic
+        tolerance: float = args.tolerance
+        budget: float = args.budget
         worker_num: int = args.jobs
         check_period: float = args.check_period
         driver: str = args.driver
         profile_cache: Optional[str] = args.profile_cache
+        profile_cache_size: int = args.profile_cache_size
+        kernel_db: Optional[str] = args.kernel_db
+        max_inflight: Optional[int] = args.max_inflight
+        max_memory: int = args.max_memory
         compile_options: Dict[str, Any] = eval(args.compile_options)
         output: Optional[str] = args.output
         cls: ProfilerCls = dispatch_table[args.mode]
         profiler: ProfilerCls = cls(
-            times, worker_num, check_period, driver, profile_cache, compile_options
+            times,
+            worker_num,
+            check_period,
+            driver,
+            profile_cache,
+            compile_options,
+            profile_cache_size=profile_cache_size,
+            kernel_db=kernel_db,
+            max_inflight=max_inflight,
+            max_memory=max_memory,
+            statistic=statistic,
+            min_times=min_times,
+            tolerance=tolerance,
+            budget=budget,
         )
         stat: Stat = profiler.run(mod)
         with open(output, "w") as f:
             stat.dump(f)
+        # Hits and misses of the profile cache, on stderr to keep stdout clean.
+        if (
+            isinstance(profiler, (KernelProfiler, PipelineProfiler))
+            and profiler.cache is not None
+        ):
+            print(profiler.cache, file=sys.stderr)
     elif args.subcommand == "reduce":
         iostatf: str = args.iostat
         with open(iostatf, "r") as f:
             iostat: IOStat = IOStat.build(f)
         kstatf: str = args.kstat
-        with open(kstatf, "r") as f:
+        with open(kstatf, "rb") as f:
             kstat: KStat = KStat.build(f)
+        statistic: Optional[str] = args.statistic
         output: str = args.output
-        rstat: KStat = kstat.reduce(iostat)
+        rstat: KStat = kstat.reduce(iostat, statistic)
         with open(output, "w") as f:
             rstat.dump(f)
 
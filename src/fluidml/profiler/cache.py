@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .util import get_target
+
+
+class ProfileCache(object):
+    _RECORD_SUFFIX: str = ".json"
+    _BUFFER_SUFFIX: str = ".vmfb"
+
+    def __init__(
+        self,
+        path: str,
+        driver: str,
+        compile_options: Dict[str, Any],
+        capacity: int,
+        *args,
+        **kwargs,
+    ) -> ProfileCache:
+        super().__init__(*args, **kwargs)
+        os.makedirs(path, exist_ok=True)
+        self._path: str = path
+        self._capacity: int = capacity
+        self._salt: str = get_target(driver, compile_options)
+        self._hits: int = 0
+        self._misses: int = 0
+        self._size: int = sum(size for _, _, size in self._scan())
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._record_path(key))
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(path={self._path}, hits={self._hits}, misses={self._misses}, size={self._size})"
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def key(self, sub_mod_text: str) -> str:
+        digest: hashlib._Hash = hashlib.sha256()
+        digest.update(self._salt.encode())
+        digest.update(b"\0")
+        digest.update(sub_mod_text.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path: str = self._record_path(key)
+        try:
+            with open(path, "r") as f:
+                record: Dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._touch(key)
+        return record
+
+    def get_buffer(self, key: str) -> Optional[bytes]:
+        path: str = self._buffer_path(key)
+        try:
+            with open(path, "rb") as f:
+                buffer: bytes = f.read()
+        except OSError:
+            return None
+        self._touch(key)
+        return buffer
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        self._write(self._record_path(key), json.dumps(record).encode())
+        self.evict()
+
+    def put_buffer(self, key: str, buffer: bytes) -> None:
+        self._write(self._buffer_path(key), buffer)
+        self.evict()
+
+    def evict(self) -> None:
+        if self._size <= self._capacity:
+            return
+        entries: Dict[str, Tuple[float, int]] = {}
+        for key, mtime, size in self._scan():
+            last_mtime, total = entries.get(key, (0.0, 0))
+            entries[key] = (max(last_mtime, mtime), total + size)
+        self._size = sum(size for _, size in entries.values())
+        for key, (_, size) in sorted(entries.items(), key=lambda x: x[1][0]):
+            if self._size <= self._capacity:
+                break
+            for path in [self._record_path(key), self._buffer_path(key)]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size -= size
+
+    def _buffer_path(self, key: str) -> str:
+        return os.path.join(self._path, f"{key}{self._BUFFER_SUFFIX}")
+
+    def _record_path(self, key: str) -> str:
+        return os.path.join(self._path, f"{key}{self._RECORD_SUFFIX}")
+
+    def _scan(self) -> List[Tuple[str, float, int]]:
+        entries: List[Tuple[str, float, int]] = []
+        with os.scandir(self._path) as it:
+            for entry in it:
+                for suffix in [self._RECORD_SUFFIX, self._BUFFER_SUFFIX]:
+                    if entry.is_file() and entry.name.endswith(suffix):
+                        stat: os.stat_result = entry.stat()
+                        entries += [
+                            (
+                                entry.name.removesuffix(suffix),
+                                stat.st_mtime,
+                                stat.st_size,
+                            )
+                        ]
+        return entries
+
+    def _touch(self, key: str) -> None:
+        for path in [self._record_path(key), self._buffer_path(key)]:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    def _write(self, path: str, data: bytes) -> None:
+        try:
+            self._size -= os.path.getsize(path)
+        except OSError:
+            pass
+        tmp_path: str = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._size += len(data)
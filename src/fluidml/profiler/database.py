@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import numpy as np
+import sqlite3
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils import FIELDS, UNIT, convert_record
+from .util import get_target
+
+
+class KernelDatabase(object):
+    def __init__(
+        self,
+        path: str,
+        driver: str,
+        compile_options: Dict[str, Any],
+        *args,
+        **kwargs,
+    ) -> KernelDatabase:
+        super().__init__(*args, **kwargs)
+        self._target: str = hashlib.sha256(
+            get_target(driver, compile_options).encode()
+        ).hexdigest()
+        self._conn: sqlite3.Connection = sqlite3.connect(path, timeout=60.0)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                "fingerprint TEXT NOT NULL, "
+                "target TEXT NOT NULL, "
+                "PRIMARY KEY (fingerprint, target))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "fingerprint TEXT NOT NULL, "
+                "target TEXT NOT NULL, "
+                "layouts TEXT NOT NULL, "
+                f"{', '.join(f'{field} REAL NOT NULL' for field in FIELDS)}, "
+                "PRIMARY KEY (fingerprint, target, layouts))"
+            )
+            # Databases without a unit were only written in ns.
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta ("
+                "key TEXT NOT NULL PRIMARY KEY, "
+                "value TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('unit', ?)", (UNIT,)
+            )
+        (self._unit,) = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'unit'"
+        ).fetchone()
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return self.contains(fingerprint)
+
+    def __del__(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        conn: Optional[sqlite3.Connection] = getattr(self, "_conn", None)
+        if conn is not None:
+            conn.close()
+            self._conn = None
+
+    def contains(self, fingerprint: str) -> bool:
+        row: Optional[Tuple[int]] = self._conn.execute(
+            "SELECT 1 FROM profiles WHERE fingerprint = ? AND target = ?",
+            (fingerprint, self._target),
+        ).fetchone()
+        return row is not None
+
+    def get(
+        self, fingerprint: str
+    ) -> Optional[Dict[Tuple[Tuple[int, ...], ...], np.ndarray]]:
+        if not self.contains(fingerprint):
+            return None
+        rows: List[Tuple[Any, ...]] = self._conn.execute(
+            f"SELECT layouts, {', '.join(FIELDS)} FROM records "
+            "WHERE fingerprint = ? AND target = ?",
+            (fingerprint, self._target),
+        ).fetchall()
+        table: Dict[Tuple[Tuple[int, ...], ...], np.ndarray] = {}
+        for layouts, *record in rows:
+            layouts: Tuple[Tuple[int, ...], ...] = tuple(
+                tuple(layout) for layout in json.loads(layouts)
+            )
+            table[layouts] = convert_record(
+                np.array(record, dtype=np.float64), self._unit
+            )
+        return table
+
+    @property
+    def unit(self) -> str:
+        return self._unit
+
+    def put(
+        self,
+        fingerprint: str,
+        table: Dict[Tuple[Tuple[int, ...], ...], np.ndarray],
+    ) -> None:
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO records "
+                f"(fingerprint, target, layouts, {', '.join(FIELDS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' for _ in FIELDS)})",
+                [
+                    (
+                        fingerprint,
+                        self._target,
+                        json.dumps([list(layout) for layout in layouts]),
+                        # Stored in the unit the database was created with.
+                        *convert_record(record, UNIT, self._unit).tolist(),
+                    )
+                    for layouts, record in table.items()
+                ],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (fingerprint, target) VALUES (?, ?)",
+                (fingerprint, self._target),
+            )
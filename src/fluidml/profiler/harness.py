@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import cuda.bindings.runtime
+import gc
+import iree.runtime
+import numpy as np
+import time
+
+from typing import Callable, Dict, List, Tuple, Union
+
+from ..utils import map_str_dtype
+from .sampler import Sampler
+
+
+class Harness(object):
+    def __init__(self, driver: str, sampler: Sampler, *args, **kwargs) -> Harness:
+        super().__init__(*args, **kwargs)
+        self._driver: str = driver
+        self._sampler: Sampler = sampler
+        self._config: iree.runtime.Config = iree.runtime.Config(driver)
+        self._inputs: Dict[
+            Tuple[Tuple[Tuple[int, ...], str], ...], List[iree.runtime.DeviceArray]
+        ] = {}
+
+    @property
+    def sampler(self) -> Sampler:
+        return self._sampler
+
+    def benchmark(
+        self,
+        buffer: bytes,
+        fname: str,
+        input_types: List[Tuple[Tuple[int, ...], str]],
+    ) -> List[float]:
+        ctx: iree.runtime.SystemContext = self.load(buffer)
+        try:
+            f: Callable = ctx.modules.module[fname]
+            return self.measure(f, self.inputs(input_types))
+        finally:
+            del ctx
+
+    def inputs(
+        self, input_types: List[Tuple[Tuple[int, ...], str]]
+    ) -> List[iree.runtime.DeviceArray]:
+        key: Tuple[Tuple[Tuple[int, ...], str], ...] = tuple(
+            (tuple(shape), dtype) for shape, dtype in input_types
+        )
+        inputs: List[iree.runtime.DeviceArray] = self._inputs.get(key)
+        if inputs is None:
+            inputs = [
+                iree.runtime.asdevicearray(
+                    self._config.device,
+                    np.zeros(shape).astype(map_str_dtype(dtype)),
+                )
+                for shape, dtype in input_types
+            ]
+            self._inputs[key] = inputs
+        return inputs
+
+    def load(self, buffer: bytes) -> iree.runtime.SystemContext:
+        ctx: iree.runtime.SystemContext = iree.runtime.SystemContext(
+            config=self._config
+        )
+        vm_module: iree.runtime.VmModule = iree.runtime.VmModule.copy_buffer(
+            ctx.instance, buffer
+        )
+        ctx.add_vm_module(vm_module)
+        return ctx
+
+    def measure(
+        self,
+        f: Callable,
+        inputs: List[Union[np.ndarray, iree.runtime.DeviceArray]],
+    ) -> List[float]:
+        for _ in range(self._sampler.warmup):
+            f(*inputs)
+        samples: List[float] = []
+        start: float = time.perf_counter()
+        while not self._sampler.done(samples, time.perf_counter() - start):
+            samples += [self.sample(f, inputs)]
+        return samples
+
+    def sample(
+        self,
+        f: Callable,
+        inputs: List[Union[np.ndarray, iree.runtime.DeviceArray]],
+    ) -> float:
+        gc.disable()
+        if self._driver == "cuda":
+            error, start_event = cuda.bindings.runtime.cudaEventCreate()
+            assert (
+                error == cuda.bindings.runtime.cudaError_t.cudaSuccess
+            ), f"cudaEventCreate failed: {error}"
+            error, end_event = cuda.bindings.runtime.cudaEventCreate()
+            assert (
+                error == cuda.bindings.runtime.cudaError_t.cudaSuccess
+            ), f"cudaEventCreate failed: {error}"
+            cuda.bindings.runtime.cudaEventRecord(start_event, 0)
+        else:
+            start: int = time.perf_counter_ns()
+        try:
+            f(*inputs)
+        except Exception as e:
+            gc.enable()
+            if self._driver == "cuda":
+                cuda.bindings.runtime.cudaEventDestroy(start_event)
+                cuda.bindings.runtime.cudaEventDestroy(end_event)
+            raise e
+        if self._driver == "cuda":
+            (error,) = cuda.bindings.runtime.cudaEventRecord(end_event, 0)
+            assert (
+                error == cuda.bindings.runtime.cudaError_t.cudaSuccess
+            ), f"cudaEventRecord failed: {error}"
+            (error,) = cuda.bindings.runtime.cudaEventSynchronize(end_event)
+            assert (
+                error == cuda.bindings.runtime.cudaError_t.cudaSuccess
+            ), f"cudaEventSynchronize failed: {error}"
+            error, cur_time = cuda.bindings.runtime.cudaEventElapsedTime(
+                start_event, end_event
+            )
+            assert (
+                error == cuda.bindings.runtime.cudaError_t.cudaSuccess
+            ), f"cudaEventElapsedTime failed: {error}"
+            cuda.bindings.runtime.cudaEventDestroy(start_event)
+            cuda.bindings.runtime.cudaEventDestroy(end_event)
+            cur_time = cur_time * 1e6
+        else:
+            end: int = time.perf_counter_ns()
+            cur_time: float = (end - start) * 1.0
+        gc.enable()
+        return cur_time
@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-import cuda.bindings.runtime
-import gc
 import iree.compiler.dialects.flow
 import iree.compiler.dialects.func
 import iree.compiler.dialects.hal
@@ -9,12 +7,11 @@ import iree.compiler.dialects.util
 import iree.compiler.ir
 import iree.runtime
 import numpy as np
-import sys
-import time
 
 from typing import Any, Callable, Dict, List, Optional
 
-from ..utils import IOStat, map_str_dtype
+from ..utils import IOStat, build_record, map_str_dtype
+from .harness import Harness
 from .profiler import Profiler
 
 
@@ -76,13 +73,9 @@ class IOProfiler(Profiler):
             str(mod),
             **self._compile_commands,
         )
-        config: iree.runtime.Config = iree.runtime.Config(self._driver)
-        ctx: iree.runtime.SystemContext = iree.runtime.SystemContext(config=config)
-        vm_module: iree.runtime.VmModule = iree.runtime.VmModule.copy_buffer(
-            ctx.instance, buffer
-        )
-        ctx.add_vm_module(vm_module)
-        iostat: IOStat = IOStat()
+        harness: Harness = Harness(self._driver, self._sampler)
+        ctx: iree.runtime.SystemContext = harness.load(buffer)
+        iostat: IOStat = IOStat(statistic=self._sampler.statistic)
         for operation in mod.body.operations:
             if isinstance(
                 operation.opview, iree.compiler.dialects.util.FuncOp
@@ -97,51 +90,5 @@ class IOProfiler(Profiler):
                     if isinstance(op, iree.compiler.dialects.hal.TensorImportOp)
                 ]
                 f: Callable = ctx.modules.module[operation.sym_name.value]
-                for _ in range(self._times // 10):
-                    f(*inputs)
-                exec_time: float = sys.float_info.max
-                for _ in range(self._times):
-                    gc.disable()
-                    if self._driver == "cuda":
-                        error, start_event = cuda.bindings.runtime.cudaEventCreate()
-                        assert (
-                            error == cuda.bindings.runtime.cudaError_t.cudaSuccess
-                        ), f"cudaEventCreate failed: {error}"
-                        error, end_event = cuda.bindings.runtime.cudaEventCreate()
-                        assert (
-                            error == cuda.bindings.runtime.cudaError_t.cudaSuccess
-                        ), f"cudaEventCreate failed: {error}"
-                        cuda.bindings.runtime.cudaEventRecord(start_event, 0)
-                    else:
-                        start: int = time.perf_counter_ns()
-                    try:
-                        f(*inputs)
-                    except Exception as e:
-                        gc.enable()
-                        if self._driver == "cuda":
-                            cuda.bindings.runtime.cudaEventDestroy(start_event)
-                            cuda.bindings.runtime.cudaEventDestroy(end_event)
-                        raise e
-                    if self._driver == "cuda":
-                        (error,) = cuda.bindings.runtime.cudaEventRecord(end_event, 0)
-                        assert (
-                            error == cuda.bindings.runtime.cudaError_t.cudaSuccess
-                        ), f"cudaEventRecord failed: {error}"
-                        (error,) = cuda.bindings.runtime.cudaEventSynchronize(end_event)
-                        assert (
-                            error == cuda.bindings.runtime.cudaError_t.cudaSuccess
-                        ), f"cudaEventSynchronize failed: {error}"
-                        error, cur_time = cuda.bindings.runtime.cudaEventElapsedTime(
-                            start_event, end_event
-                        )
-                        assert (
-                            error == cuda.bindings.runtime.cudaError_t.cudaSuccess
-                        ), f"cudaEventElapsedTime failed: {error}"
-                        cur_time = cur_time * 1e6
-                    else:
-                        end: int = time.perf_counter_ns()
-                        cur_time: float = (end - start) * 1.0
-                    gc.enable()
-                    exec_time = min(exec_time, cur_time)
-                iostat[kernel_name] = exec_time
+                iostat[kernel_name] = build_record(harness.measure(f, inputs))
         return iostat
@@ -6,20 +6,26 @@ import iree.compiler.ir
 import iree.compiler.dialects.flow
 import iree.compiler.dialects.func
 import iree.compiler.dialects.util
-import iree.runtime
 import numpy as np
-import os
-import re
 
 from itertools import product
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 
-from ..utils import KStat, permute_shape, map_str_dtype
+from ..utils import (
+    UNIT,
+    KStat,
+    build_record,
+    build_transpose_kernel,
+    convert_record,
+    permute_shape,
+)
+from .cache import ProfileCache
+from .database import KernelDatabase
+from .harness import Harness
 from .profiler import Profiler
-from .util import get_signature
-
-_MS_REGEX: re.Pattern = re.compile(r"(\d+(?:\.\d+)?)\s*ms")
+from .util import get_fingerprint, get_signature
+from .window import InflightWindow
 
 
 class KernelProfiler(Profiler):
@@ -44,133 +50,284 @@ class KernelProfiler(Profiler):
             *args,
             **kwargs,
         )
+        if self._profile_cache is not None:
+            self._cache: Optional[ProfileCache] = ProfileCache(
+                self._profile_cache,
+                self._driver,
+                self._compile_commands,
+                self._profile_cache_size << 20,
+            )
+        else:
+            self._cache: Optional[ProfileCache] = None
+        if self._kernel_db is not None:
+            self._database: Optional[KernelDatabase] = KernelDatabase(
+                self._kernel_db, self._driver, self._compile_commands
+            )
+        else:
+            self._database: Optional[KernelDatabase] = None
+
+    @property
+    def cache(self) -> Optional[ProfileCache]:
+        return self._cache
+
+    @property
+    def database(self) -> Optional[KernelDatabase]:
+        return self._database
 
     def run(self, mod: str) -> KStat:
         mp_context: multiprocessing.context.BaseContext = multiprocessing.get_context(
             "spawn"
         )
-        kstat: KStat = KStat()
+        kstat: KStat = KStat(statistic=self._sampler.statistic)
+        groups: Dict[str, List[str]] = {}
+        signatures: Dict[str, Tuple[str, str, List[Tuple[Tuple[int, ...], str]]]] = {}
+        remaining: Dict[str, int] = {}
+        window: InflightWindow = InflightWindow(self._max_inflight, self._max_memory)
+        harness: Harness = Harness(self._driver, self._sampler)
         with iree.compiler.ir.Context(), concurrent.futures.ProcessPoolExecutor(
             max_workers=self._worker_num, mp_context=mp_context
         ) as executor:
             mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(mod)
-            for operation in mod.body.operations:
-                if isinstance(operation.opview, iree.compiler.dialects.util.GlobalOp):
-                    global_op: iree.compiler.dialects.util.GlobalOp = operation.opview
-                if isinstance(
-                    operation.opview, iree.compiler.dialects.flow.ExecutableOp
-                ):
-                    with iree.compiler.ir.Context(), iree.compiler.ir.Location.unknown():
-                        sub_mod: iree.compiler.ir.Module = (
-                            iree.compiler.ir.Module.create(mod.operation.location)
-                        )
-                        for attr in mod.operation.attributes:
-                            sub_mod.operation.attributes[attr.name] = attr.attr
-                        [sub_block] = sub_mod.body.region.blocks
-                        iree.compiler.dialects.util.global_(
-                            global_op.sym_name,
-                            global_op.type_,
-                            sym_visibility=global_op.sym_visibility,
-                            is_mutable=global_op.is_mutable,
-                            initial_value=global_op.initial_value,
-                            inlining_policy=global_op.inlining_policy,
-                            loc=global_op.location,
-                            ip=iree.compiler.ir.InsertionPoint(sub_mod.body),
-                        )
-                        sub_block.append(operation)
-                        [_, operation] = sub_mod.body.operations
-                        [block] = operation.opview.body.blocks
-                        _, builtin_mod, _ = block.operations
-                        [block] = builtin_mod.body.region.blocks
-                        [kernel] = block.operations
-                        assert isinstance(kernel, iree.compiler.dialects.func.FuncOp)
-                        (
-                            kernel_name,
-                            _,
-                            input_types,
-                            result_types,
-                            _,
-                        ) = get_signature(kernel)
-                        fname: str = self._build_benchmark(
-                            kernel, iree.compiler.ir.InsertionPoint(sub_mod.body)
-                        )
-                        combinations: List[List[Tuple[int, ...]]] = [
-                            list(permute_shape(shape))
-                            for shape, _ in input_types + result_types
+            variants: Iterator[
+                Tuple[
+                    Tuple[str, Tuple[Tuple[int, ...], ...], Optional[str]],
+                    Optional[str],
+                    Optional[bytes],
+                ]
+            ] = self._generate(mod, kstat, groups, signatures, remaining)
+            exhausted: bool = False
+            while not exhausted or window:
+                while not exhausted and not window.full:
+                    item: Optional[
+                        Tuple[
+                            Tuple[str, Tuple[Tuple[int, ...], ...], Optional[str]],
+                            Optional[str],
+                            Optional[bytes],
                         ]
-                        combinations: List[Tuple[Tuple[int, ...], ...]] = list(
-                            product(*combinations)
+                    ] = next(variants, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    variant, sub_mod_text, buffer = item
+                    if buffer is not None:
+                        future: concurrent.futures.Future = concurrent.futures.Future()
+                        future.set_result(buffer)
+                        window.put(future, (variant, False), len(buffer))
+                    else:
+                        future: concurrent.futures.Future = executor.submit(
+                            KernelProfiler._compile_sub_module,
+                            sub_mod_text,
+                            self._compile_commands,
                         )
-                        sub_mod_texts: List[str] = []
-                        for combination in combinations:
-                            for idx, layout in enumerate(combination):
-                                kernel.attributes[f"fluidml.{idx}"] = (
-                                    iree.compiler.ir.Attribute.parse(
-                                        f"array<i64: {', '.join([str(dim) for dim in layout])}>"
-                                    )
-                                )
-                            sub_mod_text: str = str(sub_mod)
-                            if self._profile_cache is not None:
-                                sub_mod_path: str = os.path.join(
-                                    self._profile_cache,
-                                    f'{kernel_name}_{"_".join("x".join(map(str,layout)) for layout in combination)}.mlir',
-                                )
-                                with open(sub_mod_path, "w") as f:
-                                    f.write(sub_mod_text)
-                            sub_mod_texts += [sub_mod_text]
-                        sub_mods: List[
-                            Tuple[Tuple[Tuple[int, ...], ...], Optional[bytes]]
-                        ] = list(
-                            zip(
-                                combinations,
-                                executor.map(
-                                    KernelProfiler._compile_sub_modules_wrapper,
-                                    map(
-                                        lambda sub_mod_text: (
-                                            sub_mod_text,
-                                            self._compile_commands,
-                                        ),
-                                        sub_mod_texts,
-                                    ),
-                                ),
-                            )
+                        window.put(future, (variant, True), len(sub_mod_text))
+                    del future, buffer
+                if not window:
+                    continue
+                # Every completed variant is benchmarked before new ones are
+                # admitted, and its buffer stays charged until then.
+                for future in window.wait():
+                    buffer: Optional[bytes] = future.result()
+                    (kernel_name, layouts, key), compiled = window.pop(future)
+                    del future
+                    fingerprint, fname, input_types = signatures[kernel_name]
+                    if buffer is None:
+                        if key is not None:
+                            self._cache.put(key, {"record": None, "unit": UNIT})
+                    else:
+                        if key is not None and compiled:
+                            self._cache.put_buffer(key, buffer)
+                        record: np.ndarray = build_record(
+                            harness.benchmark(buffer, fname, input_types)
                         )
-                        sub_mods: List[Tuple[Tuple[Tuple[int, ...], ...], bytes]] = [
-                            (layouts, buffer)
-                            for layouts, buffer in sub_mods
-                            if buffer is not None
-                        ]
-                        for layouts, buffer in sub_mods:
-                            config: iree.runtime.Config = iree.runtime.Config(
-                                self._driver
-                            )
-                            ctx: iree.runtime.SystemContext = (
-                                iree.runtime.SystemContext(config=config)
+                        kstat[kernel_name, layouts] = record
+                        if key is not None:
+                            self._cache.put(
+                                key, {"record": record.tolist(), "unit": UNIT}
                             )
-                            vm_module: iree.runtime.VmModule = (
-                                iree.runtime.VmModule.copy_buffer(ctx.instance, buffer)
-                            )
-                            ctx.add_vm_module(vm_module)
-                            inputs: List[np.ndarray] = [
-                                np.zeros(shape).astype(map_str_dtype(dtype))
-                                for shape, dtype in input_types
-                            ]
-                            [(_, time, _, _, _)] = iree.runtime.benchmark_module(
-                                vm_module, fname, inputs, device=self._driver
-                            )
-                            (time,) = _MS_REGEX.match(time).groups()
-                            time: float = float(time)
-                            kstat[kernel_name, layouts] = time
+                    del buffer
+                    remaining[kernel_name] -= 1
+                    if remaining[kernel_name] == 0 and self._database is not None:
+                        self._database.put(
+                            fingerprint, kstat.get_record(kernel_name, {})
+                        )
+        for representative, *duplicates in groups.values():
+            for duplicate in duplicates:
+                kstat[duplicate] = kstat.get_record(representative, {})
         return kstat
 
-    @staticmethod
-    def _compile_sub_modules_wrapper(args: Tuple[str, Dict[str, Any]]) -> Optional[str]:
-        return KernelProfiler._compile_sub_module(*args)
+    def _generate(
+        self,
+        mod: iree.compiler.ir.Module,
+        kstat: KStat,
+        groups: Dict[str, List[str]],
+        signatures: Dict[str, Tuple[str, str, List[Tuple[Tuple[int, ...], str]]]],
+        remaining: Dict[str, int],
+    ) -> Iterator[
+        Tuple[
+            Tuple[str, Tuple[Tuple[int, ...], ...], Optional[str]],
+            Optional[str],
+            Optional[bytes],
+        ]
+    ]:
+        # Besides the kernels of the module, a conversion kernel is profiled for
+        # every shape of a tensor the kernels read, as only dispatches reading
+        # a value convert it. Each layout is only timed from and to the
+        # default one, see transpose_times for the other pairs.
+        shapes: Dict[Tuple[Tuple[int, ...], str], None] = {}
+        for operation in mod.body.operations:
+            if isinstance(operation.opview, iree.compiler.dialects.util.GlobalOp):
+                global_op: iree.compiler.dialects.util.GlobalOp = operation.opview
+            if isinstance(operation.opview, iree.compiler.dialects.flow.ExecutableOp):
+                yield from self._generate_kernel(
+                    mod,
+                    global_op,
+                    operation,
+                    kstat,
+                    groups,
+                    signatures,
+                    remaining,
+                    shapes,
+                )
+        for shape, dtype in shapes:
+            transpose_mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(
+                build_transpose_kernel(shape, dtype), context=mod.context
+            )
+            [operation] = transpose_mod.body.operations
+            reference: Tuple[int, ...] = tuple(range(len(shape)))
+            layouts: List[Tuple[int, ...]] = [
+                layout for layout in permute_shape(shape) if layout != reference
+            ]
+            yield from self._generate_kernel(
+                mod,
+                global_op,
+                operation,
+                kstat,
+                groups,
+                signatures,
+                remaining,
+                combinations=[(reference, layout) for layout in layouts]
+                + [(layout, reference) for layout in layouts],
+            )
+
+    def _generate_kernel(
+        self,
+        mod: iree.compiler.ir.Module,
+        global_op: iree.compiler.dialects.util.GlobalOp,
+        operation: iree.compiler.ir.Operation,
+        kstat: KStat,
+        groups: Dict[str, List[str]],
+        signatures: Dict[str, Tuple[str, str, List[Tuple[Tuple[int, ...], str]]]],
+        remaining: Dict[str, int],
+        shapes: Optional[Dict[Tuple[Tuple[int, ...], str], None]] = None,
+        combinations: Optional[Iterator[Tuple[Tuple[int, ...], ...]]] = None,
+    ) -> Iterator[
+        Tuple[
+            Tuple[str, Tuple[Tuple[int, ...], ...], Optional[str]],
+            Optional[str],
+            Optional[bytes],
+        ]
+    ]:
+        [block] = operation.opview.body.blocks
+        _, builtin_mod, _ = block.operations
+        [block] = builtin_mod.body.region.blocks
+        [kernel] = block.operations
+        fingerprint: str = get_fingerprint(kernel)
+        if fingerprint in groups:
+            groups[fingerprint] += [kernel.sym_name.value]
+            return
+        groups[fingerprint] = [kernel.sym_name.value]
+        with iree.compiler.ir.Context(), iree.compiler.ir.Location.unknown():
+            sub_mod: iree.compiler.ir.Module = iree.compiler.ir.Module.create(
+                mod.operation.location
+            )
+            for attr in mod.operation.attributes:
+                sub_mod.operation.attributes[attr.name] = attr.attr
+            [sub_block] = sub_mod.body.region.blocks
+            iree.compiler.dialects.util.global_(
+                global_op.sym_name,
+                global_op.type_,
+                sym_visibility=global_op.sym_visibility,
+                is_mutable=global_op.is_mutable,
+                initial_value=global_op.initial_value,
+                inlining_policy=global_op.inlining_policy,
+                loc=global_op.location,
+                ip=iree.compiler.ir.InsertionPoint(sub_mod.body),
+            )
+            sub_block.append(operation)
+            [_, operation] = sub_mod.body.operations
+            [block] = operation.opview.body.blocks
+            _, builtin_mod, _ = block.operations
+            [block] = builtin_mod.body.region.blocks
+            [kernel] = block.operations
+            assert isinstance(kernel, iree.compiler.dialects.func.FuncOp)
+            (
+                kernel_name,
+                _,
+                input_types,
+                result_types,
+                _,
+            ) = get_signature(kernel)
+            if shapes is not None:
+                for shape, dtype in input_types:
+                    if len(shape) > 1:
+                        shapes[shape, dtype] = None
+            if self._database is not None:
+                table: Optional[Dict[Tuple[Tuple[int, ...], ...], np.ndarray]] = (
+                    self._database.get(fingerprint)
+                )
+                if table is not None:
+                    kstat[kernel_name] = table
+                    return
+            fname: str = self._build_benchmark(
+                kernel, iree.compiler.ir.InsertionPoint(sub_mod.body)
+            )
+            if combinations is None:
+                combinations = product(
+                    *(permute_shape(shape) for shape, _ in input_types + result_types)
+                )
+            signatures[kernel_name] = (fingerprint, fname, input_types)
+            # One count stands for the variants still to be yielded, so the
+            # table isn't stored while the generator is suspended in between
+            # and all variants yielded so far have finished.
+            remaining[kernel_name] = 1
+            for combination in combinations:
+                for idx, layout in enumerate(combination):
+                    kernel.attributes[f"fluidml.{idx}"] = (
+                        iree.compiler.ir.Attribute.parse(
+                            f"array<i64: {', '.join([str(dim) for dim in layout])}>"
+                        )
+                    )
+                sub_mod_text: str = str(sub_mod)
+                if self._cache is not None:
+                    key: Optional[str] = self._cache.key(sub_mod_text)
+                    record: Optional[Dict[str, Any]] = self._cache.get(key)
+                    # Entries without a unit hold bare times in ms or ns
+                    # depending on the version that wrote them, so they are
+                    # profiled again.
+                    if record is not None and "unit" in record:
+                        if record.get("record") is not None:
+                            kstat[kernel_name, combination] = convert_record(
+                                np.array(record["record"], dtype=np.float64),
+                                record["unit"],
+                            )
+                        continue
+                    buffer: Optional[bytes] = self._cache.get_buffer(key)
+                else:
+                    key: Optional[str] = None
+                    buffer: Optional[bytes] = None
+                remaining[kernel_name] += 1
+                if buffer is not None:
+                    yield (kernel_name, combination, key), None, buffer
+                else:
+                    yield (kernel_name, combination, key), sub_mod_text, None
+            remaining[kernel_name] -= 1
+            if remaining[kernel_name] == 0 and self._database is not None:
+                self._database.put(fingerprint, kstat.get_record(kernel_name, {}))
 
     @staticmethod
     def _compile_sub_module(
         sub_mod_text: str, compile_options: Dict[str, Any]
-    ) -> Optional[str]:
+    ) -> Optional[bytes]:
         try:
             return iree.compiler.compile_str(sub_mod_text, **compile_options)
         except iree.compiler.CompilerToolError:
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from ..utils import IOStat, KStat
+from .cache import ProfileCache
 from .io import IOProfiler
 from .kernel import KernelProfiler
 from .profiler import Profiler
@@ -51,6 +52,10 @@ class PipelineProfiler(Profiler):
             **kwargs,
         )
 
+    @property
+    def cache(self) -> Optional[ProfileCache]:
+        return self._kernel_profiler.cache
+
     def run(self, mod: str) -> KStat:
         io_stat: IOStat = self._io_profiler.run(mod)
         kernel_stat: KStat = self._kernel_profiler.run(mod)
@@ -9,6 +9,7 @@ from abc import abstractmethod
 from typing import Any, Dict, List, Optional, Union
 
 from ..utils import Stat
+from .sampler import Sampler
 from .util import get_signature
 
 
@@ -22,6 +23,14 @@ class Profiler(object):
         profile_cache: Optional[str],
         compile_options: Dict[str, Any],
         *args,
+        profile_cache_size: int = 4096,
+        kernel_db: Optional[str] = None,
+        max_inflight: Optional[int] = None,
+        max_memory: int = 4096,
+        statistic: str = "min",
+        min_times: int = 5,
+        tolerance: float = 0.05,
+        budget: float = 1.0,
         **kwargs,
     ) -> Profiler:
         super().__init__(*args, **kwargs)
@@ -30,6 +39,13 @@ class Profiler(object):
         self._check_period: float = check_period
         self._driver: str = driver
         self._profile_cache: Optional[str] = profile_cache
+        self._profile_cache_size: int = profile_cache_size
+        self._kernel_db: Optional[str] = kernel_db
+        self._max_inflight: int = (
+            max_inflight if max_inflight is not None else 2 * worker_num
+        )
+        self._max_memory: int = max_memory << 20
+        self._sampler: Sampler = Sampler(statistic, min_times, times, tolerance, budget)
         extra_args: str = compile_options.get("extra_args", [])
         extra_args = [
             arg for arg in extra_args if not arg.startswith("--compile-from=")
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import math
+import numpy as np
+import statistics
+
+from typing import Callable, Dict, List, Tuple
+
+
+class Sampler(object):
+    _ESTIMATORS: Dict[str, Callable[[List[float]], float]] = {
+        "mean": statistics.fmean,
+        "median": statistics.median,
+        "min": min,
+        "p90": lambda samples: float(np.percentile(samples, 90)),
+    }
+
+    def __init__(
+        self,
+        statistic: str = "min",
+        min_times: int = 5,
+        max_times: int = 50,
+        tolerance: float = 0.05,
+        budget: float = 1.0,
+        confidence: float = 0.95,
+        *args,
+        **kwargs,
+    ) -> Sampler:
+        super().__init__(*args, **kwargs)
+        if statistic not in self._ESTIMATORS:
+            raise ValueError(
+                f"Unsupported statistic {statistic} for {self.__class__.__name__}, expected one of {[*self._ESTIMATORS]}."
+            )
+        self._statistic: str = statistic
+        self._min_times: int = max(2, min_times)
+        self._max_times: int = max(1, max_times)
+        self._tolerance: float = tolerance
+        self._budget: float = budget
+        self._z: float = statistics.NormalDist().inv_cdf((1.0 + confidence) / 2.0)
+
+    @property
+    def budget(self) -> float:
+        return self._budget
+
+    @property
+    def max_times(self) -> int:
+        return self._max_times
+
+    @property
+    def statistic(self) -> str:
+        return self._statistic
+
+    @property
+    def warmup(self) -> int:
+        return max(1, self._max_times // 10)
+
+    def done(self, samples: List[float], elapsed: float) -> bool:
+        if not samples:
+            return False
+        if len(samples) >= self._max_times or elapsed >= self._budget:
+            return True
+        if len(samples) < self._min_times:
+            return False
+        estimate: float = self.estimate(samples)
+        lower, upper = self.interval(samples)
+        return (upper - lower) / 2.0 <= self._tolerance * abs(estimate)
+
+    def estimate(self, samples: List[float]) -> float:
+        return self._ESTIMATORS[self._statistic](samples)
+
+    def interval(self, samples: List[float]) -> Tuple[float, float]:
+        n: int = len(samples)
+        if self._statistic == "mean":
+            mean: float = statistics.fmean(samples)
+            half: float = self._z * statistics.stdev(samples) / math.sqrt(n)
+            return mean - half, mean + half
+        # Distribution-free interval of a quantile from order statistics. The
+        # median one also bounds how stable the lower tail (and so the minimum)
+        # has become.
+        q: float = 0.9 if self._statistic == "p90" else 0.5
+        ordered: List[float] = sorted(samples)
+        spread: float = self._z * math.sqrt(n * q * (1.0 - q))
+        lower: int = max(0, math.floor(n * q - spread))
+        upper: int = min(n - 1, math.ceil(n * q + spread) - 1)
+        return ordered[lower], ordered[upper]
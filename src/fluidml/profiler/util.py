@@ -1,12 +1,21 @@
+import hashlib
 import iree.compiler.dialects.func
+import importlib.metadata
+import json
+import os
+import platform
 import re
 
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 __flow_dispatch_tensor_pattern: re.Pattern = re.compile(
     r"^!flow\.dispatch\.tensor<(readonly|writeonly|readwrite):tensor<((?:\d+x)+[fi]\d+)>>$"
 )
 __fluidml_arg_pattern: re.Pattern = re.compile(r"^fluidml\.(\d+)$")
+__canonical_pattern: re.Pattern = re.compile(
+    r'(@"(?:[^"\\]|\\.)*"|@[\w$.\-]+|%[\w$.\-]+|\^[\w$.\-]+)'
+)
 
 
 def get_signature(
@@ -46,3 +55,55 @@ def get_signature(
             axes_map[id] = tuple(int(elem) for elem in attribute.attr)
     axes: Tuple[Tuple[int, ...]] = tuple(axes_map[idx] for idx in range(len(axes_map)))
     return kernel_name, mod_name, input_types, result_types, axes
+
+
+@lru_cache(maxsize=None)
+def get_host_fingerprint() -> str:
+    uname: platform.uname_result = platform.uname()
+    cpu: str = platform.processor()
+    if os.path.exists("/proc/cpuinfo"):
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    _, cpu = line.split(":", 1)
+                    cpu = cpu.strip()
+                    break
+    versions: List[str] = []
+    for package in ["iree-base-compiler", "iree-base-runtime"]:
+        try:
+            versions += [f"{package}=={importlib.metadata.version(package)}"]
+        except importlib.metadata.PackageNotFoundError:
+            versions += [f"{package}==unknown"]
+    return "|".join([uname.system, uname.machine, cpu, str(os.cpu_count()), *versions])
+
+
+def get_target(driver: str, compile_options: Dict[str, Any]) -> str:
+    return json.dumps(
+        {
+            "compile_options": compile_options,
+            "driver": driver,
+            "host": get_host_fingerprint(),
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+
+def canonicalize(text: str) -> str:
+    names: Dict[str, str] = {}
+    counters: Dict[str, int] = {"@": 0, "%": 0, "^": 0}
+
+    def rename(match: re.Match[str]) -> str:
+        name: str = match.group(0)
+        if name not in names:
+            sigil: str = name[0]
+            names[name] = f"{sigil}{counters[sigil]}"
+            counters[sigil] += 1
+        return names[name]
+
+    return __canonical_pattern.sub(rename, text)
+
+
+def get_fingerprint(kernel: iree.compiler.dialects.func.FuncOp) -> str:
+    text: str = canonicalize(str(kernel))
+    return hashlib.sha256(text.encode()).hexdigest()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import concurrent.futures
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class InflightWindow(object):
+    def __init__(
+        self, max_inflight: int, max_memory: int, *args, **kwargs
+    ) -> InflightWindow:
+        super().__init__(*args, **kwargs)
+        self._max_inflight: int = max_inflight
+        self._max_memory: int = max_memory
+        # The item of each future, the bytes it is charged and whether it
+        # completed and was charged its result.
+        self._futures: Dict[concurrent.futures.Future, Tuple[Any, int, bool]] = {}
+        self._resident: int = 0
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    @property
+    def full(self) -> bool:
+        # Always admits a future into an empty window, so a single variant
+        # larger than the memory cap still makes progress.
+        self._settle()
+        return bool(self._futures) and (
+            len(self._futures) >= self._max_inflight
+            or self._resident >= self._max_memory
+        )
+
+    @property
+    def resident(self) -> int:
+        return self._resident
+
+    def put(self, future: concurrent.futures.Future, item: Any, size: int) -> None:
+        # Charged the given size, e.g. of the text being compiled, until the
+        # future completes.
+        self._futures[future] = (item, size, False)
+        self._resident += size
+
+    def wait(self) -> List[concurrent.futures.Future]:
+        # Blocks until a future completes and returns every completed one. Their
+        # results stay charged until they are popped.
+        concurrent.futures.wait(
+            [*self._futures], return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        self._settle()
+        return [future for future, (_, _, settled) in self._futures.items() if settled]
+
+    def pop(self, future: concurrent.futures.Future) -> Any:
+        item, size, _ = self._futures.pop(future)
+        self._resident -= size
+        return item
+
+    def _settle(self) -> None:
+        # A compiled buffer is usually far larger than its text, so completed
+        # futures are charged the size of their results instead.
+        for future, (item, size, settled) in self._futures.items():
+            if not settled and future.done():
+                result: Optional[bytes] = future.result()
+                charge: int = len(result) if result is not None else 0
+                self._futures[future] = (item, charge, True)
+                self._resident += charge - size
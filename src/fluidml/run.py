@@ -1,6 +1,6 @@
 import os
 
-from typing import Optional, Union
+from typing import Dict, Optional, Tuple, Union
 
 from .analyzer import DynamicProgramAnalyzer
 from .generator import Generator
@@ -8,12 +8,29 @@ from .profiler import KernelProfiler
 from .utils import KStat, Schedule
 
 times: int = int(os.getenv("FLUIDML_TIME", 50))
+min_times: int = int(os.getenv("FLUIDML_MIN_TIME", 5))
+statistic: str = os.getenv("FLUIDML_STATISTIC", "min")
+tolerance: float = float(os.getenv("FLUIDML_TOLERANCE", 0.05))
+budget: float = float(os.getenv("FLUIDML_BUDGET", 1.0))
 worker_num: int = int(os.getenv("FLUIDML_WORKER_NUM", os.cpu_count()))
 check_period: float = float(os.getenv("FLUIDML_CHECK_PERIOD", 5.0))
 profile_cache: Optional[str] = os.getenv("FLUIDML_PROFILE_CACHE", None)
+profile_cache_size: int = int(os.getenv("FLUIDML_PROFILE_CACHE_SIZE", 4096))
+kernel_db: Optional[str] = os.getenv("FLUIDML_KERNEL_DB", None)
+max_inflight: Optional[int] = (
+    int(os.getenv("FLUIDML_MAX_INFLIGHT"))
+    if os.getenv("FLUIDML_MAX_INFLIGHT")
+    else None
+)
+max_memory: int = int(os.getenv("FLUIDML_MAX_MEMORY", 4096))
 
 
-def run(flow: Union[str, bytes], driver: str, **kwargs) -> str:
+def run(
+    flow: Union[str, bytes],
+    driver: str,
+    layouts: Optional[Dict[str, Tuple[int, ...]]] = None,
+    **kwargs,
+) -> str:
     if isinstance(flow, bytes):
         mod: str = flow.decode()
     elif isinstance(flow, str):
@@ -21,10 +38,25 @@ def run(flow: Union[str, bytes], driver: str, **kwargs) -> str:
     else:
         raise TypeError(f"Unsupported type {type(flow)} for fulidml.run")
     profiler: KernelProfiler = KernelProfiler(
-        times, worker_num, check_period, driver, profile_cache, kwargs
+        times,
+        worker_num,
+        check_period,
+        driver,
+        profile_cache,
+        kwargs,
+        profile_cache_size=profile_cache_size,
+        kernel_db=kernel_db,
+        max_inflight=max_inflight,
+        max_memory=max_memory,
+        statistic=statistic,
+        min_times=min_times,
+        tolerance=tolerance,
+        budget=budget,
     )
     kstat: KStat = profiler.run(mod)
-    analyzer: DynamicProgramAnalyzer = DynamicProgramAnalyzer()
+    analyzer: DynamicProgramAnalyzer = DynamicProgramAnalyzer(
+        statistic, worker_num, boundaries=layouts
+    )
     schedule: Schedule = analyzer.run(mod, kstat)
-    generator: Generator = Generator()
+    generator: Generator = Generator(layouts)
     return generator.run(mod, schedule)
@@ -8,9 +8,15 @@ import pandas
 
 from collections import defaultdict
 from itertools import chain
-from typing import BinaryIO, Dict, List, TextIO, Tuple
+from typing import BinaryIO, Dict, List, Optional, Set, TextIO, Tuple
 
-from ...utils import KStat, Schedule
+from ...utils import (
+    KStat,
+    Schedule,
+    intern_layout,
+    transpose_kernel_name,
+    transpose_times,
+)
 
 
 class Ablation(object):
@@ -62,8 +68,10 @@ class Ablation(object):
         mod: str,
         kstat: KStat,
         schedule: Schedule,
+        statistic: Optional[str] = None,
     ) -> Ablation:
         """Build the ablation tool."""
+        kstat: KStat = kstat.select(statistic)
         with iree.compiler.ir.Context():
             mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(mod)
             func_ops: List[iree.compiler.dialects.util.FuncOp] = list(
@@ -81,6 +89,10 @@ class Ablation(object):
             else:
                 raise NotImplementedError(f"Unsupported number of FuncOps: {func_ops}")
             time_map: Dict[str, Tuple[float, float]] = defaultdict(lambda: (0.0, 0.0))
+            converted: Set[Tuple[str, Tuple[int, ...]]] = set()
+            # Ops are numbered as the generator numbers them, which is how the
+            # schedule refers to the readers of a value.
+            index: int = 0
             for region in func_op.regions:
                 for block in region.blocks:
                     for op in block.operations:
@@ -97,9 +109,28 @@ class Ablation(object):
                                 layouts = layouts[: len(op.operands)]
                             etime: float = kstat[func_name, layouts]
                             layouts: Tuple[Tuple[int, ...], ...] = tuple(
-                                schedule[value.get_name()]
+                                schedule.get(
+                                    Schedule.use_key(value.get_name(), index),
+                                    schedule[value.get_name()],
+                                )
                                 for value in chain(op.operands, op.results)
                             )
+                            # Readers converting a value to the same layout
+                            # share the conversion the generator inserts.
+                            for operand, layout in zip(op.operands, layouts):
+                                name: str = operand.get_name()
+                                source: Tuple[int, ...] = schedule[name]
+                                if layout == source or (name, layout) in converted:
+                                    continue
+                                converted.add((name, layout))
+                                shape: Tuple[int, ...] = tuple(operand.type.shape)
+                                dtype: str = str(operand.type.element_type)
+                                ctime: float = transpose_times(kstat, shape, dtype)[
+                                    intern_layout(source)
+                                ][intern_layout(layout)]
+                                kernel_name: str = transpose_kernel_name(shape, dtype)
+                                pstime, petime = time_map[kernel_name]
+                                time_map[kernel_name] = (pstime + ctime, petime)
                             if hasattr(op, "tied_operands") and any(
                                 index.value >= 0 for index in op.tied_operands
                             ):
@@ -110,6 +141,7 @@ class Ablation(object):
                                 pstime + stime,
                                 petime + etime,
                             )
+                        index += 1
             return Ablation(time_map)
 
     @staticmethod
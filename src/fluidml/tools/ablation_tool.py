@@ -1,6 +1,8 @@
 import argparse
 
-from ..utils import KStat, Schedule
+from typing import Optional
+
+from ..utils import STATISTICS, KStat, Schedule
 from .ablation import Ablation
 
 
@@ -21,19 +23,27 @@ def main():
         required=True,
         help="schedule pkl",
     )
+    parser.add_argument(
+        "--statistic",
+        type=str,
+        choices=STATISTICS,
+        default=None,
+        help="timing statistic to compare, defaults to the one in kstat",
+    )
     parser.add_argument("--output", type=str, required=True, help="output file path")
     args: argparse.Namespace = parser.parse_args()
     filename: str = args.filename
     kstat: str = args.kstat
     schedule: str = args.schedule
+    statistic: Optional[str] = args.statistic
     output: str = args.output
     with open(filename, "r") as f:
         mod: str = f.read()
-    with open(kstat, "r") as f:
+    with open(kstat, "rb") as f:
         kstat: KStat = KStat.build(f)
-    with open(schedule, "r") as f:
+    with open(schedule, "rb") as f:
         schedule: Schedule = Schedule.build(f)
-    ablation: Ablation = Ablation.build(mod, kstat, schedule)
+    ablation: Ablation = Ablation.build(mod, kstat, schedule, statistic)
     with open(output, "w") as f:
         ablation.dump(f)
 
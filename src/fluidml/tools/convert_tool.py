@@ -0,0 +1,49 @@
+import argparse
+
+from typing import Union
+
+from ..utils import KStat, Schedule
+
+
+def main():
+    dispatch_table: dict[str, Union[type[KStat], type[Schedule]]] = {
+        "kstat": KStat,
+        "schedule": Schedule,
+    }
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="convert-tool for FluidML kstat and schedule files",
+        allow_abbrev=True,
+    )
+    parser.add_argument(
+        "filename", type=str, help="path to the JSON or columnar input file"
+    )
+    parser.add_argument(
+        "--kind",
+        choices=dispatch_table.keys(),
+        required=True,
+        help="kind of data stored in the input file",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "columnar"],
+        default="columnar",
+        help="output format (default: columnar)",
+    )
+    parser.add_argument("--output", type=str, required=True, help="output file path")
+    args: argparse.Namespace = parser.parse_args()
+    filename: str = args.filename
+    cls: Union[type[KStat], type[Schedule]] = dispatch_table[args.kind]
+    format: str = args.format
+    output: str = args.output
+    with open(filename, "rb") as f:
+        data: Union[KStat, Schedule] = cls.build(f)
+    if format == "columnar":
+        with open(output, "wb") as f:
+            data.dump_columnar(f)
+    else:
+        with open(output, "w") as f:
+            data.dump(f)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,49 @@
+from .layout import (
+    default_layout_id,
+    extern_layout,
+    extern_layouts,
+    intern_layout,
+    intern_layouts,
+    is_default_layout,
+    parse_layouts,
+)
 from .schedule import Schedule, ScheduleGroup
-from .stat import IOStat, KStat, Stat
-from .utils import map_str_dtype, permute_shape, is_default_layout
+from .stat import (
+    FIELDS,
+    STATISTICS,
+    UNIT,
+    IOStat,
+    KStat,
+    Stat,
+    build_record,
+    convert_record,
+    scalar_record,
+)
+from .transpose import build_transpose_kernel, transpose_kernel_name, transpose_times
+from .utils import map_str_dtype, permute_shape
 
 __all__ = [
+    "FIELDS",
     "IOStat",
     "KStat",
+    "STATISTICS",
     "Schedule",
     "ScheduleGroup",
     "Stat",
+    "UNIT",
+    "build_record",
+    "build_transpose_kernel",
+    "convert_record",
+    "default_layout_id",
+    "extern_layout",
+    "extern_layouts",
+    "intern_layout",
+    "intern_layouts",
     "is_default_layout",
     "map_str_dtype",
+    "parse_layouts",
     "permute_shape",
+    "scalar_record",
+    "transpose_kernel_name",
+    "transpose_times",
 ]
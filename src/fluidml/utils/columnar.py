@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import io
+import json
+import numpy as np
+import struct
+
+from typing import Any, BinaryIO, Dict, Tuple
+
+__MAGIC: bytes = b"FLUIDML\x01"
+__ALIGNMENT: int = 64
+__HEADER: struct.Struct = struct.Struct("<Q")
+
+
+def is_columnar(f: BinaryIO) -> bool:
+    if isinstance(f, io.TextIOBase):
+        return False
+    position: int = f.tell()
+    magic: bytes = f.read(len(__MAGIC))
+    f.seek(position)
+    return magic == __MAGIC
+
+
+def read_columns(f: BinaryIO) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    magic: bytes = f.read(len(__MAGIC))
+    if magic != __MAGIC:
+        raise ValueError(f"Not a FluidML columnar file: {magic}")
+    (length,) = __HEADER.unpack(f.read(__HEADER.size))
+    header: Dict[str, Any] = json.loads(f.read(length))
+    try:
+        f.fileno()
+        mappable: bool = True
+    except (OSError, io.UnsupportedOperation):
+        mappable: bool = False
+    columns: Dict[str, np.ndarray] = {}
+    for name, (dtype, shape, offset) in header.pop("columns").items():
+        if np.prod(shape) == 0:
+            columns[name] = np.empty(shape, dtype=dtype)
+        elif not mappable:
+            dtype: np.dtype = np.dtype(dtype)
+            f.seek(offset)
+            columns[name] = np.frombuffer(
+                f.read(int(np.prod(shape)) * dtype.itemsize), dtype=dtype
+            ).reshape(shape)
+        else:
+            columns[name] = np.memmap(
+                f, dtype=dtype, mode="r", offset=offset, shape=tuple(shape)
+            )
+    return header, columns
+
+
+def write_columns(
+    f: BinaryIO, header: Dict[str, Any], columns: Dict[str, np.ndarray]
+) -> None:
+    columns: Dict[str, np.ndarray] = {
+        name: np.ascontiguousarray(column) for name, column in columns.items()
+    }
+    # Offsets depend on the header length, which depends on the offsets, so
+    # iterate until the layout is stable.
+    start: int = 0
+    while True:
+        layout: Dict[str, Tuple[str, Tuple[int, ...], int]] = {}
+        offset: int = start
+        for name, column in columns.items():
+            offset = -(-offset // __ALIGNMENT) * __ALIGNMENT
+            layout[name] = (column.dtype.str, column.shape, offset)
+            offset += column.nbytes
+        data: bytes = json.dumps({**header, "columns": layout}).encode()
+        end: int = len(__MAGIC) + __HEADER.size + len(data)
+        if -(-end // __ALIGNMENT) * __ALIGNMENT == start:
+            break
+        start = -(-end // __ALIGNMENT) * __ALIGNMENT
+    f.write(__MAGIC)
+    f.write(__HEADER.pack(len(data)))
+    f.write(data)
+    position: int = end
+    for name, column in columns.items():
+        _, _, offset = layout[name]
+        f.write(b"\0" * (offset - position))
+        f.write(column.tobytes())
+        position = offset + column.nbytes
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import math
+
+from typing import Dict, Iterator, List, Tuple, Union
+
+__MAX_RANK: int = 32
+# Layouts of rank r take the ids [__OFFSETS[r], __OFFSETS[r] + r!), ordered by
+# their Lehmer rank, so the default (identity) layout of rank r is __OFFSETS[r].
+__OFFSETS: List[int] = [
+    sum(math.factorial(rank) for rank in range(end)) for end in range(__MAX_RANK + 2)
+]
+__DEFAULT_IDS: frozenset = frozenset(__OFFSETS[: __MAX_RANK + 1])
+
+
+@functools.lru_cache(maxsize=None)
+def intern_layout(layout: Tuple[int, ...]) -> int:
+    rank: int = len(layout)
+    if rank > __MAX_RANK or sorted(layout) != list(range(rank)):
+        raise ValueError(f"Layout {layout} is not a supported permutation.")
+    remaining: List[int] = [*range(rank)]
+    lehmer: int = 0
+    for idx, dim in enumerate(layout):
+        pos: int = bisect.bisect_left(remaining, dim)
+        lehmer += pos * math.factorial(rank - idx - 1)
+        del remaining[pos]
+    return __OFFSETS[rank] + lehmer
+
+
+@functools.lru_cache(maxsize=None)
+def extern_layout(layout_id: int) -> Tuple[int, ...]:
+    rank: int = bisect.bisect_right(__OFFSETS, layout_id) - 1
+    if layout_id < 0 or rank > __MAX_RANK:
+        raise ValueError(f"Layout id {layout_id} is out of range.")
+    lehmer: int = layout_id - __OFFSETS[rank]
+    remaining: List[int] = [*range(rank)]
+    layout: List[int] = []
+    for idx in range(rank):
+        pos, lehmer = divmod(lehmer, math.factorial(rank - idx - 1))
+        layout += [remaining.pop(pos)]
+    return tuple(layout)
+
+
+def default_layout_id(rank: int) -> int:
+    return __OFFSETS[rank]
+
+
+def intern_layouts(layouts: Iterator[Tuple[int, ...]]) -> Tuple[int, ...]:
+    return tuple(intern_layout(layout) for layout in layouts)
+
+
+def extern_layouts(layout_ids: Iterator[int]) -> Tuple[Tuple[int, ...], ...]:
+    return tuple(extern_layout(layout_id) for layout_id in layout_ids)
+
+
+def is_default_layout(layouts: Iterator[Union[int, Tuple[int, ...]]]) -> bool:
+    return all(
+        (
+            layout in __DEFAULT_IDS
+            if isinstance(layout, int)
+            else intern_layout(layout) in __DEFAULT_IDS
+        )
+        for layout in layouts
+    )
+
+
+def parse_layouts(specs: Iterator[str]) -> Dict[str, Tuple[int, ...]]:
+    # Specs like "input0=0,2,3,1" declare the layout of a model input or output.
+    layouts: Dict[str, Tuple[int, ...]] = {}
+    for spec in specs:
+        name, sep, dims = spec.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Layout {spec} is not of the form name=dim,dim,...")
+        layout: Tuple[int, ...] = tuple(int(dim) for dim in dims.split(",") if dim)
+        intern_layout(layout)
+        if layouts.get(name, layout) != layout:
+            raise ValueError(f"Layouts declared for {name} disagree.")
+        layouts[name] = layout
+    return layouts
@@ -1,61 +1,119 @@
 from __future__ import annotations
 
 import json
+import numpy as np
 
 from collections import Counter, defaultdict
-from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from .columnar import is_columnar, read_columns, write_columns
+from .layout import extern_layout, intern_layout
 
 
 class Schedule(object):
     def __init__(
-        self, schedule: Dict[str, Tuple[int, ...]] = {}, *args, **kwargs
+        self,
+        schedule: Dict[str, Union[int, Tuple[int, ...]]] = {},
+        *args,
+        **kwargs,
     ) -> Schedule:
         super().__init__(*args, **kwargs)
-        self._schedule: Dict[str, Tuple[int, ...]] = schedule
+        self._schedule: Dict[str, int] = {
+            key: self._id(value) for key, value in schedule.items()
+        }
 
     def __contains__(self, key: str) -> bool:
         return key in self._schedule
 
     def __getitem__(self, key: str) -> Tuple[int, ...]:
-        return self._schedule[key]
+        return extern_layout(self._schedule[key])
 
-    def __setitem__(self, key: str, value: Tuple[int, ...]) -> None:
-        self._schedule[key] = value
+    def __setitem__(self, key: str, value: Union[int, Tuple[int, ...]]) -> None:
+        self._schedule[key] = self._id(value)
 
     def __str__(self) -> str:
-        return f"Schedule(\n{self._schedule}\n)"
+        return f"Schedule(\n{self.result}\n)"
 
     def get(
         self, key: str, default: Optional[Tuple[int, ...]] = None
     ) -> Optional[Tuple[int, ...]]:
+        layout_id: Optional[int] = self._schedule.get(key)
+        return default if layout_id is None else extern_layout(layout_id)
+
+    def get_id(self, key: str, default: Optional[int] = None) -> Optional[int]:
         return self._schedule.get(key, default)
 
+    @property
+    def ids(self) -> Dict[str, int]:
+        return self._schedule
+
+    @property
+    def result(self) -> Dict[str, Tuple[int, ...]]:
+        return {key: extern_layout(value) for key, value in self._schedule.items()}
+
     @staticmethod
     def build(f: BinaryIO) -> Schedule:
+        if is_columnar(f):
+            return Schedule.build_columnar(f)
         data: Dict[str, Tuple[int, ...]] = {
             key: tuple(value) for key, value in json.load(f).items()
         }
         return Schedule(data)
 
+    @staticmethod
+    def build_columnar(f: BinaryIO) -> Schedule:
+        header, columns = read_columns(f)
+        layouts: List[int] = [
+            intern_layout(tuple(layout)) for layout in header["layouts"]
+        ]
+        data: Dict[str, int] = {
+            key: layouts[layout_id]
+            for key, layout_id in zip(header["keys"], columns["layout_ids"].tolist())
+        }
+        return Schedule(data)
+
     def dump(self, f: BinaryIO) -> None:
         data: List[List[str, Tuple[int, ...]]] = {
-            key: list(value) for key, value in self._schedule.items()
+            key: list(extern_layout(value)) for key, value in self._schedule.items()
         }
         json.dump(data, f)
 
+    def dump_columnar(self, f: BinaryIO) -> None:
+        layouts: Dict[int, int] = {}
+        layout_ids: List[int] = [
+            layouts.setdefault(value, len(layouts)) for value in self._schedule.values()
+        ]
+        write_columns(
+            f,
+            {
+                "keys": [*self._schedule],
+                "layouts": [list(extern_layout(layout)) for layout in layouts],
+            },
+            {"layout_ids": np.array(layout_ids, dtype=np.int32)},
+        )
+
     @staticmethod
     def merge(schedules: Iterator["Schedule"]) -> Schedule:
-        table: Dict[str, List[Tuple[int, ...]]] = defaultdict(list)
+        table: Dict[str, Counter] = defaultdict(Counter)
         for schedule in schedules:
             for key, value in schedule._schedule.items():
-                table[key] += [value]
-        schedule: Dict[str, Tuple[int, ...]] = {}
-        for key, values in table.items():
-            counter: Counter = Counter(values)
+                table[key][value] += 1
+        schedule: Dict[str, int] = {}
+        for key, counter in table.items():
             [(selected, _)] = counter.most_common(1)
             schedule[key] = selected
         return Schedule(schedule)
 
+    # A dispatch reading a value in another layout than the value is stored in
+    # gets a conversion in front of it, recorded under the key of that use.
+    @staticmethod
+    def use_key(name: str, user: int) -> str:
+        return f"{name}@{user}"
+
+    @staticmethod
+    def _id(value: Union[int, Tuple[int, ...]]) -> int:
+        return value if isinstance(value, int) else intern_layout(tuple(value))
+
 
 class ScheduleGroup(object):
     def __init__(
@@ -1,9 +1,23 @@
 from .iostat import IOStat
 from .kstat import KStat
+from .record import (
+    FIELDS,
+    STATISTICS,
+    UNIT,
+    build_record,
+    convert_record,
+    scalar_record,
+)
 from .stat import Stat
 
 __all__ = [
+    "FIELDS",
     "IOStat",
     "KStat",
+    "STATISTICS",
     "Stat",
+    "UNIT",
+    "build_record",
+    "convert_record",
+    "scalar_record",
 ]
@@ -1,37 +1,70 @@
 from __future__ import annotations
 
 import json
+import numpy as np
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
+from .record import as_record, field_index
 from .stat import Stat
 
 
 class IOStat(Stat):
     def __init__(
-        self, result: Optional[Dict[str, float]] = None, *args, **kwargs
+        self,
+        result: Optional[Dict[str, Union[float, np.ndarray]]] = None,
+        statistic: str = "min",
+        *args,
+        **kwargs,
     ) -> IOStat:
         super().__init__(*args, **kwargs)
+        self._statistic: str = statistic
+        self._index: int = field_index(statistic)
         if result is None:
-            self._stat: Dict[str, float] = {}
+            self._stat: Dict[str, np.ndarray] = {}
         else:
-            self._stat: Dict[str, float] = result
+            self._stat: Dict[str, np.ndarray] = {
+                key: as_record(value) for key, value in result.items()
+            }
 
     def __str__(self) -> str:
-        return f"{self.__class__.__name__}(\n{self._stat}\n)"
+        return f"{self.__class__.__name__}(\n{self.result}\n)"
 
     def contains(self, key: str) -> bool:
         return key in self._stat
 
     def get(self, key: str, default: Optional[float] = None) -> Optional[float]:
+        record: Optional[np.ndarray] = self._stat.get(key)
+        if record is None:
+            return default
+        return float(record[self._index])
+
+    def get_record(
+        self, key: str, default: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
         return self._stat.get(key, default)
 
-    def set(self, key: str, value: float) -> None:
-        self._stat[key] = value
+    def set(self, key: str, value: Union[float, np.ndarray]) -> None:
+        self._stat[key] = as_record(value)
+
+    @property
+    def records(self) -> Dict[str, np.ndarray]:
+        return self._stat
+
+    @property
+    def result(self) -> Dict[str, float]:
+        return {key: float(record[self._index]) for key, record in self._stat.items()}
+
+    @property
+    def statistic(self) -> str:
+        return self._statistic
 
     @classmethod
-    def build(cls, f) -> IOStat:
-        return cls(json.load(f))
+    def build(cls, f, statistic: str = "min") -> IOStat:
+        return cls(json.load(f), statistic)
 
     def dump(self, f) -> None:
-        json.dump(self._stat, f)
+        data: Dict[str, List[float]] = {
+            key: record.tolist() for key, record in self._stat.items()
+        }
+        json.dump(data, f)
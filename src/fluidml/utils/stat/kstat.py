@@ -1,38 +1,73 @@
 from __future__ import annotations
 
-import copy
+import io
 import json
+import numpy as np
 
 from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
 
+from ..columnar import is_columnar, read_columns, write_columns
+from ..layout import extern_layout, extern_layouts, intern_layout, intern_layouts
 from .iostat import IOStat
+from .record import (
+    FIELDS,
+    STATISTICS,
+    UNIT,
+    as_record,
+    convert_record,
+    field_index,
+    scalar_record,
+)
 from .stat import Stat
 
 
 class KStat(Stat):
     def __init__(
         self,
-        result: Optional[Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]]] = None,
+        result: Optional[
+            Dict[str, Dict[Tuple[Tuple[int, ...], ...], Union[float, np.ndarray]]]
+        ] = None,
+        statistic: str = "min",
         *args,
         **kwargs,
     ) -> KStat:
         super().__init__(*args, **kwargs)
-        if result is None:
-            self._stat: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = {}
-        else:
-            self._stat: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = result
+        self._stat: Dict[str, Dict[Tuple[int, ...], np.ndarray]] = {}
+        self._statistic: str = statistic
+        self._index: int = field_index(statistic)
+        self._views: Dict[str, Dict[Tuple[int, ...], float]] = {}
+        self._layout_views: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lazy: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._layout_ids: List[int] = []
+        if result is not None:
+            for kernel, table in result.items():
+                self.set(kernel, table)
 
     def __str__(self) -> str:
-        return f"{self.__class__.__name__}(\n{self._stat}\n)"
+        return f"{self.__class__.__name__}(\n{self.result}\n)"
+
+    # Pickled in the columnar format, so the records travel as a few flat
+    # arrays and the receiver materializes kernels only when it reads them.
+    def __getstate__(self) -> Tuple[str, bytes]:
+        f: io.BytesIO = io.BytesIO()
+        self.dump_columnar(f)
+        return self._statistic, f.getvalue()
+
+    def __setstate__(self, state: Tuple[str, bytes]) -> None:
+        statistic, data = state
+        kstat: KStat = KStat.build_columnar(io.BytesIO(data), statistic)
+        self.__dict__.update(kstat.__dict__)
 
     def contains(self, key: Union[str, Tuple[Any, ...]]) -> bool:
         if isinstance(key, str):
-            return key in self._stat
+            return key in self._stat or key in self._lazy
         elif isinstance(key, tuple):
             kernel, axes = key
             assert isinstance(kernel, str)
-            assert all(isinstance(axis, tuple) for axis in axes)
-            return kernel in self._stat and axes in self._stat[kernel]
+            self._materialize(kernel)
+            return self._ids(axes) in self._stat.get(kernel, {})
         else:
             raise TypeError(
                 f"{self.__class__.__name__} received unexpected key type {type(key)}."
@@ -40,12 +75,72 @@ class KStat(Stat):
 
     def get(self, key: Union[str, Tuple[Any, ...]], default: Any = None) -> Any:
         if isinstance(key, str):
-            return self._stat.get(key, default)
+            view: Optional[Dict[Tuple[Tuple[int, ...], ...], float]] = (
+                self._layout_views.get(key)
+            )
+            if view is None:
+                ids: Optional[Dict[Tuple[int, ...], float]] = self.get_ids(key)
+                if ids is None:
+                    return default
+                view = {extern_layouts(k): v for k, v in ids.items()}
+                self._layout_views[key] = view
+            return view
+        elif isinstance(key, tuple):
+            kernel, axes = key
+            assert isinstance(kernel, str)
+            self._materialize(kernel)
+            record: Optional[np.ndarray] = self._stat.get(kernel, {}).get(
+                self._ids(axes)
+            )
+            if record is None:
+                return default
+            return float(record[self._index])
+        else:
+            raise TypeError(
+                f"{self.__class__.__name__} received unexpected key type {type(key)}."
+            )
+
+    def get_ids(
+        self, kernel: str, default: Optional[Dict[Tuple[int, ...], float]] = None
+    ) -> Optional[Dict[Tuple[int, ...], float]]:
+        view: Optional[Dict[Tuple[int, ...], float]] = self._views.get(kernel)
+        if view is None:
+            self._materialize(kernel)
+            table: Optional[Dict[Tuple[int, ...], np.ndarray]] = self._stat.get(kernel)
+            if table is None:
+                return default
+            view = {k: float(v[self._index]) for k, v in table.items()}
+            self._views[kernel] = view
+        return view
+
+    def get_arrays(self, kernel: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays: Optional[Tuple[np.ndarray, np.ndarray]] = self._arrays.get(kernel)
+        if arrays is None:
+            view: Optional[Dict[Tuple[int, ...], float]] = self.get_ids(kernel)
+            if view is None:
+                return None
+            arity: int = len(next(iter(view))) if view else 0
+            arrays = (
+                np.array([*view], dtype=np.int64).reshape(len(view), arity),
+                np.fromiter(view.values(), dtype=np.float64, count=len(view)),
+            )
+            self._arrays[kernel] = arrays
+        return arrays
+
+    def get_record(
+        self, key: Union[str, Tuple[Any, ...]], default: Any = None
+    ) -> Union[Dict[Tuple[Tuple[int, ...], ...], np.ndarray], np.ndarray, Any]:
+        if isinstance(key, str):
+            self._materialize(key)
+            table: Optional[Dict[Tuple[int, ...], np.ndarray]] = self._stat.get(key)
+            if table is None:
+                return default
+            return {extern_layouts(k): v for k, v in table.items()}
         elif isinstance(key, tuple):
             kernel, axes = key
             assert isinstance(kernel, str)
-            assert all(isinstance(axis, tuple) for axis in axes)
-            return self._stat.get(kernel, {}).get(axes, default)
+            self._materialize(kernel)
+            return self._stat.get(kernel, {}).get(self._ids(axes), default)
         else:
             raise TypeError(
                 f"{self.__class__.__name__} received unexpected key type {type(key)}."
@@ -54,47 +149,207 @@ class KStat(Stat):
     def set(
         self,
         key: Union[str, Tuple[Tuple[int, ...], ...]],
-        value: Union[float, Dict[Tuple[Tuple[int, ...], ...], float]],
+        value: Union[
+            float,
+            np.ndarray,
+            Dict[Tuple[Tuple[int, ...], ...], Union[float, np.ndarray]],
+        ],
     ) -> None:
         if isinstance(key, str) and isinstance(value, dict):
-            self._stat[key] = value
-        elif isinstance(key, tuple) and isinstance(value, float):
+            self._lazy.pop(key, None)
+            self._stat[key] = {
+                self._ids(axes): as_record(record) for axes, record in value.items()
+            }
+            self._invalidate(key)
+        elif isinstance(key, tuple) and isinstance(value, (float, np.ndarray)):
             kernel, axes = key
             assert isinstance(kernel, str)
-            assert all(isinstance(axis, tuple) for axis in axes)
-            assert all(isinstance(dim, int) for axis in axes for dim in axis)
-            table: Dict[Tuple[Tuple[int, ...], ...], float] = self._stat.get(kernel, {})
-            table[axes] = value
+            self._materialize(kernel)
+            table: Dict[Tuple[int, ...], np.ndarray] = self._stat.get(kernel, {})
+            table[self._ids(axes)] = as_record(value)
             self._stat[kernel] = table
+            self._invalidate(kernel)
         else:
             raise TypeError(
                 f"{self.__class__.__name__} received unexpected key type {type(key)} and value type {type(value)}."
             )
 
-    def reduce(self, iostat: IOStat) -> KStat:
-        stat: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = copy.deepcopy(
-            self._stat
-        )
-        for kernel, axes in stat.items():
-            for axis, value in axes.items():
-                stat[kernel][axis] = max(0, value - iostat[kernel])
-        return KStat(stat)
+    def select(self, statistic: Optional[str]) -> KStat:
+        if statistic is None or statistic == self._statistic:
+            return self
+        self._materialize_all()
+        kstat: KStat = KStat(statistic=statistic)
+        kstat._stat = {kernel: {**table} for kernel, table in self._stat.items()}
+        return kstat
+
+    def reduce(self, iostat: IOStat, statistic: Optional[str] = None) -> KStat:
+        self._materialize_all()
+        locations: List[int] = [field_index(name) for name in STATISTICS]
+        stat: Dict[str, Dict[Tuple[int, ...], np.ndarray]] = {}
+        for kernel, table in self._stat.items():
+            io: Optional[np.ndarray] = iostat.get_record(kernel)
+            if io is None:
+                # Kernels FluidML adds itself, like layout conversions, have
+                # no IO of their own to subtract.
+                stat[kernel] = {axes: record.copy() for axes, record in table.items()}
+                continue
+            if statistic is None:
+                offset: np.ndarray = io[locations]
+            else:
+                offset: np.ndarray = np.full(len(locations), io[field_index(statistic)])
+            stat[kernel] = {}
+            for axes, record in table.items():
+                record: np.ndarray = record.copy()
+                record[locations] = np.maximum(0.0, record[locations] - offset)
+                stat[kernel][axes] = record
+        kstat: KStat = KStat(statistic=self._statistic)
+        kstat._stat = stat
+        return kstat
+
+    @property
+    def records(self) -> Dict[str, Dict[Tuple[Tuple[int, ...], ...], np.ndarray]]:
+        self._materialize_all()
+        return {kernel: self.get_record(kernel) for kernel in self._stat}
 
     @property
     def result(self) -> Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]]:
-        return self._stat
+        self._materialize_all()
+        return {kernel: self.get(kernel) for kernel in self._stat}
+
+    @property
+    def statistic(self) -> str:
+        return self._statistic
 
     @classmethod
-    def build(cls, f: BinaryIO) -> KStat:
-        data: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = {
-            k0: {tuple(tuple(e for e in t) for t in k1): v1 for k1, v1 in v0}
-            for k0, v0 in json.load(f).items()
-        }
-        return cls(data)
+    def build(cls, f: BinaryIO, statistic: str = "min") -> KStat:
+        if is_columnar(f):
+            return cls.build_columnar(f, statistic)
+        kstat: KStat = cls(statistic=statistic)
+        data: Dict[str, Any] = json.load(f)
+        if isinstance(data.get("unit"), str):
+            unit: str = data["unit"]
+            kernels: Dict[str, List[List[Any]]] = data["kernels"]
+        else:
+            # Files without a unit predate it. Bare times were measured by
+            # benchmark_module in ms, the others by the harness in ns.
+            unit: Optional[str] = None
+            kernels: Dict[str, List[List[Any]]] = data
+        for k0, v0 in kernels.items():
+            table: Dict[Tuple[int, ...], np.ndarray] = {}
+            for k1, v1, *extra in v0:
+                axes: Tuple[int, ...] = intern_layouts(tuple(t) for t in k1)
+                if len(extra) == 1:
+                    [record] = extra
+                    table[axes] = convert_record(as_record(record), unit or UNIT)
+                elif len(extra) == 2:
+                    count, variance = extra
+                    table[axes] = convert_record(
+                        scalar_record(v1, count, variance), unit or UNIT
+                    )
+                else:
+                    table[axes] = convert_record(scalar_record(v1), unit or "ms")
+            kstat._stat[k0] = table
+        return kstat
+
+    @classmethod
+    def build_columnar(cls, f: BinaryIO, statistic: str = "min") -> KStat:
+        header, columns = read_columns(f)
+        kstat: KStat = cls(statistic=statistic)
+        kstat._lazy = {kernel: idx for idx, kernel in enumerate(header["kernels"])}
+        kstat._columns = columns
+        unit: str = header.get("unit", UNIT)
+        if unit != UNIT:
+            kstat._columns = {
+                **columns,
+                "records": convert_record(columns["records"], unit),
+            }
+        kstat._layout_ids = [
+            intern_layout(tuple(layout)) for layout in header["layouts"]
+        ]
+        return kstat
 
     def dump(self, f: BinaryIO) -> None:
-        data: List[List[str, List[List[List[List[int]], float]]]] = {
-            k0: [[[[e for e in t] for t in k1], v1] for k1, v1 in v0.items()]
+        self._materialize_all()
+        kernels: Dict[str, List[List[List[List[int]], float, List[float]]]] = {
+            k0: [
+                [
+                    [list(extern_layout(e)) for e in k1],
+                    float(v1[self._index]),
+                    v1.tolist(),
+                ]
+                for k1, v1 in v0.items()
+            ]
             for k0, v0 in self._stat.items()
         }
-        json.dump(data, f)
+        json.dump({"unit": UNIT, "kernels": kernels}, f)
+
+    def dump_columnar(self, f: BinaryIO) -> None:
+        self._materialize_all()
+        layouts: Dict[int, int] = {}
+        kernels: List[str] = [*self._stat]
+        arities: List[int] = []
+        row_offsets: List[int] = [0]
+        layout_offsets: List[int] = [0]
+        layout_ids: List[int] = []
+        records: List[np.ndarray] = []
+        for kernel in kernels:
+            table: Dict[Tuple[int, ...], np.ndarray] = self._stat[kernel]
+            arity: int = len(next(iter(table))) if table else 0
+            for axes, record in table.items():
+                assert len(axes) == arity, f"Inconsistent layouts {axes} of {kernel}."
+                layout_ids += [layouts.setdefault(axis, len(layouts)) for axis in axes]
+                records += [record]
+            arities += [arity]
+            row_offsets += [len(records)]
+            layout_offsets += [len(layout_ids)]
+        write_columns(
+            f,
+            {
+                "kernels": kernels,
+                "layouts": [list(extern_layout(layout)) for layout in layouts],
+                "statistic": self._statistic,
+                "unit": UNIT,
+            },
+            {
+                "arities": np.array(arities, dtype=np.int32),
+                "row_offsets": np.array(row_offsets, dtype=np.int64),
+                "layout_offsets": np.array(layout_offsets, dtype=np.int64),
+                "layout_ids": np.array(layout_ids, dtype=np.int32),
+                "records": np.array(records, dtype=np.float64).reshape(
+                    len(records), len(FIELDS)
+                ),
+            },
+        )
+
+    @staticmethod
+    def _ids(axes: Tuple[Union[int, Tuple[int, ...]], ...]) -> Tuple[int, ...]:
+        assert isinstance(axes, tuple)
+        return tuple(
+            axis if isinstance(axis, int) else intern_layout(tuple(axis))
+            for axis in axes
+        )
+
+    def _invalidate(self, kernel: str) -> None:
+        self._views.pop(kernel, None)
+        self._layout_views.pop(kernel, None)
+        self._arrays.pop(kernel, None)
+
+    def _materialize(self, kernel: str) -> None:
+        idx: Optional[int] = self._lazy.pop(kernel, None)
+        if idx is None:
+            return
+        arity: int = int(self._columns["arities"][idx])
+        start, end = self._columns["row_offsets"][idx : idx + 2]
+        lstart, lend = self._columns["layout_offsets"][idx : idx + 2]
+        layout_ids: np.ndarray = self._columns["layout_ids"][lstart:lend].reshape(
+            end - start, arity
+        )
+        records: np.ndarray = self._columns["records"][start:end]
+        self._stat[kernel] = {
+            tuple(self._layout_ids[layout_id] for layout_id in row): record
+            for row, record in zip(layout_ids.tolist(), records)
+        }
+
+    def _materialize_all(self) -> None:
+        for kernel in [*self._lazy]:
+            self._materialize(kernel)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import math
+import numpy as np
+
+from typing import Dict, Iterable, List, Tuple, Union
+
+FIELDS: Tuple[str, ...] = ("min", "median", "mean", "p90", "std", "count")
+STATISTICS: Tuple[str, ...] = ("min", "median", "mean", "p90")
+# Times are stored in nanoseconds. Stored formats record their unit, and
+# records in any other unit are converted as they are loaded.
+UNIT: str = "ns"
+UNITS: Dict[str, float] = {"ns": 1.0, "us": 1e3, "ms": 1e6, "s": 1e9}
+
+
+def build_record(samples: Iterable[float]) -> np.ndarray:
+    samples: np.ndarray = np.asarray([*samples], dtype=np.float64)
+    if samples.size == 0:
+        raise ValueError("Cannot build a record from no samples.")
+    return np.array(
+        [
+            samples.min(),
+            np.median(samples),
+            samples.mean(),
+            np.percentile(samples, 90),
+            samples.std(ddof=1) if samples.size > 1 else 0.0,
+            samples.size,
+        ],
+        dtype=np.float64,
+    )
+
+
+def scalar_record(value: float, count: int = 1, variance: float = 0.0) -> np.ndarray:
+    return np.array(
+        [value, value, value, value, math.sqrt(max(0.0, variance)), count],
+        dtype=np.float64,
+    )
+
+
+def as_record(value: Union[float, List[float], np.ndarray]) -> np.ndarray:
+    if isinstance(value, np.ndarray):
+        assert value.shape == (len(FIELDS),), f"Malformed record {value}."
+        return value
+    elif isinstance(value, (list, tuple)):
+        return as_record(np.asarray(value, dtype=np.float64))
+    else:
+        return scalar_record(float(value))
+
+
+def field_index(statistic: str) -> int:
+    if statistic not in FIELDS:
+        raise ValueError(
+            f"Unsupported statistic {statistic}, expected one of {[*FIELDS]}."
+        )
+    return FIELDS.index(statistic)
+
+
+def convert_record(record: np.ndarray, source: str, target: str = UNIT) -> np.ndarray:
+    for unit in [source, target]:
+        if unit not in UNITS:
+            raise ValueError(f"Unsupported unit {unit}, expected one of {[*UNITS]}.")
+    if source == target:
+        return record
+    record: np.ndarray = record.astype(np.float64)
+    # Every field but the count is a time.
+    record[..., : FIELDS.index("count")] *= UNITS[source] / UNITS[target]
+    return record
@@ -0,0 +1,68 @@
+from typing import Dict, List, Tuple
+
+from .layout import default_layout_id
+from .stat import KStat
+
+
+def transpose_kernel_name(shape: Tuple[int, ...], dtype: str) -> str:
+    return f"fluidml_transpose_{'x'.join(map(str, shape + (dtype,)))}"
+
+
+def build_transpose_kernel(shape: Tuple[int, ...], dtype: str) -> str:
+    # A plain copy between two tensors of the same shape. The layouts of its
+    # input and output are set like those of any other kernel, so a copy
+    # between two different layouts is a layout conversion.
+    name: str = transpose_kernel_name(shape, dtype)
+    tensor_type: str = f"tensor<{'x'.join(map(str, shape + (dtype,)))}>"
+    input_type: str = f"!flow.dispatch.tensor<readonly:{tensor_type}>"
+    output_type: str = f"!flow.dispatch.tensor<writeonly:{tensor_type}>"
+    offsets: str = ", ".join("0" for _ in shape)
+    sizes: str = ", ".join(map(str, shape))
+    strides: str = ", ".join("1" for _ in shape)
+    lines: List[str] = [
+        f"flow.executable private @{name} {{",
+        f"  flow.executable.export public @{name} workgroups() -> (index, index, index) {{",
+        "    %x, %y, %z = flow.dispatch.workgroup_count_from_slice",
+        "    flow.return %x, %y, %z : index, index, index",
+        "  }",
+        "  builtin.module {",
+        f"    func.func @{name}(%arg0: {input_type}, %arg1: {output_type}) {{",
+        f"      %0 = flow.dispatch.tensor.load %arg0, offsets = [{offsets}], sizes = [{sizes}], strides = [{strides}] : {input_type} -> {tensor_type}",
+        f"      %1 = tensor.empty() : {tensor_type}",
+        f"      %2 = linalg.copy ins(%0 : {tensor_type}) outs(%1 : {tensor_type}) -> {tensor_type}",
+        f"      flow.dispatch.tensor.store %2, %arg1, offsets = [{offsets}], sizes = [{sizes}], strides = [{strides}] : {tensor_type} -> {output_type}",
+        "      return",
+        "    }",
+        "  }",
+        "}",
+    ]
+    return "\n".join(lines)
+
+
+def transpose_times(
+    kstat: KStat, shape: Tuple[int, ...], dtype: str
+) -> Dict[int, Dict[int, float]]:
+    # The times of converting a tensor of the shape, by source and then target
+    # layout id. Only conversions from and to the default layout are profiled.
+    # A conversion between two other layouts is estimated as going through the
+    # default one, which bounds the single copy it takes from above.
+    table: Dict[Tuple[int, ...], float] = kstat.get_ids(
+        transpose_kernel_name(shape, dtype), {}
+    )
+    reference: int = default_layout_id(len(shape))
+    times: Dict[int, Dict[int, float]] = {}
+    for (source, target), time in table.items():
+        times.setdefault(source, {})[target] = time
+    into: Dict[int, float] = {**times.get(reference, {})}
+    out: Dict[int, float] = {
+        source: targets[reference]
+        for source, targets in times.items()
+        if reference in targets
+    }
+    for source, source_time in out.items():
+        for target, target_time in into.items():
+            if source != target:
+                times.setdefault(source, {}).setdefault(
+                    target, source_time + target_time
+                )
+    return times
@@ -0,0 +1,78 @@
+import argparse
+import time
+
+from fluidml.analyzer.dataflow import DataflowNode, DataflowValue
+from fluidml.analyzer.scope.graph import Graph
+from fluidml.analyzer.scope.sequence import Sequence
+from fluidml.utils import KStat
+from test_graph import build, recursive
+from typing import Callable, List, Tuple
+
+
+def chain(ops: int) -> Tuple[List[DataflowNode], KStat]:
+    # A single path, the deepest graph pathify can see.
+    nodes: List[DataflowNode] = []
+    for idx in range(ops):
+        node: DataflowNode = DataflowNode(
+            idx, "flow.dispatch", None, None, False, False, False, False
+        )
+        if nodes:
+            [operand] = nodes[-1].outputs
+            node.inputs.append(operand)
+            operand.users.append(node)
+        node.outputs.append(DataflowValue(idx, f"%{idx}", (4,), "f32", node))
+        nodes.append(node)
+    return nodes, KStat()
+
+
+def bench(
+    name: str,
+    nodes: List[DataflowNode],
+    kstat: KStat,
+    pathify: Callable[[Graph, KStat], List[Sequence]],
+) -> None:
+    start: float = time.perf_counter()
+    paths: int = 0
+    for subgraph in Graph(nodes).partitioned():
+        paths += len(pathify(subgraph, kstat))
+    elapsed: float = time.perf_counter() - start
+    print(f"{name}: {len(nodes)} ops, {paths} paths, {elapsed:.2f}s")
+
+
+def main():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="benchmark Graph.pathify on synthetic dataflows",
+        allow_abbrev=True,
+    )
+    parser.add_argument(
+        "--ops",
+        type=int,
+        nargs="+",
+        default=[50000, 200000],
+        help="numbers of ops of the random DAGs",
+    )
+    parser.add_argument(
+        "--chain",
+        type=int,
+        default=300000,
+        help="number of ops of the chain, 0 to skip it",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the DAGs")
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="also time the recursive algorithm pathify replaced",
+    )
+    args: argparse.Namespace = parser.parse_args()
+    for ops in args.ops:
+        nodes, kstat = build(ops, args.seed)
+        bench("dag", nodes, kstat, Graph.pathify)
+        if args.recursive:
+            bench("dag (recursive)", nodes, kstat, recursive)
+    if args.chain:
+        nodes, kstat = chain(args.chain)
+        bench("chain", nodes, kstat, Graph.pathify)
+
+
+if __name__ == "__main__":
+    main()
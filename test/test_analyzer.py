@@ -0,0 +1,283 @@
+import itertools
+import pytest
+import random
+
+from fluidml.analyzer import (
+    AnytimeAnalyzer,
+    BeamAnalyzer,
+    DynamicProgramAnalyzer,
+    ExactAnalyzer,
+    GreedyAnalyzer,
+    TreeAnalyzer,
+)
+from fluidml.analyzer.dataflow import Dataflow, DataflowNode, DataflowValue
+from fluidml.analyzer.factor import FactorGraph
+from fluidml.analyzer.scope.graph import Graph
+from fluidml.analyzer.wrapper import OpWrapper
+from fluidml.utils import KStat, Schedule, intern_layout, is_default_layout
+from typing import Dict, List, Optional, Set, Tuple
+
+# Small enough for brute force: rank 2 has two layouts per value, rank 3 six.
+CASES: List[Tuple[int, int, int]] = [(5, 2, seed) for seed in range(8)] + [
+    (2, 3, seed) for seed in range(4)
+]
+
+
+def build(
+    kernels: int, rank: int, seed: int, tied: float = 0.2
+) -> Tuple[Dataflow, KStat]:
+    # A random dataflow of two-operand dispatches reading an import, a
+    # constant or an earlier result, with a weight loaded for each of them.
+    rnd: random.Random = random.Random(seed)
+    shape: Tuple[int, ...] = tuple(range(2, 2 + rank))
+    perms: List[Tuple[int, ...]] = [*itertools.permutations(range(rank))]
+    nodes: List[DataflowNode] = []
+    values: List[DataflowValue] = []
+    table: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = {}
+
+    def node(
+        name: str,
+        entry: Optional[str] = None,
+        schedule: bool = False,
+        force: bool = False,
+        any: bool = False,
+        tied_operands: Optional[List[int]] = None,
+    ) -> DataflowNode:
+        result: DataflowNode = DataflowNode(
+            len(nodes), name, entry, tied_operands, schedule, force, any, False
+        )
+        nodes.append(result)
+        return result
+
+    def value(owner: DataflowNode) -> DataflowValue:
+        result: DataflowValue = DataflowValue(
+            len(values), f"%{len(values)}", shape, "f32", owner
+        )
+        values.append(result)
+        owner.outputs.append(result)
+        return result
+
+    def use(user: DataflowNode, operand: DataflowValue) -> None:
+        user.inputs.append(operand)
+        operand.users.append(user)
+
+    value(node("hal.tensor.import", force=True))
+    value(node("util.global.load", any=True))
+    for idx in range(kernels):
+        operand: DataflowValue = rnd.choice(
+            [
+                candidate
+                for candidate in values
+                if candidate.owner.schedule_layout or candidate.owner.force_layout
+            ]
+        )
+        weight: DataflowValue = value(node("util.global.load", any=True))
+        is_tied: bool = rnd.random() < tied
+        dispatch: DataflowNode = node(
+            "flow.dispatch", f"k{idx}", True, tied_operands=[0] if is_tied else None
+        )
+        for arg in [operand, weight] if rnd.random() < 0.5 else [weight, operand]:
+            use(dispatch, arg)
+        value(dispatch)
+        table[f"k{idx}"] = {
+            layouts: float(rnd.randrange(100))
+            for layouts in itertools.product(perms, repeat=2 if is_tied else 3)
+        }
+    use(node("hal.tensor.export", force=True), values[-1])
+    return Dataflow(nodes, values), KStat(table)
+
+
+def brute(dataflow: Dataflow, kstat: KStat) -> float:
+    # The cheapest schedule over every layout of the values kernels touch.
+    graph: FactorGraph = FactorGraph(dataflow, kstat)
+    free: List[DataflowValue] = [
+        value
+        for value in dataflow.values
+        if value not in graph.fixed
+        and any(value in factor.args for factor in graph.factors)
+    ]
+    layouts: List[int] = [
+        intern_layout(perm)
+        for perm in itertools.permutations(range(len(dataflow.values[0].shape)))
+    ]
+    best: float = float("inf")
+    for combination in itertools.product(layouts, repeat=len(free)):
+        schedule: Schedule = Schedule(
+            {
+                **{value.name: layout for value, layout in graph.fixed.items()},
+                **{value.name: layout for value, layout in zip(free, combination)},
+            }
+        )
+        if all(
+            schedule.get_id(factor.node.outputs[0].name)
+            == schedule.get_id(factor.node.inputs[0].name)
+            for factor in graph.factors
+            if factor.node.tied_operands
+        ):
+            best = min(best, graph.evaluate(schedule))
+    return best
+
+
+def greedy(dataflow: Dataflow, kstat: KStat) -> Schedule:
+    # Rescores every remaining dispatch each round and fixes the arguments of
+    # the one gaining the most over its default layout.
+    graph: Graph = Graph(dataflow.nodes)
+    schedule: Schedule = Schedule()
+    tied: Dict[DataflowValue, List[DataflowValue]] = {}
+    for wrapper in graph.iter():
+        if wrapper.force_layout or wrapper.propagate_layout:
+            for arg in wrapper.args:
+                schedule[arg.name] = arg.forced_layout
+        if wrapper.schedule_layout and wrapper.tied_operands:
+            for output, idx in zip(wrapper.node.outputs, wrapper.tied_operands):
+                if idx >= 0:
+                    tied.setdefault(wrapper.node.inputs[idx], []).append(output)
+                    tied.setdefault(output, []).append(wrapper.node.inputs[idx])
+
+    def assign(value: DataflowValue, layout: int) -> None:
+        if value.name not in schedule:
+            schedule[value.name] = layout
+            for partner in tied.get(value, []):
+                assign(partner, layout)
+
+    for value in [*tied]:
+        if value.name in schedule:
+            for partner in tied[value]:
+                assign(partner, schedule.get_id(value.name))
+    remaining: Set[OpWrapper] = {
+        wrapper for wrapper in graph.iter() if wrapper.schedule_layout
+    }
+    while remaining:
+        candidates: List[Tuple[OpWrapper, Tuple[int, ...], float]] = []
+        for wrapper in remaining:
+            ktable: Dict[Tuple[int, ...], float] = kstat.get_ids(wrapper.entry)
+            [default] = [time for key, time in ktable.items() if is_default_layout(key)]
+            assigned: Dict[int, int] = {
+                wrapper.arg_index(arg): schedule.get_id(arg.name)
+                for arg in wrapper.args
+                if arg.name in schedule
+            }
+            layouts, time = min(
+                (
+                    (key, time)
+                    for key, time in ktable.items()
+                    if all(
+                        assigned.get(column, layout) == layout
+                        for column, layout in enumerate(key)
+                    )
+                ),
+                key=lambda item: item[1],
+            )
+            candidates += [(wrapper, layouts, default - time)]
+        candidate, layouts, _ = max(candidates, key=lambda item: item[2])
+        remaining.remove(candidate)
+        for arg in candidate.args:
+            assign(arg, layouts[candidate.arg_index(arg)])
+    return schedule
+
+
+@pytest.mark.parametrize("kernels, rank, seed", CASES)
+def test_exact(kernels: int, rank: int, seed: int) -> None:
+    dataflow, kstat = build(kernels, rank, seed)
+    analyzer: ExactAnalyzer = ExactAnalyzer(time_limit=30.0)
+    schedule: Schedule = analyzer.solve(dataflow, kstat)
+    cost: float = FactorGraph(dataflow, kstat).evaluate(schedule)
+    assert cost == pytest.approx(brute(dataflow, kstat))
+    assert analyzer.report["optimal"]
+    assert analyzer.upper_bound == pytest.approx(cost)
+    assert analyzer.gap == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize("kernels, rank, seed", CASES)
+def test_tree(kernels: int, rank: int, seed: int) -> None:
+    dataflow, kstat = build(kernels, rank, seed)
+    analyzer: TreeAnalyzer = TreeAnalyzer()
+    schedule: Schedule = analyzer.solve(dataflow, kstat)
+    cost: float = FactorGraph(dataflow, kstat).evaluate(schedule)
+    assert cost == pytest.approx(brute(dataflow, kstat))
+    assert analyzer.report["conditioned"] == 0
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_tree_conditioned(seed: int) -> None:
+    # Tables too small for any elimination fall back to conditioning on the
+    # path decomposition, which can't beat the optimum.
+    dataflow, kstat = build(5, 2, seed)
+    analyzer: TreeAnalyzer = TreeAnalyzer(max_table=1)
+    schedule: Schedule = analyzer.solve(dataflow, kstat)
+    cost: float = FactorGraph(dataflow, kstat).evaluate(schedule)
+    assert cost >= brute(dataflow, kstat) - 1e-9
+    assert analyzer.report["conditioned"] > 0
+    assert analyzer.report["cost"] == pytest.approx(cost)
+
+
+@pytest.mark.parametrize("kernels, rank, seed", CASES)
+def test_beam(kernels: int, rank: int, seed: int) -> None:
+    dataflow, kstat = build(kernels, rank, seed)
+    optimal: float = brute(dataflow, kstat)
+    graph: FactorGraph = FactorGraph(dataflow, kstat)
+    wide: Schedule = BeamAnalyzer(width=1 << 16).solve(dataflow, kstat)
+    assert graph.evaluate(wide) == pytest.approx(optimal)
+    narrow: Schedule = BeamAnalyzer(width=1).solve(dataflow, kstat)
+    assert graph.evaluate(narrow) >= optimal - 1e-9
+
+
+@pytest.mark.parametrize("baseline", ["default", "greedy"])
+@pytest.mark.parametrize("kernels, rank, seed", CASES)
+def test_anytime(baseline: str, kernels: int, rank: int, seed: int) -> None:
+    dataflow, kstat = build(kernels, rank, seed)
+    graph: FactorGraph = FactorGraph(dataflow, kstat)
+    analyzer: AnytimeAnalyzer = AnytimeAnalyzer(time_budget=30.0, baseline=baseline)
+    schedule: Schedule = analyzer.solve(dataflow, kstat)
+    assert analyzer.report["optimal"]
+    assert graph.evaluate(schedule) == pytest.approx(brute(dataflow, kstat))
+    assert analyzer.cost <= analyzer.report["baseline"]
+    # Without any budget the baseline is all there is to fall back on.
+    analyzer = AnytimeAnalyzer(time_budget=0.0, baseline=baseline)
+    schedule = analyzer.solve(dataflow, kstat)
+    assert graph.evaluate(schedule) == pytest.approx(analyzer.cost)
+    assert analyzer.cost <= analyzer.report["baseline"]
+
+
+@pytest.mark.parametrize("kernels", [3, 5])
+@pytest.mark.parametrize("seed", range(40))
+def test_dp(kernels: int, seed: int) -> None:
+    # Votes of the paths never move the values imports and exports pin, so
+    # the merged schedule can't look cheaper than any feasible one.
+    dataflow, kstat = build(kernels, 2, seed)
+    graph: FactorGraph = FactorGraph(dataflow, kstat)
+    schedule: Schedule = DynamicProgramAnalyzer().solve(dataflow, kstat)
+    for value, layout in graph.fixed.items():
+        assert schedule.get_id(value.name) == layout
+    assert graph.evaluate(schedule) >= brute(dataflow, kstat) - 1e-9
+
+
+@pytest.mark.parametrize("kernels, rank", [(5, 2), (12, 2), (4, 3)])
+@pytest.mark.parametrize("seed", range(20))
+def test_greedy(kernels: int, rank: int, seed: int) -> None:
+    dataflow, kstat = build(kernels, rank, seed, tied=0.4)
+    graph: FactorGraph = FactorGraph(dataflow, kstat)
+    schedule: Schedule = GreedyAnalyzer().solve(dataflow, kstat)
+    for value, layout in graph.fixed.items():
+        assert schedule.get_id(value.name) == layout
+    for node in dataflow.nodes:
+        if node.tied_operands:
+            assert schedule[node.outputs[0].name] == schedule[node.inputs[0].name]
+    # The heap only rescores the dispatches next to newly fixed values, and
+    # breaks ties as the full rescan did.
+    assert schedule.ids == greedy(dataflow, kstat).ids
+
+
+@pytest.mark.parametrize(
+    "kernels, rank, seed", [(5, 2, 0), (12, 2, 1), (20, 2, 2), (30, 2, 3), (8, 3, 4)]
+)
+def test_dp_parallel(
+    monkeypatch: pytest.MonkeyPatch, kernels: int, rank: int, seed: int
+) -> None:
+    # Workers return their groups in submission order, so the merge votes as
+    # the sequential loop does.
+    monkeypatch.setattr(DynamicProgramAnalyzer, "_MIN_PARALLEL_OPS", 0)
+    dataflow, kstat = build(kernels, rank, seed)
+    sequential: Schedule = DynamicProgramAnalyzer(jobs=1).solve(dataflow, kstat)
+    parallel: Schedule = DynamicProgramAnalyzer(jobs=2).solve(dataflow, kstat)
+    assert parallel.ids == sequential.ids
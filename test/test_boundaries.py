@@ -0,0 +1,123 @@
+import iree.compiler
+import pytest
+
+from fluidml.analyzer.dataflow import Dataflow
+from fluidml.analyzer.propagate import check_boundaries
+from fluidml.utils import intern_layout, parse_layouts
+from typing import Dict, List, Optional, Tuple
+
+RESHAPE: str = """
+module {
+  util.func public @main(%arg0: !hal.buffer_view) -> !hal.buffer_view {
+    %0 = hal.tensor.import %arg0 "input0" : !hal.buffer_view -> tensor<2x3x4xf32>
+    %1 = flow.tensor.reshape %0 : tensor<2x3x4xf32> -> tensor<6x4xf32>
+    %2 = hal.tensor.export %1 "output0" : tensor<6x4xf32> -> !hal.buffer_view
+    util.return %2 : !hal.buffer_view
+  }
+}
+"""
+
+# The model input is returned as it is, so both names declare one value.
+IDENTITY: str = """
+module {
+  util.func public @main(%arg0: !hal.buffer_view) -> !hal.buffer_view {
+    %0 = hal.tensor.import %arg0 "input0" : !hal.buffer_view -> tensor<1x3x4xf32>
+    %1 = hal.tensor.export %0 "output0" : tensor<1x3x4xf32> -> !hal.buffer_view
+    util.return %1 : !hal.buffer_view
+  }
+}
+"""
+
+
+def build(mod: str, boundaries: Dict[str, Tuple[int, ...]]) -> Dataflow:
+    with iree.compiler.ir.Context():
+        module: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(mod)
+        [func_op] = module.body.operations
+        return Dataflow.build(func_op, boundaries)
+
+
+@pytest.mark.parametrize(
+    "specs, expected",
+    [
+        ([], {}),
+        (["input0=0,2,3,1"], {"input0": (0, 2, 3, 1)}),
+        (["input0=1,0", "output0=0,1"], {"input0": (1, 0), "output0": (0, 1)}),
+        # Trailing commas are ignored, and repeating a spec is harmless.
+        (["input0=1,0,"], {"input0": (1, 0)}),
+        (["input0=1,0", "input0=1,0"], {"input0": (1, 0)}),
+        (["input0="], {"input0": ()}),
+    ],
+)
+def test_parse_layouts(specs: List[str], expected: Dict[str, Tuple[int, ...]]) -> None:
+    assert parse_layouts(specs) == expected
+
+
+@pytest.mark.parametrize(
+    "specs",
+    [
+        # Malformed.
+        ["input0"],
+        ["=0,1"],
+        ["input0=0;1"],
+        ["input0=a,b"],
+        # Not permutations.
+        ["input0=0,0"],
+        ["input0=1,2"],
+        ["input0=0,-1"],
+        # Conflicting.
+        ["input0=0,1", "input0=1,0"],
+    ],
+)
+def test_parse_layouts_invalid(specs: List[str]) -> None:
+    with pytest.raises(ValueError):
+        parse_layouts(specs)
+
+
+@pytest.mark.parametrize(
+    "boundaries, expected",
+    [
+        ({}, [None, None]),
+        ({"input0": (0, 1, 2)}, [(0, 1, 2), None]),
+        ({"input0": (2, 0, 1), "output0": (1, 0)}, [(2, 0, 1), (1, 0)]),
+        ({"output0": (1, 0)}, [None, (1, 0)]),
+    ],
+)
+def test_check_boundaries(
+    boundaries: Dict[str, Tuple[int, ...]], expected: List[Optional[Tuple[int, ...]]]
+) -> None:
+    dataflow: Dataflow = build(RESHAPE, boundaries)
+    assert [value.boundary for value in dataflow.values] == [
+        None if layout is None else intern_layout(layout) for layout in expected
+    ]
+    check_boundaries(dataflow)
+
+
+@pytest.mark.parametrize(
+    "boundaries",
+    [
+        # The reshape only moves whole groups of dims, 2x3 and 4.
+        {"input0": (1, 0, 2)},
+        {"input0": (0, 2, 1)},
+        # Both sides pass through, but as different groups.
+        {"input0": (2, 0, 1), "output0": (0, 1)},
+    ],
+)
+def test_check_boundaries_invalid(boundaries: Dict[str, Tuple[int, ...]]) -> None:
+    dataflow: Dataflow = build(RESHAPE, boundaries)
+    with pytest.raises(ValueError, match="can't pass through"):
+        check_boundaries(dataflow)
+
+
+def test_build() -> None:
+    # Names declaring one value agree, or it has no single layout.
+    layout: Tuple[int, ...] = (0, 2, 1)
+    dataflow: Dataflow = build(IDENTITY, {"input0": layout, "output0": layout})
+    [value] = dataflow.values
+    assert value.boundary == intern_layout(layout)
+    with pytest.raises(ValueError, match="disagree"):
+        build(IDENTITY, {"input0": layout, "output0": (0, 1, 2)})
+    # Unknown names and layouts moving dims of size 1 are rejected too.
+    with pytest.raises(ValueError, match="No model inputs or outputs"):
+        build(IDENTITY, {"input1": layout})
+    with pytest.raises(ValueError, match="isn't supported"):
+        build(IDENTITY, {"input0": (1, 0, 2)})
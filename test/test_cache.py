@@ -0,0 +1,81 @@
+import json
+import os
+
+from fluidml.profiler.cache import ProfileCache
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def record(idx: int) -> Dict[str, Any]:
+    return {"time": [float(idx)] * 6, "unit": "ns"}
+
+
+def size(idx: int) -> int:
+    return len(json.dumps(record(idx)).encode())
+
+
+def test_key(tmp_path: Path) -> None:
+    cache: ProfileCache = ProfileCache(str(tmp_path), "cuda", {}, 1 << 20)
+    assert cache.key("module") == cache.key("module")
+    assert cache.key("module") != cache.key("other")
+    # Kernels compiled for another target never share an entry.
+    other: ProfileCache = ProfileCache(str(tmp_path), "local-task", {}, 1 << 20)
+    assert cache.key("module") != other.key("module")
+
+
+def test_hits(tmp_path: Path) -> None:
+    cache: ProfileCache = ProfileCache(str(tmp_path), "cuda", {}, 1 << 20)
+    key: str = cache.key("module")
+    assert key not in cache
+    assert cache.get(key) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+    cache.put(key, record(0))
+    assert key in cache
+    assert cache.get(key) == record(0)
+    assert cache.get(key) == record(0)
+    assert (cache.hits, cache.misses) == (2, 1)
+    # Unreadable entries count as misses.
+    with open(tmp_path / f"{key}.json", "w") as f:
+        f.write("{")
+    assert cache.get(key) is None
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert f"hits={cache.hits}, misses={cache.misses}" in str(cache)
+
+
+def test_size(tmp_path: Path) -> None:
+    cache: ProfileCache = ProfileCache(str(tmp_path), "cuda", {}, 1 << 20)
+    key: str = cache.key("module")
+    cache.put(key, record(0))
+    cache.put_buffer(key, b"\0" * 64)
+    assert cache.size == size(0) + 64
+    # Overwrites replace the old entry in the size.
+    cache.put(key, record(1))
+    assert cache.size == size(1) + 64
+    reopened: ProfileCache = ProfileCache(str(tmp_path), "cuda", {}, 1 << 20)
+    assert reopened.size == cache.size
+    assert reopened.get_buffer(key) == b"\0" * 64
+
+
+def test_evict(tmp_path: Path) -> None:
+    cache: ProfileCache = ProfileCache(str(tmp_path), "cuda", {}, 3 * size(0))
+    keys: List[str] = [cache.key(f"module{idx}") for idx in range(4)]
+    for idx, key in enumerate(keys[:3]):
+        cache.put(key, record(0))
+        # Entries are ordered by their modification times, so spread them
+        # apart instead of relying on the clock resolution.
+        for suffix in [".json", ".vmfb"]:
+            path: Path = tmp_path / f"{key}{suffix}"
+            if path.exists():
+                os.utime(path, (1000.0 * (idx + 1), 1000.0 * (idx + 1)))
+    cache.put_buffer(keys[1], b"")
+    os.utime(tmp_path / f"{keys[1]}.vmfb", (2000.0, 2000.0))
+    assert all(key in cache for key in keys[:3])
+    # Reading the oldest entry makes the second one the least recently used.
+    assert cache.get(keys[0]) == record(0)
+    cache.put(keys[3], record(0))
+    assert keys[0] in cache
+    assert keys[1] not in cache
+    assert cache.get_buffer(keys[1]) is None
+    assert keys[2] in cache
+    assert keys[3] in cache
+    assert cache.size == 3 * size(0)
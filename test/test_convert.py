@@ -0,0 +1,230 @@
+import io
+import itertools
+import pytest
+import random
+
+from fluidml.analyzer import (
+    AnytimeAnalyzer,
+    BeamAnalyzer,
+    DynamicProgramAnalyzer,
+    ExactAnalyzer,
+    TreeAnalyzer,
+)
+from fluidml.analyzer.convert import ConversionPlanner
+from fluidml.analyzer.dataflow import Dataflow, DataflowNode, DataflowValue
+from fluidml.analyzer.factor import FactorGraph
+from fluidml.utils import (
+    KStat,
+    Schedule,
+    intern_layout,
+    transpose_kernel_name,
+    transpose_times,
+)
+from test_analyzer import build
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT: Tuple[int, int] = (0, 1)
+TRANSPOSED: Tuple[int, int] = (1, 0)
+
+
+def transposes(
+    kstat: KStat, shape: Tuple[int, ...], seed: int = 0, dtype: str = "f32"
+) -> KStat:
+    # Conversions are only profiled from and to the default layout.
+    rnd: random.Random = random.Random(seed)
+    default: Tuple[int, ...] = tuple(range(len(shape)))
+    kstat[transpose_kernel_name(shape, dtype)] = {
+        pair: float(rnd.randrange(1, 20))
+        for layout in itertools.permutations(default)
+        if layout != default
+        for pair in [(default, layout), (layout, default)]
+    }
+    return kstat
+
+
+def chain(
+    owner: Optional[Dict[Tuple[int, ...], float]],
+    readers: List[Dict[Tuple[int, ...], float]],
+) -> Tuple[Dataflow, KStat]:
+    # A value written by an import, or by a dispatch with the given times by
+    # the layout of the value, and read by dispatches with the given times by
+    # the layout they read it in. Everything else is free in any layout.
+    nodes: List[DataflowNode] = []
+    values: List[DataflowValue] = []
+    table: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = {}
+
+    def node(name: str, entry: Optional[str] = None) -> DataflowNode:
+        result: DataflowNode = DataflowNode(
+            len(nodes),
+            name,
+            entry,
+            None,
+            entry is not None,
+            name.startswith("hal."),
+            name == "util.global.load",
+            False,
+        )
+        nodes.append(result)
+        return result
+
+    def value(owner: DataflowNode) -> DataflowValue:
+        result: DataflowValue = DataflowValue(
+            len(values), f"%{len(values)}", (2, 3), "f32", owner
+        )
+        values.append(result)
+        owner.outputs.append(result)
+        return result
+
+    def use(user: DataflowNode, operand: DataflowValue) -> None:
+        user.inputs.append(operand)
+        operand.users.append(user)
+
+    layouts: List[Tuple[int, int]] = [DEFAULT, TRANSPOSED]
+    if owner is None:
+        shared: DataflowValue = value(node("hal.tensor.import"))
+    else:
+        writer: DataflowNode = node("flow.dispatch", "owner")
+        use(writer, value(node("util.global.load")))
+        shared: DataflowValue = value(writer)
+        table["owner"] = {
+            (weight, layout): owner[layout] for weight in layouts for layout in layouts
+        }
+    for idx, times in enumerate(readers):
+        reader: DataflowNode = node("flow.dispatch", f"reader{idx}")
+        use(reader, shared)
+        value(reader)
+        table[f"reader{idx}"] = {
+            (layout, result): times[layout] for layout in layouts for result in layouts
+        }
+    return Dataflow(nodes, values), KStat(table)
+
+
+def test_transpose_times() -> None:
+    shape: Tuple[int, ...] = (2, 3, 4)
+    kstat: KStat = transposes(KStat(), shape)
+    times: Dict[int, Dict[int, float]] = transpose_times(kstat, shape, "f32")
+    default: int = intern_layout((0, 1, 2))
+    others: List[int] = [
+        intern_layout(layout)
+        for layout in itertools.permutations(range(3))
+        if layout != (0, 1, 2)
+    ]
+    measured: Dict[Tuple[int, ...], float] = kstat.get_ids(
+        transpose_kernel_name(shape, "f32")
+    )
+    assert {*times} == {default, *others}
+    for layout in others:
+        assert times[default][layout] == measured[default, layout]
+        assert times[layout][default] == measured[layout, default]
+    # Two other layouts convert through the default one.
+    for source, target in itertools.permutations(others, 2):
+        assert times[source][target] == pytest.approx(
+            measured[source, default] + measured[default, target]
+        )
+    assert all(layout not in times[layout] for layout in times)
+    # A measured pair between two other layouts is kept as it is.
+    source, target = others[:2]
+    kstat[transpose_kernel_name(shape, "f32"), (source, target)] = 1.0
+    assert transpose_times(kstat, shape, "f32")[source][target] == 1.0
+    assert transpose_times(kstat, (4, 3, 2), "f32") == {}
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_transpose_times_build(columnar: bool) -> None:
+    shape: Tuple[int, ...] = (2, 3, 4)
+    kstat: KStat = transposes(KStat(), shape)
+    f: io.BytesIO = io.BytesIO()
+    if columnar:
+        kstat.dump_columnar(f)
+    else:
+        text: io.StringIO = io.StringIO()
+        kstat.dump(text)
+        f.write(text.getvalue().encode())
+    f.seek(0)
+    assert transpose_times(KStat.build(f), shape, "f32") == transpose_times(
+        kstat, shape, "f32"
+    )
+
+
+def test_plan_reads() -> None:
+    # An import can't move, so both readers convert it and share the one
+    # conversion.
+    dataflow, kstat = chain(
+        None, [{DEFAULT: 100.0, TRANSPOSED: 1.0}, {DEFAULT: 100.0, TRANSPOSED: 2.0}]
+    )
+    kstat = transposes(kstat, (2, 3))
+    planner: ConversionPlanner = ConversionPlanner(dataflow, kstat)
+    schedule: Schedule = FactorGraph(dataflow, kstat).schedule({})
+    conversion: float = transpose_times(kstat, (2, 3), "f32")[intern_layout(DEFAULT)][
+        intern_layout(TRANSPOSED)
+    ]
+    assert planner.evaluate(schedule) == 200.0
+    planned: Schedule = planner.plan(schedule)
+    assert planned["%0"] == DEFAULT
+    for reader in dataflow.values[0].users:
+        assert planned[Schedule.use_key("%0", reader.index)] == TRANSPOSED
+    assert planner.evaluate(planned) == pytest.approx(3.0 + conversion)
+
+
+def test_plan_storage() -> None:
+    # A value its own dispatch writes as fast in either layout is stored in
+    # the one its readers want instead of being converted.
+    dataflow, kstat = chain(
+        {DEFAULT: 1.0, TRANSPOSED: 1.0},
+        [{DEFAULT: 100.0, TRANSPOSED: 1.0}, {DEFAULT: 100.0, TRANSPOSED: 2.0}],
+    )
+    kstat = transposes(kstat, (2, 3))
+    planner: ConversionPlanner = ConversionPlanner(dataflow, kstat)
+    [shared] = dataflow.nodes[0].outputs
+    planned: Schedule = planner.plan(FactorGraph(dataflow, kstat).schedule({}))
+    assert planned[shared.name] == TRANSPOSED
+    assert not any("@" in name for name in planned.ids)
+    assert planner.evaluate(planned) == pytest.approx(4.0)
+
+
+def test_plan_none() -> None:
+    # Without any profiled conversion the schedule stays as it is.
+    dataflow, kstat = chain(
+        None, [{DEFAULT: 100.0, TRANSPOSED: 1.0}, {DEFAULT: 100.0, TRANSPOSED: 2.0}]
+    )
+    schedule: Schedule = FactorGraph(dataflow, kstat).schedule({})
+    planned: Schedule = ConversionPlanner(dataflow, kstat).plan(schedule)
+    assert planned.ids == schedule.ids
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_plan(seed: int) -> None:
+    dataflow, kstat = build(5, 2, seed)
+    kstat = transposes(kstat, dataflow.values[0].shape, seed)
+    graph: FactorGraph = FactorGraph(dataflow, kstat)
+    planner: ConversionPlanner = ConversionPlanner(dataflow, kstat)
+    for schedule in [
+        graph.schedule({}),
+        DynamicProgramAnalyzer().solve(dataflow, kstat),
+    ]:
+        # Without use keys the planner costs a schedule as the factor graph.
+        assert planner.evaluate(schedule) == pytest.approx(graph.evaluate(schedule))
+        planned: Schedule = planner.plan(schedule)
+        assert planner.evaluate(planned) <= planner.evaluate(schedule) + 1e-9
+        for value, layout in graph.fixed.items():
+            assert planned.get_id(value.name) == layout
+        # A tied result aliases its operand, so neither is moved and the
+        # dispatch writing the result reads the operand as it is stored.
+        for node in dataflow.nodes:
+            if node.tied_operands:
+                [operand, *_] = node.inputs
+                [result] = node.outputs
+                use: str = Schedule.use_key(operand.name, node.index)
+                assert planned.get_id(use) is None
+                for value in [operand, result]:
+                    assert planned.get_id(value.name) == schedule.get_id(value.name)
+
+
+@pytest.mark.parametrize(
+    "cls", [AnytimeAnalyzer, BeamAnalyzer, ExactAnalyzer, TreeAnalyzer]
+)
+def test_report(cls: type) -> None:
+    # Solvers never see conversions, so their reports say what they exclude.
+    assert cls().report["conversions"] == "after solver"
+    assert cls().report["optimality"] == "excludes conversions"
+    assert cls(conversions=False).report["conversions"] == "none"
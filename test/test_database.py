@@ -0,0 +1,146 @@
+import iree.compiler
+import numpy as np
+import pytest
+import sqlite3
+
+from fluidml.profiler.database import KernelDatabase
+from fluidml.profiler.util import canonicalize, get_fingerprint
+from fluidml.utils import UNIT, build_record
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+KERNEL: str = """
+func.func private @{helper}(%{a}: tensor<4xf32>) -> tensor<4xf32>
+
+func.func @{name}(%{x}: tensor<4xf32>, %{y}: tensor<4xf32>) -> tensor<4xf32> {{
+  %{sum} = arith.{op} %{x}, %{y} : tensor<4xf32>
+  cf.br ^{block}(%{sum} : tensor<4xf32>)
+^{block}(%{arg}: tensor<4xf32>):
+  %{result} = func.call @{helper}(%{arg}) : (tensor<4xf32>) -> tensor<4xf32>
+  return %{result} : tensor<4xf32>
+}}
+"""
+
+NAMES: Dict[str, str] = {
+    "helper": "helper",
+    "a": "a",
+    "name": "dispatch_0",
+    "x": "x",
+    "y": "y",
+    "op": "addf",
+    "sum": "sum",
+    "block": "bb1",
+    "arg": "arg",
+    "result": "result",
+}
+
+
+def kernel(**names: str) -> str:
+    return KERNEL.format(**{**NAMES, **names})
+
+
+def fingerprint(text: str) -> str:
+    with iree.compiler.ir.Context():
+        mod: iree.compiler.ir.Module = iree.compiler.ir.Module.parse(text)
+        [*_, kernel] = mod.body.operations
+        assert isinstance(kernel, iree.compiler.dialects.func.FuncOp)
+        return get_fingerprint(kernel)
+
+
+def table(seed: int) -> Dict[Tuple[Tuple[int, ...], ...], np.ndarray]:
+    rnd: np.random.Generator = np.random.default_rng(seed)
+    return {
+        layouts: build_record(rnd.uniform(1e3, 1e4, 8))
+        for layouts in [((0, 1), (0, 1)), ((1, 0), (0, 1))]
+    }
+
+
+def check(
+    got: Dict[Tuple[Tuple[int, ...], ...], np.ndarray],
+    expected: Dict[Tuple[Tuple[int, ...], ...], np.ndarray],
+) -> None:
+    assert got.keys() == expected.keys()
+    for layouts, record in expected.items():
+        np.testing.assert_allclose(got[layouts], record)
+
+
+def test_canonicalize() -> None:
+    first: str = 'func.func @"a b"(%arg0: i32) { cf.br ^bb1 ^bb1: return @"a b" }'
+    second: str = "func.func @f(%x: i32) { cf.br ^exit ^exit: return @f }"
+    assert canonicalize(first) == canonicalize(second)
+    assert canonicalize(first) == "func.func @0(%0: i32) { cf.br ^0 ^0: return @0 }"
+    # Names are numbered by their first use, so distinct ones stay distinct.
+    assert canonicalize("%a %b %a") == "%0 %1 %0"
+    assert canonicalize("%a %a") != canonicalize("%a %b")
+
+
+@pytest.mark.parametrize(
+    "names",
+    [
+        {"name": "dispatch_7", "helper": "other"},
+        {"x": "lhs", "y": "rhs", "sum": "0", "arg": "1", "result": "2"},
+        {"block": "exit", "a": "input"},
+        {"name": "dispatch_7", "x": "lhs", "block": "exit", "result": "out"},
+    ],
+)
+def test_fingerprint_renamed(names: Dict[str, str]) -> None:
+    assert fingerprint(kernel(**names)) == fingerprint(kernel())
+
+
+def test_fingerprint_body() -> None:
+    fingerprints: List[str] = [
+        fingerprint(kernel()),
+        fingerprint(kernel(op="mulf")),
+        fingerprint(kernel(op="subf")),
+        # Swapping the operands of an op renames neither of them.
+        fingerprint(kernel(op="subf").replace("%x, %y :", "%y, %x :")),
+    ]
+    assert len({*fingerprints}) == len(fingerprints)
+
+
+def test_database(tmp_path: Path) -> None:
+    path: Path = tmp_path / "kernels.db"
+    database: KernelDatabase = KernelDatabase(str(path), "cuda", {})
+    assert database.unit == UNIT
+    assert "kernel" not in database
+    assert database.get("kernel") is None
+    database.put("kernel", table(0))
+    assert "kernel" in database
+    check(database.get("kernel"), table(0))
+    # Overwrites replace the records of the same layouts.
+    database.put("kernel", table(1))
+    check(database.get("kernel"), table(1))
+    # Other targets never share a profile.
+    other: KernelDatabase = KernelDatabase(str(path), "local-task", {})
+    assert "kernel" not in other
+    other.close()
+    database.close()
+    reopened: KernelDatabase = KernelDatabase(str(path), "cuda", {})
+    assert reopened.unit == UNIT
+    check(reopened.get("kernel"), table(1))
+    reopened.close()
+
+
+def test_database_unit(tmp_path: Path) -> None:
+    # A database created in another unit keeps it, and records are converted
+    # as they are stored and loaded.
+    path: Path = tmp_path / "kernels.db"
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute(
+            "CREATE TABLE meta (key TEXT NOT NULL PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        conn.execute("INSERT INTO meta (key, value) VALUES ('unit', 'us')")
+    conn.close()
+    database: KernelDatabase = KernelDatabase(str(path), "cuda", {})
+    assert database.unit == "us"
+    database.put("kernel", table(0))
+    check(database.get("kernel"), table(0))
+    database.close()
+    with sqlite3.connect(str(path)) as conn:
+        [(median, count)] = conn.execute(
+            "SELECT median, count FROM records WHERE layouts = '[[0, 1], [0, 1]]'"
+        ).fetchall()
+    conn.close()
+    record: np.ndarray = table(0)[(0, 1), (0, 1)]
+    assert median == pytest.approx(record[1] / 1e3)
+    assert count == record[-1]
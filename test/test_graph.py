@@ -0,0 +1,112 @@
+import pytest
+import random
+
+from fluidml.analyzer.dataflow import DataflowNode, DataflowValue
+from fluidml.analyzer.scope.graph import Graph
+from fluidml.analyzer.scope.sequence import Sequence
+from fluidml.analyzer.wrapper import OpWrapper
+from fluidml.utils import KStat, is_default_layout
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def build(ops: int, seed: int) -> Tuple[List[DataflowNode], KStat]:
+    # A random DAG of dispatches in program order, each reading one or two
+    # earlier results, with an occasional import starting a new source.
+    rnd: random.Random = random.Random(seed)
+    nodes: List[DataflowNode] = []
+    values: List[DataflowValue] = []
+    table: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = {}
+    for idx in range(ops):
+        if not values or rnd.random() < 0.1:
+            node: DataflowNode = DataflowNode(
+                idx, "hal.tensor.import", None, None, False, True, False, False
+            )
+        else:
+            node: DataflowNode = DataflowNode(
+                idx, "flow.dispatch", f"k{idx}", None, True, False, False, False
+            )
+            for operand in {*rnd.choices(values[-8:], k=rnd.randint(1, 2))}:
+                node.inputs.append(operand)
+                operand.users.append(node)
+            # Distinct times leave a single heaviest path.
+            table[f"k{idx}"] = {
+                ((0,),) * (len(node.inputs) + 1): rnd.uniform(1.0, 100.0)
+            }
+        value: DataflowValue = DataflowValue(len(values), f"%{idx}", (4,), "f32", node)
+        node.outputs.append(value)
+        values.append(value)
+        nodes.append(node)
+    return nodes, KStat(table)
+
+
+def recursive(graph: Graph, kstat: Optional[KStat] = None) -> List[Sequence]:
+    # Graph.pathify before it peeled paths iteratively: a longest path by a
+    # LIFO worklist, then the same on every remaining component.
+    dtable: Dict[OpWrapper, Tuple[Optional[OpWrapper], float]] = {}
+    queue: List[OpWrapper] = [wrapper for wrapper in graph.iter() if wrapper.is_source]
+    while queue:
+        wrapper: OpWrapper = queue.pop()
+        if wrapper.is_source:
+            dtable[wrapper] = (None, 0.0)
+        else:
+            deps: List[OpWrapper] = wrapper.scope_prevs
+            if any(dep not in dtable for dep in deps):
+                continue
+            prev, dist = max(
+                [(dep, dtable[dep][1]) for dep in deps], key=lambda x: x[1]
+            )
+            if kstat and wrapper.schedule_layout:
+                [timecost] = [
+                    v
+                    for k, v in kstat.get_ids(wrapper.entry).items()
+                    if is_default_layout(k)
+                ]
+                dtable[wrapper] = (prev, dist + timecost)
+            else:
+                dtable[wrapper] = (prev, dist + 1.0)
+        for output in wrapper.scope_nexts:
+            if output not in dtable:
+                queue += [output]
+    destination, (prev, _) = max(dtable.items(), key=lambda x: x[1][1])
+    seq: Sequence = Sequence([destination])
+    while prev:
+        seq = seq.prepend(prev)
+        prev, _ = dtable[prev]
+    seq_set: Set[OpWrapper] = {wrapper for wrapper in seq}
+    rest: Graph = Graph()
+    for wrapper in graph.iter():
+        if wrapper not in seq_set:
+            rest += wrapper
+    seqs: List[Sequence] = [seq]
+    for subgraph in rest.partitioned():
+        seqs += recursive(subgraph)
+    return seqs
+
+
+def indices(seqs: List[Sequence]) -> List[List[int]]:
+    return [[wrapper.node.index for wrapper in seq] for seq in seqs]
+
+
+@pytest.mark.parametrize("ops", [2, 10, 60, 200])
+@pytest.mark.parametrize("seed", range(6))
+def test_pathify(ops: int, seed: int) -> None:
+    nodes, kstat = build(ops, seed)
+    shuffled: List[DataflowNode] = [*nodes]
+    random.Random(seed).shuffle(shuffled)
+    for subgraph in Graph(nodes).partitioned():
+        paths: List[List[int]] = indices(subgraph.pathify(kstat))
+        # Every op lands on exactly one path, and paths follow the dataflow.
+        assert sorted(idx for path in paths for idx in path) == sorted(
+            wrapper.node.index for wrapper in subgraph.iter()
+        )
+        for path in paths:
+            for prev, next in zip(path, path[1:]):
+                assert any(value.owner is nodes[prev] for value in nodes[next].inputs)
+        # Output doesn't depend on the order ops were put into the graph.
+        component: Set[DataflowNode] = {wrapper.node for wrapper in subgraph.iter()}
+        reordered: Graph = Graph(node for node in shuffled if node in component)
+        assert indices(reordered.pathify(kstat)) == paths
+        # The weighted path is unique, so it matches the old algorithm. Later
+        # paths count ops and the old one broke their ties by set order.
+        [first, *_] = indices(recursive(subgraph, kstat))
+        assert paths[0] == first
@@ -0,0 +1,138 @@
+import io
+import json
+import numpy as np
+import pickle
+import pytest
+
+from fluidml.utils import IOStat, KStat, build_record
+from fluidml.utils.stat.record import FIELDS
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+def make() -> KStat:
+    rnd: np.random.Generator = np.random.default_rng(0)
+    return KStat(
+        {
+            "matmul": {
+                layouts: build_record(rnd.uniform(1e3, 1e4, 8))
+                for layouts in [
+                    ((0, 1), (0, 1), (0, 1)),
+                    ((1, 0), (0, 1), (1, 0)),
+                    ((0, 1), (1, 0), (0, 1)),
+                ]
+            },
+            "softmax": {
+                layouts: build_record(rnd.uniform(1e3, 1e4, 8))
+                for layouts in [
+                    ((0, 1, 2), (0, 1, 2)),
+                    ((2, 0, 1), (1, 2, 0)),
+                ]
+            },
+            "fill": {((0,),): 250.0},
+        }
+    )
+
+
+def check(kstat: KStat, expected: KStat) -> None:
+    records: Dict[str, Dict[Tuple[Tuple[int, ...], ...], np.ndarray]] = kstat.records
+    assert records.keys() == expected.records.keys()
+    for kernel, table in expected.records.items():
+        assert records[kernel].keys() == table.keys()
+        for layouts, record in table.items():
+            np.testing.assert_allclose(records[kernel][layouts], record)
+    assert kstat.result == expected.result
+
+
+@pytest.mark.parametrize("statistic", ["min", "median", "p90"])
+def test_json(tmp_path: Path, statistic: str) -> None:
+    kstat: KStat = make().select(statistic)
+    path: Path = tmp_path / "kstat.json"
+    with open(path, "w") as f:
+        kstat.dump(f)
+    with open(path, "rb") as f:
+        check(KStat.build(f, statistic), kstat)
+
+
+@pytest.mark.parametrize("statistic", ["min", "median", "p90"])
+def test_columnar(tmp_path: Path, statistic: str) -> None:
+    kstat: KStat = make().select(statistic)
+    path: Path = tmp_path / "kstat.bin"
+    with open(path, "wb") as f:
+        kstat.dump_columnar(f)
+    # Files are mapped, buffers are read.
+    with open(path, "rb") as f:
+        check(KStat.build(f, statistic), kstat)
+    with open(path, "rb") as f:
+        check(KStat.build(io.BytesIO(f.read()), statistic), kstat)
+
+
+def test_columnar_json(tmp_path: Path) -> None:
+    kstat: KStat = make()
+    columnar: io.BytesIO = io.BytesIO()
+    kstat.dump_columnar(columnar)
+    columnar.seek(0)
+    path: Path = tmp_path / "kstat.json"
+    with open(path, "w") as f:
+        KStat.build(columnar).dump(f)
+    with open(path, "rb") as f:
+        check(KStat.build(f), kstat)
+
+
+def test_pickle() -> None:
+    kstat: KStat = make().select("mean")
+    copy: KStat = pickle.loads(pickle.dumps(kstat))
+    assert copy.statistic == "mean"
+    check(copy, kstat)
+    # Kernels materialize as they are read after unpickling.
+    copy = pickle.loads(pickle.dumps(kstat))
+    assert "softmax" in copy
+    assert copy["softmax"] == kstat["softmax"]
+    assert copy.get_ids("matmul") == kstat.get_ids("matmul")
+
+
+def test_legacy() -> None:
+    # Bare times predate the unit and were measured in ms, the entries with a
+    # count and a variance or a full record in ns.
+    data: Dict[str, List[List[Any]]] = {
+        "bare": [[[[0, 1], [1, 0]], 1.5]],
+        "counted": [[[[0, 1], [1, 0]], 1500.0, 10, 4.0]],
+        "recorded": [[[[0, 1], [1, 0]], 1500.0, [1500.0] * 5 + [10]]],
+    }
+    kstat: KStat = KStat.build(io.BytesIO(json.dumps(data).encode()))
+    layouts: Tuple[Tuple[int, ...], ...] = ((0, 1), (1, 0))
+    assert kstat["bare", layouts] == pytest.approx(1.5e6)
+    assert kstat["counted", layouts] == pytest.approx(1500.0)
+    np.testing.assert_allclose(
+        kstat.get_record(("counted", layouts)), [1500.0] * 4 + [2.0, 10]
+    )
+    assert kstat["recorded", layouts] == pytest.approx(1500.0)
+
+
+def test_unit() -> None:
+    record: List[float] = [1.0, 2.0, 3.0, 4.0, 0.5, 8]
+    data: Dict[str, Any] = {
+        "unit": "us",
+        "kernels": {"k": [[[[1, 0]], 1.0, record]]},
+    }
+    kstat: KStat = KStat.build(io.BytesIO(json.dumps(data).encode()))
+    np.testing.assert_allclose(
+        kstat.get_record(("k", ((1, 0),))),
+        [value * 1e3 for value in record[: FIELDS.index("count")]] + [8],
+    )
+
+
+def test_reduce() -> None:
+    kstat: KStat = make()
+    iostat: IOStat = IOStat({"matmul": 2e3, "fill": 1e3})
+    reduced: KStat = kstat.reduce(iostat)
+    for layouts, record in kstat.get_record("matmul").items():
+        np.testing.assert_allclose(
+            reduced.get_record(("matmul", layouts))[:4],
+            np.maximum(0.0, record[:4] - 2e3),
+        )
+    assert reduced["fill", ((0,),)] == 0.0
+    # Kernels without IO timings, like layout conversions, stay as they are.
+    assert reduced.get_record("softmax").keys() == kstat.get_record("softmax").keys()
+    for layouts, record in kstat.get_record("softmax").items():
+        np.testing.assert_allclose(reduced.get_record(("softmax", layouts)), record)
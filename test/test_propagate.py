@@ -0,0 +1,98 @@
+import pytest
+
+from fluidml.analyzer.propagate import _propagations, reshape_layouts
+from fluidml.utils import default_layout_id, intern_layout
+from typing import List, Tuple
+
+RESHAPES: List[
+    Tuple[Tuple[int, ...], Tuple[int, ...], List[Tuple[Tuple[int, ...], ...]]]
+] = [
+    # Merges move with the dims they merge.
+    ((2, 3, 4), (6, 4), [((0, 1, 2), (0, 1)), ((2, 0, 1), (1, 0))]),
+    ((2, 3), (2, 3), [((0, 1), (0, 1)), ((1, 0), (1, 0))]),
+    (
+        (2, 3, 4, 5),
+        (6, 4, 5),
+        [
+            ((0, 1, 2, 3), (0, 1, 2)),
+            ((0, 1, 3, 2), (0, 2, 1)),
+            ((2, 0, 1, 3), (1, 0, 2)),
+            ((2, 3, 0, 1), (1, 2, 0)),
+            ((3, 0, 1, 2), (2, 0, 1)),
+            ((3, 2, 0, 1), (2, 1, 0)),
+        ],
+    ),
+    # Splits are merges the other way around.
+    ((6, 4), (2, 3, 4), [((0, 1), (0, 1, 2)), ((1, 0), (2, 0, 1))]),
+    ((24,), (2, 3, 4), [((0,), (0, 1, 2))]),
+    # Splits and merges across each other leave a single group.
+    ((4, 6), (2, 12), [((0, 1), (0, 1))]),
+    # Dims of size 1 never move, so neither do the groups holding them.
+    ((1, 6), (6,), [((0, 1), (0,))]),
+    ((4, 1), (4,), [((0, 1), (0,))]),
+    ((2, 1, 3), (2, 3), [((0, 1, 2), (0, 1))]),
+    ((3, 4), (3, 1, 4), [((0, 1), (0, 1, 2))]),
+    ((2, 3, 1), (3, 2, 1), [((0, 1, 2), (0, 1, 2))]),
+    # Mismatched or degenerate shapes only keep the default layouts.
+    ((2, 3), (4, 2), [((0, 1), (0, 1))]),
+    ((2, 3, 4), (5, 5), [((0, 1, 2), (0, 1))]),
+    ((0, 3), (3, 0), [((0, 1), (0, 1))]),
+    ((), (1,), [((), (0,))]),
+]
+
+
+@pytest.mark.parametrize("source, result, expected", RESHAPES)
+def test_reshape_layouts(
+    source: Tuple[int, ...],
+    result: Tuple[int, ...],
+    expected: List[Tuple[Tuple[int, ...], ...]],
+) -> None:
+    assert reshape_layouts(source, result) == expected
+    # Reshaping back moves the same groups.
+    if expected[1:]:
+        assert reshape_layouts(result, source) == [
+            (result_layout, source_layout) for source_layout, result_layout in expected
+        ]
+
+
+@pytest.mark.parametrize("source, result, expected", RESHAPES)
+def test_propagations_reshape(
+    source: Tuple[int, ...],
+    result: Tuple[int, ...],
+    expected: List[Tuple[Tuple[int, ...], ...]],
+) -> None:
+    assert _propagations("flow.tensor.reshape", (source, result)) == [
+        (intern_layout(source_layout), intern_layout(result_layout))
+        for source_layout, result_layout in expected
+    ]
+
+
+@pytest.mark.parametrize(
+    "shapes, expected",
+    [
+        # The target, the update and the result share one layout.
+        (((2, 3), (2, 3), (2, 3)), [(0, 1), (1, 0)]),
+        (((2, 3), (1, 3), (2, 3)), [(0, 1)]),
+        (((4, 2, 3), (1, 2, 3), (4, 2, 3)), [(0, 1, 2), (0, 2, 1)]),
+    ],
+)
+def test_propagations_update(
+    shapes: Tuple[Tuple[int, ...], ...], expected: List[Tuple[int, ...]]
+) -> None:
+    assert _propagations("flow.tensor.update", shapes) == [
+        (intern_layout(layout),) * len(shapes) for layout in expected
+    ]
+
+
+@pytest.mark.parametrize(
+    "name, shapes",
+    [
+        ("flow.tensor.splat", ((), (2, 3))),
+        ("flow.tensor.reshape", ((2, 3), (3, 2), (6,))),
+        ("flow.tensor.update", ((2, 3), (2, 3))),
+    ],
+)
+def test_propagations_default(name: str, shapes: Tuple[Tuple[int, ...], ...]) -> None:
+    assert _propagations(name, shapes) == [
+        tuple(default_layout_id(len(shape)) for shape in shapes)
+    ]
@@ -0,0 +1,86 @@
+import math
+import pytest
+import statistics
+
+from fluidml.profiler.sampler import Sampler
+from typing import List, Tuple
+
+
+def test_statistic() -> None:
+    with pytest.raises(ValueError):
+        Sampler("max")
+    assert Sampler(max_times=50).warmup == 5
+    assert Sampler(max_times=5).warmup == 1
+
+
+def test_empty() -> None:
+    # A kernel is always run at least once, whatever the budget.
+    assert not Sampler().done([], 10.0)
+
+
+@pytest.mark.parametrize("statistic", ["mean", "median", "min", "p90"])
+def test_budget(statistic: str) -> None:
+    sampler: Sampler = Sampler(statistic, min_times=5, budget=1.0)
+    samples: List[float] = [1.0, 100.0]
+    assert not sampler.done(samples, 0.5)
+    assert sampler.done(samples, 1.0)
+    assert sampler.done([1.0], 2.0)
+
+
+@pytest.mark.parametrize("statistic", ["mean", "median", "min", "p90"])
+def test_max_times(statistic: str) -> None:
+    # Samples too spread to ever converge stop at the cap.
+    sampler: Sampler = Sampler(statistic, max_times=8, tolerance=0.0)
+    samples: List[float] = [float(10**idx) for idx in range(8)]
+    assert not sampler.done(samples[:7], 0.0)
+    assert sampler.done(samples, 0.0)
+
+
+@pytest.mark.parametrize("statistic", ["mean", "median", "min", "p90"])
+@pytest.mark.parametrize("min_times, expected", [(5, 5), (1, 2), (0, 2)])
+def test_min_times(statistic: str, min_times: int, expected: int) -> None:
+    # Identical samples converge at once, but never before the minimum, which
+    # is at least two for the interval to mean anything.
+    sampler: Sampler = Sampler(statistic, min_times=min_times)
+    for times in range(1, 8):
+        assert sampler.done([5.0] * times, 0.0) == (times >= expected)
+
+
+def test_mean() -> None:
+    sampler: Sampler = Sampler("mean", min_times=2, tolerance=0.05, confidence=0.95)
+    z: float = statistics.NormalDist().inv_cdf(0.975)
+    for times in [2, 4, 16, 64]:
+        samples: List[float] = [9.0, 11.0] * (times // 2)
+        half: float = z * statistics.stdev(samples) / math.sqrt(times)
+        lower, upper = sampler.interval(samples)
+        assert lower == pytest.approx(10.0 - half)
+        assert upper == pytest.approx(10.0 + half)
+        # The half-width shrinks with the root of the count until it is within
+        # 5% of the mean.
+        assert sampler.done(samples, 0.0) == (half <= 0.5)
+    assert not sampler.done([9.0, 11.0] * 8, 0.0)
+    assert sampler.done([9.0, 11.0] * 32, 0.0)
+
+
+@pytest.mark.parametrize(
+    "statistic, expected",
+    [("median", (6.0, 15.0)), ("min", (6.0, 15.0)), ("p90", (16.0, 20.0))],
+)
+def test_interval(statistic: str, expected: Tuple[float, float]) -> None:
+    # Order statistics around the quantile: for n = 20 at 95%, ranks 5 to 14
+    # of the median and 15 to 19 of the 90th percentile.
+    sampler: Sampler = Sampler(statistic)
+    samples: List[float] = [float(idx) for idx in range(20, 0, -1)]
+    assert sampler.interval(samples) == expected
+
+
+@pytest.mark.parametrize("tolerance, expected", [(4.5, True), (4.4, False)])
+def test_min(tolerance: float, expected: bool) -> None:
+    # The minimum has no interval of its own, so the median one stands in for
+    # how settled the lower tail is, relative to the minimum.
+    sampler: Sampler = Sampler("min", min_times=2, tolerance=tolerance)
+    samples: List[float] = [float(idx) for idx in range(1, 21)]
+    assert sampler.estimate(samples) == 1.0
+    assert sampler.done(samples, 0.0) == expected
+    # Scaling the samples scales the half-width and the minimum alike.
+    assert sampler.done([10.0 * sample for sample in samples], 0.0) == expected
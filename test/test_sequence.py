@@ -0,0 +1,114 @@
+import itertools
+import pytest
+import random
+
+from fluidml.analyzer.dataflow import DataflowNode, DataflowValue
+from fluidml.analyzer.scope.sequence import Sequence
+from fluidml.utils import KStat, Schedule, ScheduleGroup, intern_layout
+from typing import Dict, List, Tuple
+
+
+def build(
+    kernels: int, rank: int, seed: int, quant: int
+) -> Tuple[List[DataflowNode], KStat]:
+    # A chain of dispatches from an import, each reading the previous result
+    # and a weight from outside the chain.
+    rnd: random.Random = random.Random(seed)
+    shape: Tuple[int, ...] = tuple(range(2, 2 + rank))
+    perms: List[Tuple[int, ...]] = [*itertools.permutations(range(rank))]
+    values: List[DataflowValue] = []
+
+    def value(owner: DataflowNode) -> DataflowValue:
+        result: DataflowValue = DataflowValue(
+            len(values), f"%{len(values)}", shape, "f32", owner
+        )
+        values.append(result)
+        owner.outputs.append(result)
+        return result
+
+    source: DataflowNode = DataflowNode(
+        0, "hal.tensor.import", None, None, False, True, False, False
+    )
+    value(source)
+    nodes: List[DataflowNode] = [source]
+    table: Dict[str, Dict[Tuple[Tuple[int, ...], ...], float]] = {}
+    for idx in range(1, kernels + 1):
+        dispatch: DataflowNode = DataflowNode(
+            idx, "flow.dispatch", f"k{idx}", None, True, False, False, False
+        )
+        weight: DataflowValue = value(
+            DataflowNode(
+                -idx, "util.global.load", None, None, False, False, True, False
+            )
+        )
+        operand: DataflowValue = nodes[-1].outputs[0]
+        for arg in [operand, weight] if rnd.random() < 0.5 else [weight, operand]:
+            dispatch.inputs.append(arg)
+            arg.users.append(dispatch)
+        value(dispatch)
+        nodes.append(dispatch)
+        table[f"k{idx}"] = {
+            layouts: float(rnd.randrange(quant))
+            for layouts in itertools.product(perms, repeat=3)
+        }
+    return nodes, KStat(table)
+
+
+def cost(nodes: List[DataflowNode], kstat: KStat, schedule: Schedule) -> float:
+    return sum(
+        kstat.get_ids(node.entry, {})[
+            tuple(schedule.get_id(arg.name) for arg in node.inputs + node.outputs)
+        ]
+        for node in nodes
+        if node.schedule_layout
+    )
+
+
+def brute(nodes: List[DataflowNode], kstat: KStat) -> float:
+    # Tries every layout of the results along the chain, each dispatch taking
+    # its cheapest weight layout for them.
+    rank: int = len(nodes[0].outputs[0].shape)
+    layouts: List[int] = [
+        intern_layout(perm) for perm in itertools.permutations(range(rank))
+    ]
+    [source] = nodes[0].outputs
+    path: List[DataflowValue] = [node.outputs[0] for node in nodes[1:]]
+    best: float = float("inf")
+    for combination in itertools.product(layouts, repeat=len(path)):
+        chosen: Dict[DataflowValue, int] = {
+            source: source.forced_layout,
+            **dict(zip(path, combination)),
+        }
+        total: float = 0.0
+        for node in nodes:
+            if node.schedule_layout:
+                args: List[DataflowValue] = node.inputs + node.outputs
+                total += min(
+                    time
+                    for key, time in kstat.get_ids(node.entry, {}).items()
+                    if all(
+                        key[idx] == chosen[arg]
+                        for idx, arg in enumerate(args)
+                        if arg in chosen
+                    )
+                )
+        best = min(best, total)
+    return best
+
+
+@pytest.mark.parametrize("quant", [4, 100])
+@pytest.mark.parametrize(
+    "kernels, rank, seed",
+    [(6, 2, seed) for seed in range(6)] + [(3, 3, seed) for seed in range(4)],
+)
+def test_schedule(kernels: int, rank: int, seed: int, quant: int) -> None:
+    nodes, kstat = build(kernels, rank, seed, quant)
+    group: ScheduleGroup = Sequence(nodes).schedule(kstat)
+    optimal: float = brute(nodes, kstat)
+    schedules: List[Schedule] = [*group]
+    assert schedules
+    for schedule in schedules:
+        assert {value.name for node in nodes for value in node.inputs} <= {
+            *schedule.ids
+        }
+        assert cost(nodes, kstat, schedule) == pytest.approx(optimal)
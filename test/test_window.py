@@ -0,0 +1,77 @@
+import concurrent.futures
+import pytest
+import threading
+
+from fluidml.profiler.window import InflightWindow
+from typing import List, Optional
+
+
+def test_charge() -> None:
+    window: InflightWindow = InflightWindow(8, 100)
+    futures: List[concurrent.futures.Future] = [
+        concurrent.futures.Future() for _ in range(3)
+    ]
+    for idx, future in enumerate(futures):
+        window.put(future, idx, 10)
+    assert window.resident == 30
+    assert not window.full
+    # A completed compile job is charged its buffer instead of its text.
+    futures[0].set_result(b"\0" * 200)
+    assert window.full
+    assert window.resident == 220
+    assert window.wait() == [futures[0]]
+    assert window.pop(futures[0]) == 0
+    assert window.resident == 20
+    assert not window.full
+    # Failed compile jobs hold nothing.
+    futures[1].set_result(None)
+    futures[2].set_result(b"\0" * 50)
+    assert window.wait() == futures[1:]
+    assert window.resident == 50
+    assert [window.pop(future) for future in futures[1:]] == [1, 2]
+    assert window.resident == 0
+    assert len(window) == 0
+
+
+def test_inflight() -> None:
+    window: InflightWindow = InflightWindow(2, 1 << 20)
+    assert not window.full
+    window.put(concurrent.futures.Future(), 0, 1)
+    assert not window.full
+    window.put(concurrent.futures.Future(), 1, 1)
+    assert window.full
+
+
+@pytest.mark.parametrize("max_memory, max_inflight", [(1, 8), (1500, 8), (1 << 20, 3)])
+def test_bounded(max_memory: int, max_inflight: int) -> None:
+    # Runs the admission loop of the kernel profiler with compile jobs turning
+    # 10-byte texts into 1000-byte buffers, and checks the window never holds
+    # more than its caps allow at the time of admission.
+    window: InflightWindow = InflightWindow(max_inflight, max_memory)
+    lock: threading.Lock = threading.Lock()
+    compiled: List[int] = []
+
+    def compile(idx: int) -> Optional[bytes]:
+        with lock:
+            compiled.append(idx)
+        return b"\0" * 1000
+
+    pending: List[int] = [*range(40)]
+    done: List[int] = []
+    peak: int = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        while pending or window:
+            while pending and not window.full:
+                idx: int = pending.pop(0)
+                window.put(executor.submit(compile, idx), idx, 10)
+                peak = max(peak, len(window))
+                # Only an empty window admits past the memory cap.
+                assert len(window) == 1 or window.resident <= max_memory + 10
+            for future in window.wait():
+                assert len(future.result()) == 1000
+                done.append(window.pop(future))
+    assert sorted(done) == sorted(compiled) == [*range(40)]
+    assert window.resident == 0
+    assert peak <= max_inflight
+    if max_memory == 1:
+        assert peak == 1